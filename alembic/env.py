@@ -8,6 +8,11 @@ from alembic import context
 from app.db.base import Base
 from app.models.document import Document
 from app.models.chunk import Chunk
+from app.models.stored_file import StoredFile
+from app.models.document_signature import DocumentSignature
+from app.models.tenant_shard import TenantShard
+from app.core.config import settings
+from app.db.session import shard_urls
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -61,11 +66,29 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    section = config.get_section(config.config_ini_section, {})
+    if not settings.DATABASE_SHARDS.strip():
+        run_migrations_on(section, shard_index=0)
+        return
+
+    # Every shard gets the same schema; `-x shard=name` limits the run to one
+    only = context.get_x_argument(as_dictionary=True).get("shard")
+    for index, (name, url) in enumerate(shard_urls().items()):
+        if only and name != only:
+            continue
+        print(f"Migrating shard {name}")
+        run_migrations_on({**section, "sqlalchemy.url": url.replace("+asyncpg", "")}, shard_index=index)
+
+
+def run_migrations_on(section: dict, shard_index: int) -> None:
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        section,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    # Lets migrations give each shard its own id range
+    config.attributes["shard_index"] = shard_index
+    config.attributes["sharded"] = bool(settings.DATABASE_SHARDS.strip())
 
     with connectable.connect() as connection:
         context.configure(
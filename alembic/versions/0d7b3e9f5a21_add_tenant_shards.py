@@ -0,0 +1,50 @@
+"""add tenant shard overrides and per-shard id ranges
+
+Revision ID: 0d7b3e9f5a21
+Revises: 6a4f2d8e1c57
+Create Date: 2026-10-19 21:12:48.301556
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d7b3e9f5a21'
+down_revision: Union[str, Sequence[str], None] = '6a4f2d8e1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ids of shard N start at N * SHARD_ID_BLOCK, so a tenant moved between
+# shards keeps its document and chunk ids (room for 21 shards in int4)
+SHARD_ID_BLOCK = 100_000_000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only read on the primary shard; created everywhere so shards stay alike
+    op.create_table(
+        'tenant_shards',
+        sa.Column('owner_id', sa.String(), nullable=False),
+        sa.Column('shard', sa.String(length=64), nullable=False),
+        sa.Column('target_shard', sa.String(length=64), nullable=True),
+        sa.Column('state', sa.String(length=20), server_default='active', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('owner_id'),
+    )
+
+    shard_index = op.get_context().config.attributes.get("shard_index", 0)
+    if shard_index:
+        start = shard_index * SHARD_ID_BLOCK
+        for table in ("documents", "chunks"):
+            op.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST({start}, (SELECT coalesce(max(id), 0) FROM {table}) + 1), false)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('tenant_shards')
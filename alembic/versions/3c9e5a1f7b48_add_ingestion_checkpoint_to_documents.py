@@ -0,0 +1,30 @@
+"""add ingestion checkpoint to documents
+
+Revision ID: 3c9e5a1f7b48
+Revises: b71c4f0a9e25
+Create Date: 2026-10-19 17:12:45.903318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e5a1f7b48'
+down_revision: Union[str, Sequence[str], None] = 'b71c4f0a9e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('chunks_total', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('last_chunk_index', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'last_chunk_index')
+    op.drop_column('documents', 'chunks_total')
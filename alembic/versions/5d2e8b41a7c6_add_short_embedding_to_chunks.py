@@ -0,0 +1,64 @@
+"""add short matryoshka embedding to chunks
+
+Revision ID: 5d2e8b41a7c6
+Revises: c3a1d7e5f902
+Create Date: 2026-10-19 13:40:02.557318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8b41a7c6'
+down_revision: Union[str, Sequence[str], None] = 'c3a1d7e5f902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SHORT_DIMENSIONS = 256
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunks', sa.Column('embedding_short', Vector(SHORT_DIMENSIONS), nullable=True))
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        # The leading dimensions of a text-embedding-3 vector are a valid
+        # lower-dimensional embedding; no API calls needed.
+        while True:
+            result = bind.execute(
+                sa.text(
+                    f"""
+                    UPDATE chunks
+                    SET embedding_short = l2_normalize(subvector(embedding, 1, {SHORT_DIMENSIONS}))::vector({SHORT_DIMENSIONS})
+                    WHERE id IN (
+                        SELECT id FROM chunks
+                        WHERE embedding_short IS NULL AND embedding IS NOT NULL
+                        LIMIT :batch_size
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """
+                ),
+                {"batch_size": BACKFILL_BATCH_SIZE},
+            )
+            if result.rowcount == 0:
+                break
+
+        op.create_index(
+            'ix_chunks_embedding_short_hnsw', 'chunks', ['embedding_short'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_ops={'embedding_short': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chunks_embedding_short_hnsw', table_name='chunks')
+    op.drop_column('chunks', 'embedding_short')
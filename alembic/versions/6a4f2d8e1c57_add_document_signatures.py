@@ -0,0 +1,53 @@
+"""add document signatures for near-duplicate detection
+
+Revision ID: 6a4f2d8e1c57
+Revises: e2a8d6c4b193
+Create Date: 2026-10-19 19:05:37.662014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a4f2d8e1c57'
+down_revision: Union[str, Sequence[str], None] = 'e2a8d6c4b193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Signatures need the extracted text, so existing documents get theirs
+    # the next time they are processed.
+    op.create_table(
+        'document_signatures',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.String(), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.Column('lsh_bands', postgresql.ARRAY(sa.BigInteger()), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id'),
+    )
+    op.create_index(op.f('ix_document_signatures_owner_id'), 'document_signatures', ['owner_id'], unique=False)
+    op.create_index(
+        'ix_document_signatures_lsh_bands', 'document_signatures', ['lsh_bands'],
+        unique=False, postgresql_using='gin',
+    )
+    op.add_column('documents', sa.Column('near_duplicate_of', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'documents_near_duplicate_of_fkey', 'documents', 'documents',
+        ['near_duplicate_of'], ['id'], ondelete='SET NULL',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('documents_near_duplicate_of_fkey', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'near_duplicate_of')
+    op.drop_index('ix_document_signatures_lsh_bands', table_name='document_signatures')
+    op.drop_index(op.f('ix_document_signatures_owner_id'), table_name='document_signatures')
+    op.drop_table('document_signatures')
@@ -0,0 +1,56 @@
+"""delete chunks with their document (ON DELETE CASCADE)
+
+Revision ID: 7e2c5a9d4b16
+Revises: 0d7b3e9f5a21
+Create Date: 2026-10-19 22:03:11.485207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2c5a9d4b16'
+down_revision: Union[str, Sequence[str], None] = '0d7b3e9f5a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The constraint name differs after app.cli.partition_chunks, so it is looked up
+FIND_CHUNK_FK = """
+    SELECT con.conname
+    FROM pg_constraint AS con
+    WHERE con.contype = 'f'
+      AND con.conrelid = 'chunks'::regclass
+      AND con.confrelid = 'documents'::regclass
+      AND con.conparentid = 0
+"""
+
+
+def _replace_chunk_fk(on_delete: str) -> None:
+    bind = op.get_bind()
+    for name in bind.execute(sa.text(FIND_CHUNK_FK)).scalars().all():
+        op.execute(f'ALTER TABLE chunks DROP CONSTRAINT "{name}"')
+    partitioned = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = 'chunks'::regclass")).scalar() == 'p'
+    clause = f"FOREIGN KEY (document_id) REFERENCES documents (id){on_delete}"
+    if partitioned:
+        # NOT VALID is not supported on partitioned tables
+        op.execute(f"ALTER TABLE chunks ADD CONSTRAINT chunks_document_id_fkey {clause}")
+    else:
+        # Added without a full-table check under the strong lock, then
+        # validated after that transaction commits, under a lock that lets
+        # reads and writes continue
+        op.execute(f"ALTER TABLE chunks ADD CONSTRAINT chunks_document_id_fkey {clause} NOT VALID")
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TABLE chunks VALIDATE CONSTRAINT chunks_document_id_fkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_chunk_fk(" ON DELETE CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_chunk_fk("")
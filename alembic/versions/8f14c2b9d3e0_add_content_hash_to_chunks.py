@@ -0,0 +1,92 @@
+"""add content_hash to chunks and dedup embeddings per owner
+
+Revision ID: 8f14c2b9d3e0
+Revises: 5d2e8b41a7c6
+Create Date: 2026-10-19 15:02:19.804413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f14c2b9d3e0'
+down_revision: Union[str, Sequence[str], None] = '5d2e8b41a7c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _run_in_batches(bind, sql: str) -> None:
+    while True:
+        result = bind.execute(sa.text(sql), {"batch_size": BATCH_SIZE})
+        if result.rowcount == 0:
+            break
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        # Same digest as app.services.chunk_service.chunk_content_hash
+        _run_in_batches(
+            bind,
+            """
+            UPDATE chunks
+            SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+            WHERE id IN (
+                SELECT id FROM chunks WHERE content_hash IS NULL
+                LIMIT :batch_size FOR UPDATE SKIP LOCKED
+            )
+            """,
+        )
+
+        op.create_index(
+            'ix_chunks_owner_id_content_hash', 'chunks', ['owner_id', 'content_hash'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+        # Keep the embedding only on the oldest copy of each (owner, content);
+        # the rest drop out of the ANN indexes.
+        _run_in_batches(
+            bind,
+            """
+            UPDATE chunks
+            SET embedding = NULL, embedding_short = NULL
+            WHERE id IN (
+                SELECT c.id FROM chunks AS c
+                WHERE c.embedding IS NOT NULL
+                  AND EXISTS (
+                      SELECT 1 FROM chunks AS o
+                      WHERE o.owner_id = c.owner_id
+                        AND o.content_hash = c.content_hash
+                        AND o.id < c.id
+                        AND o.embedding IS NOT NULL
+                  )
+                LIMIT :batch_size FOR UPDATE SKIP LOCKED
+            )
+            """,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Give every duplicate its vector back before the hash that links them goes away
+    op.execute(
+        """
+        UPDATE chunks AS dup
+        SET embedding = src.embedding, embedding_short = src.embedding_short
+        FROM chunks AS src
+        WHERE dup.embedding IS NULL
+          AND src.embedding IS NOT NULL
+          AND src.owner_id = dup.owner_id
+          AND src.content_hash = dup.content_hash
+        """
+    )
+    op.drop_index('ix_chunks_owner_id_content_hash', table_name='chunks')
+    op.drop_column('chunks', 'content_hash')
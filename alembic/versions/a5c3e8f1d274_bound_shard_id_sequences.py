@@ -0,0 +1,56 @@
+"""end each shard's id sequences at the top of its id range
+
+Revision ID: a5c3e8f1d274
+Revises: 7e2c5a9d4b16
+Create Date: 2026-10-20 09:41:27.115903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c3e8f1d274'
+down_revision: Union[str, Sequence[str], None] = '7e2c5a9d4b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# As in 0d7b3e9f5a21: ids of shard N start at N * SHARD_ID_BLOCK. With a
+# MAXVALUE, a shard that fills its block fails to insert instead of handing
+# out ids of the next shard (chunks get there long before documents).
+SHARD_ID_BLOCK = 100_000_000
+TABLES = ("documents", "chunks")
+
+
+def _sequences():
+    """(table, sequence) pairs, or nothing on an unsharded database."""
+    attributes = op.get_context().config.attributes
+    if not attributes.get("sharded"):
+        return []
+    bind = op.get_bind()
+    return [
+        (table, bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar())
+        for table in TABLES
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    shard_index = op.get_context().config.attributes.get("shard_index", 0)
+    end = (shard_index + 1) * SHARD_ID_BLOCK - 1
+    bind = op.get_bind()
+    for table, sequence in _sequences():
+        current = bind.execute(sa.text(f"SELECT coalesce(max(id), 0) FROM {table}")).scalar()
+        if current > end:
+            # Already past its range: app.cli.move_tenant refuses colliding moves
+            print(f"warning: {table} ids reach {current}, beyond this shard's range (..{end}); left unbounded")
+            continue
+        op.execute(f"ALTER SEQUENCE {sequence} MAXVALUE {end}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for _table, sequence in _sequences():
+        op.execute(f"ALTER SEQUENCE {sequence} NO MAXVALUE")
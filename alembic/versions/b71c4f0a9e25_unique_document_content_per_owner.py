@@ -0,0 +1,57 @@
+"""unique document content per owner
+
+Revision ID: b71c4f0a9e25
+Revises: 8f14c2b9d3e0
+Create Date: 2026-10-19 16:40:11.271905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71c4f0a9e25'
+down_revision: Union[str, Sequence[str], None] = '8f14c2b9d3e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        # Racing uploads may already have produced duplicates. Keep one
+        # document per (owner, content) -- a ready one if any, else the
+        # newest, matching get_by_owner_and_hash -- and unhash the rest.
+        bind.execute(sa.text(
+            """
+            UPDATE documents AS d
+            SET content_hash = NULL
+            FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY owner_id, content_hash
+                    ORDER BY (status = 'ready') DESC, uploaded_at DESC, id DESC
+                ) AS rank
+                FROM documents
+                WHERE content_hash IS NOT NULL
+            ) AS ranked
+            WHERE d.id = ranked.id AND ranked.rank > 1
+            """
+        ))
+
+        op.create_index(
+            'uq_documents_owner_id_content_hash', 'documents', ['owner_id', 'content_hash'],
+            unique=True, postgresql_concurrently=True,
+        )
+
+    op.execute(
+        "ALTER TABLE documents ADD CONSTRAINT uq_documents_owner_id_content_hash "
+        "UNIQUE USING INDEX uq_documents_owner_id_content_hash"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_documents_owner_id_content_hash', 'documents', type_='unique')
@@ -0,0 +1,71 @@
+"""add owner_id to chunks
+
+Revision ID: c3a1d7e5f902
+Revises: 9a2035148b02
+Create Date: 2026-10-19 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a1d7e5f902'
+down_revision: Union[str, Sequence[str], None] = '9a2035148b02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunks', sa.Column('owner_id', sa.String(), nullable=True))
+
+    # Online backfill: small committed batches outside the migration transaction,
+    # so concurrent ingestion and search are never blocked for long.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            result = bind.execute(
+                sa.text(
+                    """
+                    UPDATE chunks AS c
+                    SET owner_id = d.owner_id
+                    FROM documents AS d
+                    WHERE d.id = c.document_id
+                      AND c.id IN (
+                          SELECT id FROM chunks
+                          WHERE owner_id IS NULL
+                          LIMIT :batch_size
+                          FOR UPDATE SKIP LOCKED
+                      )
+                    """
+                ),
+                {"batch_size": BACKFILL_BATCH_SIZE},
+            )
+            if result.rowcount == 0:
+                break
+
+        op.create_index(
+            op.f('ix_chunks_owner_id'), 'chunks', ['owner_id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+        # NOT NULL without a long ACCESS EXCLUSIVE scan: a validated CHECK lets
+        # SET NOT NULL skip the table scan.
+        op.execute(
+            "ALTER TABLE chunks ADD CONSTRAINT chunks_owner_id_not_null "
+            "CHECK (owner_id IS NOT NULL) NOT VALID"
+        )
+        op.execute("ALTER TABLE chunks VALIDATE CONSTRAINT chunks_owner_id_not_null")
+        op.alter_column('chunks', 'owner_id', existing_type=sa.String(), nullable=False)
+        op.drop_constraint('chunks_owner_id_not_null', 'chunks', type_='check')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chunks_owner_id'), table_name='chunks')
+    op.drop_column('chunks', 'owner_id')
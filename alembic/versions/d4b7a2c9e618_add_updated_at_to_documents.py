@@ -0,0 +1,31 @@
+"""add updated_at to documents
+
+Revision ID: d4b7a2c9e618
+Revises: a5c3e8f1d274
+Create Date: 2026-10-19 21:05:37.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b7a2c9e618'
+down_revision: Union[str, Sequence[str], None] = 'a5c3e8f1d274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Documents stuck in flight before this column existed become stale at once
+    op.execute("UPDATE documents SET updated_at = uploaded_at")
+    op.alter_column('documents', 'updated_at', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'updated_at')
@@ -0,0 +1,39 @@
+"""create stored_files table
+
+Revision ID: e2a8d6c4b193
+Revises: 3c9e5a1f7b48
+Create Date: 2026-10-19 17:58:03.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8d6c4b193'
+down_revision: Union[str, Sequence[str], None] = '3c9e5a1f7b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Files stored before this table (flat uploads/{id}_{name}) each belong to
+    # one document and need no row; new uploads are reference counted here.
+    op.create_table(
+        'stored_files',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('key', sa.String(length=1024), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash'),
+    )
+    op.create_index(op.f('ix_stored_files_key'), 'stored_files', ['key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stored_files_key'), table_name='stored_files')
+    op.drop_table('stored_files')
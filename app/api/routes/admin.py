@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.core.dependencies import get_admin_user
+from app.db.query_profiler import get_query_profiler
+from app.services.relevance_gate import get_relevance_gate
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/query-plans")
+async def query_plans(
+    label: str | None = None,
+    owner_id: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    _: str = Depends(get_admin_user),
+):
+    """
+    Most recent sampled EXPLAIN (ANALYZE, BUFFERS) plans, newest first.
+    `label` is "search" or "ingest_write".
+    """
+    profiler = get_query_profiler()
+    return {
+        "sample_rate": profiler.sample_rate,
+        "slow_ms": profiler.slow_ms,
+        "plans": profiler.snapshot(label=label, owner_id=owner_id, limit=limit),
+    }
+
+
+@router.get("/answer-gate")
+async def answer_gate(_: str = Depends(get_admin_user)):
+    """
+    Relevance gate decisions for /ask since startup: questions answered,
+    answered "not found" without an LLM call, and chunks dropped.
+    """
+    return get_relevance_gate().snapshot()
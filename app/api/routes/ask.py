@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_owner_db
 from app.core.limiter import limiter
-from app.db.session import get_db
-from app.schemas.ask import AskRequest, AskResponse
+from app.schemas.ask import AskBatchRequest, AskBatchResponse, AskRequest, AskResponse
 from app.services.rag_service import RAGService
 
 router = APIRouter(prefix="/ask", tags=["ask"])
@@ -16,14 +15,35 @@ async def ask_question(
     request: Request,
     payload: AskRequest,
     owner_id: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_owner_db),
 ):
     service = RAGService(db)
 
     result = await service.ask(
         question=payload.question,
         owner_id=owner_id,
-        top_k=payload.top_k
+        top_k=payload.top_k,
+        filters=payload,
     )
 
     return result
+
+
+@router.post("/batch", response_model=AskBatchResponse)
+@limiter.limit("5/minute")
+async def ask_questions(
+    request: Request,
+    payload: AskBatchRequest,
+    owner_id: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_owner_db),
+):
+    service = RAGService(db)
+
+    results = await service.ask_many(
+        questions=payload.questions,
+        owner_id=owner_id,
+        top_k=payload.top_k,
+        filters=payload,
+    )
+
+    return {"results": results}
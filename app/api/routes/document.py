@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, File
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from dataclasses import asdict
 
-from app.core.dependencies import get_current_user
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile, File, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.dependencies import get_current_user, get_owner_db, get_owner_session_maker
 from app.core.limiter import limiter
-from app.db.session import get_db
+from app.schemas.document import BulkDeleteRequest
 from app.services.document_service import DocumentService
+from app.services.ingestion_pipeline import IngestionPipeline
 from app.services.processing_service import ProcessingService
+from app.utils.archives import ArchiveError, ArchiveLimitError, check_ingest_limits, expand_uploads, upload_totals, verify_uploads
 from app.utils.file_storage import sha256_bytes
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
+async def purge_deleted_files(
+    session_maker: async_sessionmaker[AsyncSession], keys: list[str], document_ids: list[int]
+) -> None:
+    # Runs after the response with its own session; the request's is closed
+    async with session_maker() as db:
+        await DocumentService(db).purge_files(keys, document_ids)
+
+
 @router.post("/upload")
 @limiter.limit("10/minute")
 async def upload_document(
     request: Request,
     file: UploadFile = File(...),
     owner_id: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_owner_db),
 ):
     document_service = DocumentService(db)
     processing_service = ProcessingService(db)
@@ -26,26 +40,24 @@ async def upload_document(
     content = await file.read()
     content_hash = sha256_bytes(content)
 
-    existing_doc = await document_service.get_by_owner_and_hash(
+    doc, owned = await document_service.claim(
+        filename=original_filename,
+        file_type=file_type,
         owner_id=owner_id,
-        content_hash=content_hash
+        content_hash=content_hash,
     )
 
-    if existing_doc:
+    if not owned:
+        # Same content is already ingested or in flight (e.g. a client retry):
+        # attach to that document instead of embedding it a second time.
+        doc = await document_service.wait_until_settled(doc, settings.UPLOAD_ATTACH_WAIT_SECONDS)
         return {
-            "document_id": existing_doc.id,
-            "status": existing_doc.status,
-            "owner_id": existing_doc.owner_id,
+            "document_id": doc.id,
+            "status": doc.status,
+            "owner_id": doc.owner_id,
             "deduplicated": True
         }
 
-    doc = await document_service.create_document_stub(
-        filename=original_filename,
-        file_type=file_type,
-        owner_id=owner_id,
-        content_hash=content_hash,
-    )
-
     await document_service.save_file(doc, original_filename, content)
 
     await processing_service.process_document(doc)
@@ -56,3 +68,131 @@ async def upload_document(
         "owner_id": doc.owner_id,
         "deduplicated": False
     }
+
+
+@router.post("/{document_id}/resume")
+@limiter.limit("10/minute")
+async def resume_document(
+    request: Request,
+    document_id: int,
+    owner_id: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_owner_db),
+):
+    """
+    Retries a failed document, or one abandoned in flight by a crashed
+    worker, from its last checkpoint: chunks committed by the earlier attempt
+    are kept and only the remainder is embedded.
+    """
+    document_service = DocumentService(db)
+    processing_service = ProcessingService(db)
+
+    doc = await document_service.get_for_owner(document_id, owner_id)
+    if doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    if not (await document_service.reclaim_failed(doc) or await document_service.reclaim_stale(doc)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only failed or stale documents can be resumed (status: {doc.status})",
+        )
+
+    try:
+        await processing_service.process_document(doc)
+    except Exception:
+        # The failure and checkpoint are recorded on the document
+        pass
+
+    return {
+        "document_id": doc.id,
+        "status": doc.status,
+        "owner_id": doc.owner_id,
+        "chunks_total": doc.chunks_total,
+        "last_chunk_index": doc.last_chunk_index,
+        "error_message": doc.error_message,
+    }
+
+
+@router.post("/bulk-upload")
+@limiter.limit("5/minute")
+async def bulk_upload_documents(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    owner_id: str = Depends(get_current_user),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_owner_session_maker),
+):
+    """
+    Accepts many files and/or zip/tar archives in one request and ingests
+    them through the pipelined IngestionPipeline. Returns one result per file.
+    """
+    uploads = [(file.filename or "uploaded_file", await file.read()) for file in files]
+    try:
+        members, total_bytes = upload_totals(uploads, settings.INGEST_MAX_FILE_BYTES)
+        check_ingest_limits(members, total_bytes, settings.INGEST_MAX_FILES, settings.INGEST_MAX_TOTAL_BYTES)
+        # Inflate once up front so a corrupt archive is rejected before anything is ingested
+        await asyncio.to_thread(verify_uploads, uploads, settings.INGEST_MAX_FILE_BYTES)
+    except ArchiveLimitError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except ArchiveError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    # Archive members are inflated one at a time as the pipeline takes them in
+    pipeline = IngestionPipeline(session_maker, owner_id=owner_id)
+    results = await pipeline.run(expand_uploads(uploads, settings.INGEST_MAX_FILE_BYTES))
+
+    return {
+        "owner_id": owner_id,
+        "results": [asdict(result) for result in results],
+    }
+
+
+@router.delete("/{document_id}")
+@limiter.limit("30/minute")
+async def delete_document(
+    request: Request,
+    document_id: int,
+    background_tasks: BackgroundTasks,
+    owner_id: str = Depends(get_current_user),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_owner_session_maker),
+):
+    """
+    Deletes a document and its chunks. The stored file is removed in the
+    background once no other document references it.
+    """
+    async with session_maker() as db:
+        result = await DocumentService(db).delete_documents(owner_id, [document_id])
+
+    if result.not_found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    if result.in_progress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document is still being processed",
+        )
+
+    background_tasks.add_task(purge_deleted_files, session_maker, result.unreferenced_keys, result.deleted)
+    return {"document_id": document_id, "deleted": True}
+
+
+@router.post("/bulk-delete")
+@limiter.limit("5/minute")
+async def bulk_delete_documents(
+    request: Request,
+    payload: BulkDeleteRequest,
+    background_tasks: BackgroundTasks,
+    owner_id: str = Depends(get_current_user),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_owner_session_maker),
+):
+    """
+    Deletes up to DELETE_MAX_DOCUMENTS documents in batched transactions.
+    Unknown ids and documents still being processed are reported, not
+    treated as errors.
+    """
+    async with session_maker() as db:
+        result = await DocumentService(db).delete_documents(owner_id, payload.document_ids)
+
+    background_tasks.add_task(purge_deleted_files, session_maker, result.unreferenced_keys, result.deleted)
+    return {
+        "owner_id": owner_id,
+        "deleted": result.deleted,
+        "not_found": result.not_found,
+        "in_progress": result.in_progress,
+    }
@@ -1,7 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response, status
 
 router = APIRouter()
 
 @router.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def ready(request: Request, response: Response):
+    is_ready = getattr(request.app.state, "ready", False)
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if is_ready else "starting",
+        "checks": getattr(request.app.state, "readiness", {}),
+    }
@@ -1,14 +1,24 @@
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_owner_db
 from app.core.limiter import limiter
-from app.db.session import get_db
 from app.schemas.search import SearchRequest, SearchResponse
 from app.services.retrieval_service import RetrievalService
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+# Result field -> value from a (chunk, distance, sources) hit
+RESULT_FIELDS = {
+    "chunk_id": lambda chunk, distance, sources: chunk.id,
+    "document_id": lambda chunk, distance, sources: chunk.document_id,
+    "chunk_index": lambda chunk, distance, sources: chunk.chunk_index,
+    "content": lambda chunk, distance, sources: chunk.content,
+    "distance": lambda chunk, distance, sources: float(distance),
+    "sources": lambda chunk, distance, sources: sources,
+}
+
 
 @router.post("/", response_model=SearchResponse)
 @limiter.limit("30/minute")
@@ -16,25 +26,28 @@ async def search_documents(
     request: Request,
     payload: SearchRequest,
     owner_id: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_owner_db),
 ):
     service = RetrievalService(db)
+    fields = {name: RESULT_FIELDS[name] for name in payload.fields or RESULT_FIELDS}
+    if payload.excerpt_chars and "content" in fields:
+        fields["content"] = lambda chunk, distance, sources: chunk.excerpt
 
     results = await service.search(
         query=payload.query,
         owner_id=owner_id,
-        top_k=payload.top_k
+        top_k=payload.top_k,
+        filters=payload,
+        excerpt_chars=payload.excerpt_chars,
+        with_sources="sources" in fields,
     )
 
-    return {
+    # Built from plain values, so the response model is documentation only:
+    # returning a Response skips FastAPI's validate-and-encode pass, and orjson
+    # serializes several times faster than the stdlib encoder.
+    return ORJSONResponse({
         "results": [
-            {
-                "chunk_id": chunk.id,
-                "document_id": chunk.document_id,
-                "chunk_index": chunk.chunk_index,
-                "content": chunk.content,
-                "distance": float(distance)
-            }
-            for chunk, distance in results
+            {name: value(chunk, distance, sources) for name, value in fields.items()}
+            for chunk, _filename, distance, sources in results
         ]
-    }
+    })
@@ -0,0 +1,78 @@
+"""
+Bulk ingest files, directories and zip/tar archives for one owner.
+
+    python -m app.cli.ingest --owner alice ./handbook/ ./policies.zip extra.pdf
+"""
+import argparse
+import asyncio
+from pathlib import Path
+from typing import Iterator
+
+from app.core.config import settings
+from app.db.shards import get_shard_router
+from app.services.ingestion_pipeline import FileResult, IngestionPipeline
+from app.utils.archives import SUPPORTED_FILE_TYPES, ArchiveError, is_archive, iter_archive_members
+
+
+def iter_files(paths: list[str]) -> Iterator[tuple[str, bytes]]:
+    # Read lazily so only the files the pipeline is taking in are in memory
+    for raw in paths:
+        path = Path(raw)
+        candidates = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for candidate in candidates:
+            name = str(candidate.relative_to(path)) if path.is_dir() else candidate.name
+            if is_archive(candidate.name):
+                try:
+                    yield from iter_archive_members(
+                        candidate.name,
+                        candidate.read_bytes(),
+                        settings.INGEST_MAX_FILE_BYTES,
+                        max_members=settings.INGEST_MAX_FILES,
+                        max_total_bytes=settings.INGEST_MAX_TOTAL_BYTES,
+                    )
+                except ArchiveError as exc:
+                    print(f"Skipping {candidate}: {exc}", flush=True)
+            elif candidate.suffix.lower().lstrip(".") in SUPPORTED_FILE_TYPES:
+                yield name, candidate.read_bytes()
+
+
+def print_progress(result: FileResult) -> None:
+    suffix = " (deduplicated)" if result.deduplicated else ""
+    if result.error:
+        suffix = f": {result.error}"
+    print(f"[{result.status:>9}] {result.filename} doc={result.document_id}{suffix}", flush=True)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--owner", required=True)
+    parser.add_argument("--extract-concurrency", type=int)
+    parser.add_argument("--chunk-concurrency", type=int)
+    parser.add_argument("--embed-concurrency", type=int)
+    parser.add_argument("--write-concurrency", type=int)
+    parser.add_argument("--queue-size", type=int)
+    args = parser.parse_args()
+
+    print(f"Ingesting {', '.join(args.paths)} for {args.owner}")
+
+    pipeline = IngestionPipeline(
+        await get_shard_router().session_maker_for(args.owner),
+        owner_id=args.owner,
+        extract_concurrency=args.extract_concurrency,
+        chunk_concurrency=args.chunk_concurrency,
+        embed_concurrency=args.embed_concurrency,
+        write_concurrency=args.write_concurrency,
+        queue_size=args.queue_size,
+        on_progress=print_progress,
+    )
+    results = await pipeline.run(iter_files(args.paths))
+
+    ready = sum(1 for r in results if r.status == "ready")
+    deduplicated = sum(1 for r in results if r.deduplicated)
+    failed = sum(1 for r in results if r.status == "failed")
+    print(f"Done: {ready} ready, {deduplicated} deduplicated, {failed} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
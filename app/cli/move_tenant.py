@@ -0,0 +1,304 @@
+"""
+Move a tenant to another shard while the service keeps running, or pin
+tenants where they are before the ring changes.
+
+    # Before appending a shard to DATABASE_SHARDS: record every tenant's
+    # current shard, so the new ring only places new tenants
+    python -m app.cli.move_tenant pin
+
+    # Then rebalance explicitly
+    python -m app.cli.move_tenant move --owner acme --to shard2
+
+    python -m app.cli.move_tenant status
+
+    # Once, when upgrading a sharded deployment: fold every shard's
+    # stored_files into the primary's. Run it before deploying and again
+    # right after, so rows written by the old code are merged too
+    python -m app.cli.move_tenant merge-files
+
+A move copies the tenant's documents, chunks and signatures while it is
+still served from the old shard, then freezes it (requests get 503 with
+Retry-After) for a final catch-up, points tenant_shards at the new shard and
+deletes the old copy. Each switch waits SHARD_OVERRIDE_TTL_SECONDS so every
+worker has seen it. Requests routed before the freeze may still be running:
+the placement is also written to the source and target shards, where every
+commit of the tenant checks it (app.db.shards.check_tenant_fence). Freezing
+waits for commits in progress, and later ones are refused, so nothing lands
+on the old shard after the catch-up. Ids are kept (shards have disjoint id ranges). Stored
+files live in the shared storage backend and their reference counts on the
+primary shard, so neither moves.
+"""
+import argparse
+import asyncio
+from collections import Counter
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.db.session import dispose_engine, get_engine, shard_urls
+from app.db.shards import get_shard_router
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.models.document_signature import DocumentSignature
+from app.models.stored_file import StoredFile
+from app.models.tenant_shard import TenantShard
+
+DOCUMENTS = Document.__table__
+CHUNKS = Chunk.__table__
+SIGNATURES = DocumentSignature.__table__
+STORED_FILES = StoredFile.__table__
+TENANT_SHARDS = TenantShard.__table__
+
+
+def batched(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def set_placement(
+    owner_id: str, shard: str, target_shard: str | None, state: str, fence_on: tuple[str, ...] = ()
+) -> None:
+    """
+    Writes the placement to the primary (routing) and to the `fence_on`
+    shards, fences first. Updating a fence row waits for the tenant's
+    commits that already passed the fence check there.
+    """
+    stmt = pg_insert(TENANT_SHARDS).values(
+        owner_id=owner_id, shard=shard, target_shard=target_shard, state=state, updated_at=func.now()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TENANT_SHARDS.c.owner_id],
+        set_={
+            "shard": stmt.excluded.shard,
+            "target_shard": stmt.excluded.target_shard,
+            "state": stmt.excluded.state,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    for name in dict.fromkeys([*fence_on, get_shard_router().primary]):
+        async with get_engine(name).begin() as conn:
+            await conn.execute(stmt)
+
+
+async def wait_for_workers(step: str) -> None:
+    delay = settings.SHARD_OVERRIDE_TTL_SECONDS + 1
+    print(f"{step}; waiting {delay:.0f}s for every worker to see it", flush=True)
+    await asyncio.sleep(delay)
+
+
+async def sync_documents(source: str, target: str, owner_id: str, batch_size: int) -> set[int]:
+    """Upserts the owner's documents on `target`; returns the source ids."""
+    async with get_engine(source).connect() as conn:
+        rows = [dict(row) for row in (await conn.execute(
+            select(DOCUMENTS).where(DOCUMENTS.c.owner_id == owner_id).order_by(DOCUMENTS.c.id)
+        )).mappings()]
+    ids = {row["id"] for row in rows}
+
+    async with get_engine(target).begin() as conn:
+        # Ascending ids, so a near_duplicate_of target is written first
+        for batch in batched(rows, batch_size):
+            stmt = pg_insert(DOCUMENTS).values(batch)
+            await conn.execute(stmt.on_conflict_do_update(
+                index_elements=[DOCUMENTS.c.id],
+                set_={column.name: stmt.excluded[column.name] for column in DOCUMENTS.c if column.name != "id"},
+                # Never overwrite another tenant's row
+                where=DOCUMENTS.c.owner_id == stmt.excluded.owner_id,
+            ))
+        present = set((await conn.scalars(
+            select(DOCUMENTS.c.id).where(DOCUMENTS.c.owner_id == owner_id)
+        )).all())
+        if not ids <= present:
+            raise SystemExit(
+                f"{len(ids - present)} document ids are taken on {target} by another tenant; "
+                "are the shards' id ranges set up (alembic upgrade on every shard)?"
+            )
+    return ids
+
+
+async def chunk_states(shard: str, owner_id: str) -> dict[int, bool]:
+    """chunk id -> whether it holds an embedding (hand-offs fill them in place)."""
+    async with get_engine(shard).connect() as conn:
+        result = await conn.execute(
+            select(CHUNKS.c.id, CHUNKS.c.embedding.is_not(None)).where(CHUNKS.c.owner_id == owner_id)
+        )
+        return {chunk_id: embedded for chunk_id, embedded in result.all()}
+
+
+async def sync_chunks(source: str, target: str, owner_id: str, batch_size: int) -> int:
+    wanted, present = await chunk_states(source, owner_id), await chunk_states(target, owner_id)
+    stale = sorted(chunk_id for chunk_id in present if chunk_id not in wanted)
+    changed = sorted(chunk_id for chunk_id, embedded in wanted.items() if present.get(chunk_id) != embedded)
+
+    async with get_engine(target).begin() as conn:
+        for batch in batched(stale, batch_size):
+            await conn.execute(delete(CHUNKS).where(CHUNKS.c.id.in_(batch), CHUNKS.c.owner_id == owner_id))
+    for batch in batched(changed, batch_size):
+        async with get_engine(source).connect() as conn:
+            rows = [dict(row) for row in (await conn.execute(
+                select(CHUNKS).where(CHUNKS.c.id.in_(batch))
+            )).mappings()]
+        if not rows:
+            continue
+        async with get_engine(target).begin() as conn:
+            # A partitioned chunks table is unique on (id, owner_id) only, so
+            # a taken id would be duplicated rather than rejected
+            taken = await conn.scalar(
+                select(func.count()).where(CHUNKS.c.id.in_(batch), CHUNKS.c.owner_id != owner_id)
+            )
+            if taken:
+                raise SystemExit(
+                    f"{taken} chunk ids are taken on {target} by another tenant; "
+                    "are the shards' id ranges set up (alembic upgrade on every shard)?"
+                )
+            # Delete + insert rather than ON CONFLICT: a partitioned chunks
+            # table has no unique index on id alone
+            await conn.execute(delete(CHUNKS).where(CHUNKS.c.id.in_(batch), CHUNKS.c.owner_id == owner_id))
+            await conn.execute(pg_insert(CHUNKS).values(rows))
+    return len(changed)
+
+
+async def sync_signatures(source: str, target: str, owner_id: str) -> None:
+    async with get_engine(source).connect() as conn:
+        rows = [dict(row) for row in (await conn.execute(
+            select(SIGNATURES).where(SIGNATURES.c.owner_id == owner_id)
+        )).mappings()]
+    async with get_engine(target).begin() as conn:
+        await conn.execute(delete(SIGNATURES).where(SIGNATURES.c.owner_id == owner_id))
+        for batch in batched(rows, 1000):
+            await conn.execute(pg_insert(SIGNATURES).values(batch))
+
+
+async def drop_documents(shard: str, owner_id: str, keep: set[int] | None, batch_size: int) -> None:
+    """Deletes the owner's rows on `shard`, except documents in `keep`."""
+    async with get_engine(shard).connect() as conn:
+        ids = set((await conn.scalars(select(DOCUMENTS.c.id).where(DOCUMENTS.c.owner_id == owner_id))).all())
+    doomed = sorted(ids - (keep or set()))
+    for batch in batched(doomed, batch_size):
+        async with get_engine(shard).begin() as conn:
+            await conn.execute(delete(SIGNATURES).where(SIGNATURES.c.document_id.in_(batch)))
+            await conn.execute(delete(CHUNKS).where(CHUNKS.c.document_id.in_(batch), CHUNKS.c.owner_id == owner_id))
+            await conn.execute(delete(DOCUMENTS).where(DOCUMENTS.c.id.in_(batch), DOCUMENTS.c.owner_id == owner_id))
+
+
+async def move(args) -> None:
+    router = get_shard_router()
+    if args.to not in router.shards:
+        raise SystemExit(f"Unknown shard {args.to!r}; configured: {', '.join(router.shards)}")
+    placement = await router.placement(args.owner)
+    # An interrupted move to the same shard is picked up again
+    if placement.state != "active" and placement.target_shard != args.to:
+        raise SystemExit(f"{args.owner} is already moving to {placement.target_shard} ({placement.state})")
+    source, target = placement.shard, args.to
+    if source == target:
+        print(f"{args.owner} is already on {target}")
+        return
+
+    fences = (source, target)
+    await set_placement(args.owner, source, target, "copying", fence_on=fences)
+    print(f"Copying {args.owner}: {source} -> {target}", flush=True)
+    await sync_documents(source, target, args.owner, args.batch_size)
+    copied = await sync_chunks(source, target, args.owner, args.batch_size)
+    print(f"Copied {copied} chunks", flush=True)
+
+    # Returns once commits in flight on the source have finished
+    await set_placement(args.owner, source, target, "frozen", fence_on=fences)
+    await wait_for_workers(f"{args.owner} frozen, in-flight commits drained")
+    try:
+        document_ids = await sync_documents(source, target, args.owner, args.batch_size)
+        await drop_documents(target, args.owner, keep=document_ids, batch_size=args.batch_size)
+        caught_up = await sync_chunks(source, target, args.owner, args.batch_size)
+        await sync_signatures(source, target, args.owner)
+    except BaseException:
+        # Unfreeze on the old shard; the partial copy is overwritten next time
+        await set_placement(args.owner, source, None, "active", fence_on=fences)
+        raise
+    print(f"Caught up {caught_up} chunks", flush=True)
+
+    await set_placement(args.owner, target, None, "active", fence_on=fences)
+    await wait_for_workers(f"{args.owner} now served from {target}")
+
+    if args.keep_source:
+        print(f"Left the old copy on {source}")
+    else:
+        await drop_documents(source, args.owner, keep=None, batch_size=args.batch_size)
+        print(f"Deleted the old copy on {source}")
+
+
+async def pin(args) -> None:
+    router = get_shard_router()
+    placed: dict[str, str] = {}
+    for shard in shard_urls():
+        async with get_engine(shard).connect() as conn:
+            owners = (await conn.scalars(select(DOCUMENTS.c.owner_id).distinct())).all()
+        for owner_id in owners:
+            if owner_id in placed:
+                print(f"warning: {owner_id} has documents on {placed[owner_id]} and {shard}; pinned to the first")
+                continue
+            placed[owner_id] = shard
+
+    async with get_engine(router.primary).connect() as conn:
+        pinned = set((await conn.scalars(select(TENANT_SHARDS.c.owner_id))).all())
+    new = {owner_id: shard for owner_id, shard in placed.items() if owner_id not in pinned}
+    for owner_id, shard in new.items():
+        await set_placement(owner_id, shard, None, "active")
+    print(f"Pinned {len(new)} tenants ({len(pinned)} already had a placement)")
+
+
+async def merge_files(args) -> None:
+    """Folds the stored_files rows of the other shards into the primary's."""
+    router = get_shard_router()
+    for shard in router.shards[1:]:
+        async with get_engine(shard).begin() as conn:
+            rows = [dict(row) for row in (await conn.execute(select(STORED_FILES).with_for_update())).mappings()]
+            # Primary first: failing in between counts a reference twice,
+            # which keeps a file rather than losing one
+            async with get_engine(router.primary).begin() as primary:
+                for batch in batched(rows, 1000):
+                    stmt = pg_insert(STORED_FILES).values(batch)
+                    await primary.execute(stmt.on_conflict_do_update(
+                        index_elements=[STORED_FILES.c.content_hash],
+                        set_={
+                            "ref_count": STORED_FILES.c.ref_count + stmt.excluded.ref_count,
+                            "key": func.coalesce(STORED_FILES.c.key, stmt.excluded.key),
+                        },
+                    ))
+            await conn.execute(delete(STORED_FILES))
+        print(f"Merged {len(rows)} stored files from {shard}")
+
+
+async def status(args) -> None:
+    router = get_shard_router()
+    async with get_engine(router.primary).connect() as conn:
+        rows = (await conn.execute(select(TENANT_SHARDS).order_by(TENANT_SHARDS.c.owner_id))).all()
+    counts = Counter(row.shard for row in rows)
+    print("Shards: " + ", ".join(f"{shard} ({counts[shard]} pinned)" for shard in router.shards))
+    for row in rows:
+        if row.state != "active":
+            print(f"  {row.owner_id}: {row.shard} -> {row.target_shard} [{row.state}] since {row.updated_at}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    move_parser = commands.add_parser("move")
+    move_parser.add_argument("--owner", required=True)
+    move_parser.add_argument("--to", required=True, help="target shard name")
+    move_parser.add_argument("--batch-size", type=int, default=500, help="rows per copy batch")
+    move_parser.add_argument("--keep-source", action="store_true", help="leave the old copy in place")
+
+    commands.add_parser("pin")
+    commands.add_parser("status")
+    commands.add_parser("merge-files")
+    args = parser.parse_args()
+
+    handlers = {"move": move, "pin": pin, "status": status, "merge-files": merge_files}
+    try:
+        await handlers[args.command](args)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+"""
+Convert `chunks` into a table partitioned by owner_id, with an HNSW index on
+every partition, while the service keeps running.
+
+    # 16 hash partitions
+    python -m app.cli.partition_chunks --strategy hash --partitions 16
+
+    # Dedicated partitions for the largest tenants, everyone else in DEFAULT
+    python -m app.cli.partition_chunks --strategy list --tenant acme --tenant globex
+
+Rows are copied in keyset batches into `chunks_partitioned`; only the final
+catch-up copy and the rename run under a lock. The old table is kept as
+`chunks_unpartitioned` unless --drop-old is given.
+"""
+import argparse
+import asyncio
+import re
+import time
+
+from sqlalchemy import text
+
+from app.db.session import dispose_engine, get_engine
+
+COPY_COLUMNS = "id, document_id, owner_id, chunk_index, content, content_hash, embedding, embedding_short"
+
+
+def _partition_name(value: str) -> str:
+    return "chunks_p_" + re.sub(r"[^a-z0-9_]", "_", value.lower())[:40]
+
+
+async def create_partitioned_table(conn, strategy: str, partitions: int, tenants: list[str]) -> None:
+    method = "HASH" if strategy == "hash" else "LIST"
+    await conn.execute(text(
+        f"CREATE TABLE chunks_partitioned (LIKE chunks INCLUDING DEFAULTS) PARTITION BY {method} (owner_id)"
+    ))
+    # Primary keys on a partitioned table must include the partition key
+    await conn.execute(text("ALTER TABLE chunks_partitioned ADD PRIMARY KEY (id, owner_id)"))
+    await conn.execute(text(
+        "ALTER TABLE chunks_partitioned ADD FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE"
+    ))
+
+    if strategy == "hash":
+        for remainder in range(partitions):
+            await conn.execute(text(
+                f"CREATE TABLE chunks_p{remainder} PARTITION OF chunks_partitioned "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            ))
+    else:
+        for tenant in tenants:
+            await conn.execute(
+                text(
+                    f"CREATE TABLE {_partition_name(tenant)} PARTITION OF chunks_partitioned "
+                    "FOR VALUES IN (:tenant)"
+                ).bindparams(tenant=tenant)
+            )
+        await conn.execute(text("CREATE TABLE chunks_p_default PARTITION OF chunks_partitioned DEFAULT"))
+
+
+async def create_indexes(conn) -> None:
+    # Indexes on the parent cascade to every partition, giving one ANN index per partition
+    await conn.execute(text("CREATE INDEX ON chunks_partitioned (document_id)"))
+    await conn.execute(text("CREATE INDEX ON chunks_partitioned (owner_id)"))
+    await conn.execute(text("CREATE INDEX ON chunks_partitioned (owner_id, content_hash)"))
+    await conn.execute(text(
+        "CREATE INDEX ON chunks_partitioned USING hnsw (embedding vector_cosine_ops)"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX ON chunks_partitioned USING hnsw (embedding_short vector_cosine_ops)"
+    ))
+
+
+async def copy_batch(conn, last_id: int, batch_size: int) -> tuple[int, int]:
+    result = await conn.execute(
+        text(
+            f"""
+            WITH batch AS (
+                SELECT {COPY_COLUMNS} FROM chunks
+                WHERE id > :last_id
+                ORDER BY id
+                LIMIT :batch_size
+            ), inserted AS (
+                INSERT INTO chunks_partitioned ({COPY_COLUMNS})
+                SELECT {COPY_COLUMNS} FROM batch
+                ON CONFLICT DO NOTHING
+            )
+            SELECT count(*), coalesce(max(id), :last_id) FROM batch
+            """
+        ),
+        {"last_id": last_id, "batch_size": batch_size},
+    )
+    copied, new_last_id = result.one()
+    return copied, new_last_id
+
+
+async def resync_embeddings(conn) -> int:
+    """
+    Copies embeddings changed in place since a row was copied: deleting a
+    document hands its embeddings to the surviving copies of shared content
+    (ChunkService.hand_off_embeddings). Compared by embedded state, as
+    move_tenant.sync_chunks does.
+    """
+    result = await conn.execute(text(
+        """
+        UPDATE chunks_partitioned AS p
+        SET embedding = c.embedding, embedding_short = c.embedding_short
+        FROM chunks AS c
+        WHERE c.id = p.id
+          AND c.owner_id = p.owner_id
+          AND (c.embedding IS NULL) <> (p.embedding IS NULL)
+        """
+    ))
+    return result.rowcount
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", choices=["hash", "list"], default="hash")
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--tenant", action="append", default=[])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--drop-old", action="store_true")
+    args = parser.parse_args()
+
+    if args.strategy == "list" and not args.tenant:
+        parser.error("--strategy list needs at least one --tenant")
+
+    async with get_engine().begin() as conn:
+        await create_partitioned_table(conn, args.strategy, args.partitions, args.tenant)
+
+    # Bulk copy without holding locks on chunks
+    last_id, total, started = 0, 0, time.perf_counter()
+    while True:
+        async with get_engine().begin() as conn:
+            copied, last_id = await copy_batch(conn, last_id, args.batch_size)
+        if copied == 0:
+            break
+        total += copied
+        print(f"copied {total} rows ({total / (time.perf_counter() - started):.0f} rows/s)", flush=True)
+
+    async with get_engine().begin() as conn:
+        await create_indexes(conn)
+
+    # A first unlocked pass keeps the locked one short
+    async with get_engine().begin() as conn:
+        resynced = await resync_embeddings(conn)
+    print(f"re-synced {resynced} rows whose embedding changed during the copy", flush=True)
+
+    # Catch up on changes made during the copy, then swap under a short lock.
+    # Ingestion inserts new rows and deletes whole documents; deletions also
+    # move embeddings between surviving rows in place. So: an id-keyed pass
+    # for new rows, re-syncing changed embeddings, and dropping deleted rows.
+    async with get_engine().begin() as conn:
+        await conn.execute(text("LOCK TABLE chunks IN EXCLUSIVE MODE"))
+        while True:
+            copied, last_id = await copy_batch(conn, last_id, args.batch_size)
+            if copied == 0:
+                break
+        await resync_embeddings(conn)
+        await conn.execute(text(
+            "DELETE FROM chunks_partitioned p WHERE NOT EXISTS (SELECT 1 FROM chunks c WHERE c.id = p.id)"
+        ))
+        await conn.execute(text("ALTER TABLE chunks RENAME TO chunks_unpartitioned"))
+        await conn.execute(text("ALTER TABLE chunks_partitioned RENAME TO chunks"))
+        await conn.execute(text("ALTER SEQUENCE chunks_id_seq OWNED BY chunks.id"))
+        if args.drop_old:
+            await conn.execute(text("DROP TABLE chunks_unpartitioned"))
+
+    await dispose_engine()
+    print(f"chunks is now partitioned by owner_id ({args.strategy}), {total} rows copied")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
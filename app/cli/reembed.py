@@ -0,0 +1,457 @@
+"""
+Re-embed chunks for an embedding model or dimension change, or embed chunks
+that were left without a vector, while search stays online.
+
+    # 1. Add shadow columns for the new model (--short-dimensions also
+    #    changes the width of the coarse-pass embedding_short prefix)
+    python -m app.cli.reembed prepare --model text-embedding-3-large --dimensions 1024
+
+    # 2. Embed every embedded chunk into the shadow columns (resumable, throttled)
+    python -m app.cli.reembed run --concurrency 8 --max-rows-per-second 2000
+
+    # 3. Index the shadow columns, catch up on rows written meanwhile, swap
+    #    the columns in one short transaction and switch the app's model
+    python -m app.cli.reembed swap
+
+    # Only if `swap` was interrupted after the switch: finish re-embedding
+    # the chunks workers wrote with the old model meanwhile
+    python -m app.cli.reembed catch-up
+
+    # 4. Once the new model is deployed, drop the old vectors. Their indexes
+    #    go with them, including the original ivfflat chunks_embedding_idx
+    python -m app.cli.reembed cleanup
+
+    # Embed chunks with no vector and no embedded duplicate, in place
+    python -m app.cli.reembed fill
+
+Progress is kept in the reembed_jobs table, so an interrupted run continues
+from the last committed batch. `swap` records the new model there as the
+"live" job, in the same transaction as the renames; workers embed with it
+(over the EMBEDDING_* settings) within EMBEDDING_STATE_TTL_SECONDS
+(app.utils.embedding_providers.EmbeddingState). Until then a worker may still
+embed with the old model: its searches rank poorly (or fail, if the width
+changed) and the chunks it writes get old-model vectors, or fail to insert
+and can be resumed. So `swap` waits out the TTL and then re-embeds every
+chunk written after the switch. Update the EMBEDDING_* settings at the next
+deploy so a fresh database starts with the same model. Short vectors are
+always cut to the width of the column they are written to, read from the
+catalog.
+
+A chunks table partitioned by app.cli.partition_chunks gets its new indexes
+built partition by partition (CREATE INDEX CONCURRENTLY is refused on the
+partitioned parent) and attached to an index on the parent.
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import dispose_engine, get_engine
+from app.utils.embedding_providers import EmbeddingProvider, build_embedding_provider, check_dimensions
+from app.utils.embeddings import truncate_embedding
+from app.utils.upstream_scheduler import Priority, upstream_priority
+
+SHADOW_JOB = "shadow"
+FILL_JOB = "fill"
+# The model chunks.embedding holds since the last swap; its last_id starts
+# at the highest chunk id at the switch, for the catch-up
+LIVE_JOB = "live"
+# Column each job writes its short vectors to
+SHORT_COLUMNS = {SHADOW_JOB: "embedding_short_next", FILL_JOB: "embedding_short", LIVE_JOB: "embedding_short"}
+
+# Chunks that need a vector from the new model: everything that holds a
+# vector today (duplicates stay NULL, see ChunkService)
+SHADOW_PENDING = """
+    SELECT id, content FROM chunks
+    WHERE id > :last_id AND embedding IS NOT NULL AND embedding_next IS NULL
+    ORDER BY id
+    LIMIT :batch_size
+"""
+
+SHADOW_WRITE = """
+    UPDATE chunks AS c
+    SET embedding_next = v.embedding::vector, embedding_short_next = v.embedding_short::vector
+    FROM unnest(CAST(:ids AS bigint[]), CAST(:embeddings AS text[]), CAST(:shorts AS text[]))
+        AS v(id, embedding, embedding_short)
+    WHERE c.id = v.id
+"""
+
+# Chunks with no vector whose content has no embedded copy for the owner;
+# only the first copy of each content is embedded
+FILL_PENDING = """
+    SELECT c.id, c.content FROM chunks AS c
+    WHERE c.id > :last_id
+      AND c.embedding IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM chunks AS o
+          WHERE o.owner_id = c.owner_id
+            AND o.content_hash = c.content_hash
+            AND o.embedding IS NOT NULL
+      )
+      AND c.id = (
+          SELECT min(o.id) FROM chunks AS o
+          WHERE o.owner_id = c.owner_id AND o.content_hash = c.content_hash
+      )
+    ORDER BY c.id
+    LIMIT :batch_size
+"""
+
+FILL_WRITE = """
+    UPDATE chunks AS c
+    SET embedding = v.embedding::vector, embedding_short = v.embedding_short::vector
+    FROM unnest(CAST(:ids AS bigint[]), CAST(:embeddings AS text[]), CAST(:shorts AS text[]))
+        AS v(id, embedding, embedding_short)
+    WHERE c.id = v.id AND c.embedding IS NULL
+"""
+
+
+# Chunks written after a swap, possibly by a worker still on the old model
+LIVE_PENDING = """
+    SELECT id, content FROM chunks
+    WHERE id > :last_id AND embedding IS NOT NULL
+    ORDER BY id
+    LIMIT :batch_size
+"""
+
+LIVE_WRITE = """
+    UPDATE chunks AS c
+    SET embedding = v.embedding::vector, embedding_short = v.embedding_short::vector
+    FROM unnest(CAST(:ids AS bigint[]), CAST(:embeddings AS text[]), CAST(:shorts AS text[]))
+        AS v(id, embedding, embedding_short)
+    WHERE c.id = v.id AND c.embedding IS NOT NULL
+"""
+
+
+def vector_literal(vector: list[float]) -> str:
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+async def vector_width(conn, column: str) -> int:
+    # pgvector stores a vector column's dimensions as its type modifier
+    return await conn.scalar(
+        text("SELECT atttypmod FROM pg_attribute WHERE attrelid = 'chunks'::regclass AND attname = :column"),
+        {"column": column},
+    )
+
+
+async def ensure_jobs_table(conn) -> None:
+    await conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS reembed_jobs (
+            name text PRIMARY KEY,
+            provider text NOT NULL,
+            model text NOT NULL,
+            dimensions int NOT NULL,
+            last_id bigint NOT NULL DEFAULT 0,
+            rows_done bigint NOT NULL DEFAULT 0,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        )
+        """
+    ))
+
+
+async def load_job(conn, name: str) -> dict | None:
+    result = await conn.execute(text("SELECT * FROM reembed_jobs WHERE name = :name"), {"name": name})
+    row = result.mappings().one_or_none()
+    return dict(row) if row else None
+
+
+async def save_job(conn, name: str, provider: EmbeddingProvider, model: str) -> None:
+    await conn.execute(
+        text(
+            """
+            INSERT INTO reembed_jobs (name, provider, model, dimensions)
+            VALUES (:name, :provider, :model, :dimensions)
+            ON CONFLICT (name) DO UPDATE
+            SET provider = excluded.provider, model = excluded.model, dimensions = excluded.dimensions,
+                last_id = 0, rows_done = 0, updated_at = now()
+            """
+        ),
+        {"name": name, "provider": provider.name, "model": model, "dimensions": provider.dimensions},
+    )
+
+
+async def embed_concurrently(
+    provider: EmbeddingProvider,
+    texts: list[str],
+    embed_batch: int,
+    concurrency: int,
+) -> list[list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    size = min(embed_batch, provider.max_batch_size)
+
+    async def one(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            # Background work: yields the upstream to interactive traffic
+            with upstream_priority(Priority.INGESTION, tenant="reembed"):
+                return await provider.embed(batch)
+
+    parts = await asyncio.gather(*(one(texts[i:i + size]) for i in range(0, len(texts), size)))
+    return [vector for part in parts for vector in part]
+
+
+async def embed_batch_into(
+    conn, rows, write_sql: str, provider: EmbeddingProvider, short_dimensions: int, args
+) -> None:
+    vectors = await embed_concurrently(provider, [row.content for row in rows], args.embed_batch, args.concurrency)
+    await conn.execute(
+        text(write_sql),
+        {
+            "ids": [row.id for row in rows],
+            "embeddings": [vector_literal(v) for v in vectors],
+            "shorts": [vector_literal(truncate_embedding(v, short_dimensions)) for v in vectors],
+        },
+    )
+
+
+async def run_job(name: str, pending_sql: str, write_sql: str, provider: EmbeddingProvider, args) -> int:
+    """Keyset pass over pending rows; every batch commits with its progress."""
+    async with get_engine().begin() as conn:
+        job = await load_job(conn, name)
+        short_dimensions = await vector_width(conn, SHORT_COLUMNS[name])
+    last_id, rows_done = job["last_id"], job["rows_done"]
+    processed, started = 0, time.perf_counter()
+
+    while True:
+        async with get_engine().connect() as conn:
+            rows = (await conn.execute(
+                text(pending_sql), {"last_id": last_id, "batch_size": args.batch_size}
+            )).all()
+        if not rows:
+            break
+
+        async with get_engine().begin() as conn:
+            await embed_batch_into(conn, rows, write_sql, provider, short_dimensions, args)
+            last_id, rows_done = rows[-1].id, rows_done + len(rows)
+            await conn.execute(
+                text(
+                    "UPDATE reembed_jobs SET last_id = :last_id, rows_done = :rows_done, updated_at = now() "
+                    "WHERE name = :name"
+                ),
+                {"last_id": last_id, "rows_done": rows_done, "name": name},
+            )
+
+        processed += len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"{rows_done} rows embedded ({processed / elapsed:.0f} rows/s), last id {last_id}", flush=True)
+
+        if args.max_rows_per_second:
+            # Throttle: stay at or under the target average rate
+            ahead = processed / args.max_rows_per_second - elapsed
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+
+    return processed
+
+
+def job_provider(job: dict) -> EmbeddingProvider:
+    return build_embedding_provider(job["provider"], job["model"], job["dimensions"])
+
+
+async def prepare(args) -> None:
+    provider = build_embedding_provider(args.provider, args.model, args.dimensions)
+    async with get_engine().begin() as conn:
+        short_dimensions = args.short_dimensions or await vector_width(conn, "embedding_short")
+        if not 0 < short_dimensions <= provider.dimensions:
+            raise SystemExit(f"--short-dimensions must be between 1 and {provider.dimensions}")
+        await ensure_jobs_table(conn)
+        await conn.execute(text(
+            f"ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding_next vector({provider.dimensions}), "
+            f"ADD COLUMN IF NOT EXISTS embedding_short_next vector({short_dimensions})"
+        ))
+        await save_job(conn, SHADOW_JOB, provider, args.model or settings.EMBEDDING_MODEL)
+    print(f"Shadow columns ready for {provider.name}/{args.model or settings.EMBEDDING_MODEL} ({provider.dimensions}-d)")
+
+
+async def run(args) -> None:
+    async with get_engine().begin() as conn:
+        job = await load_job(conn, SHADOW_JOB) if await _jobs_table_exists(conn) else None
+    if job is None:
+        raise SystemExit("Run `prepare` first")
+    if args.restart:
+        async with get_engine().begin() as conn:
+            await conn.execute(text("UPDATE reembed_jobs SET last_id = 0 WHERE name = :name"), {"name": SHADOW_JOB})
+    await run_job(SHADOW_JOB, SHADOW_PENDING, SHADOW_WRITE, job_provider(job), args)
+
+
+async def chunk_partitions(conn) -> list[str]:
+    """Partitions of chunks, or an empty list when it is a plain table."""
+    if await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = 'chunks'::regclass")) != "p":
+        return []
+    return list((await conn.scalars(text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'chunks'::regclass ORDER BY 1"
+    ))).all())
+
+
+def hnsw_index_name(table: str, column: str) -> str:
+    """ix_<table>_<column>_hnsw, shortened to fit Postgres' 63-byte names."""
+    name = f"ix_{table}_{column}_hnsw"
+    if len(name) <= 63:
+        return name
+    digest = hashlib.blake2b(table.encode("utf-8"), digest_size=4).hexdigest()
+    return f"ix_{table[:63 - len(column) - 19]}_{digest}_{column}_hnsw"
+
+
+async def build_hnsw_index(conn, column: str, partitions: list[str]) -> None:
+    """Builds ix_chunks_<column>_hnsw without blocking writes. `conn` is in autocommit."""
+    index = hnsw_index_name("chunks", column)
+    if not partitions:
+        await conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON chunks USING hnsw ({column} vector_cosine_ops)"
+        ))
+        return
+
+    # An invalid index on the parent alone, which becomes valid once every
+    # partition's index is attached
+    await conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {index} ON ONLY chunks USING hnsw ({column} vector_cosine_ops)"
+    ))
+    for partition in partitions:
+        child = hnsw_index_name(partition, column)
+        print(f"  {partition}", flush=True)
+        await conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} USING hnsw ({column} vector_cosine_ops)"
+        ))
+        attached = await conn.scalar(
+            text("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)"),
+            {"child": child, "parent": index},
+        )
+        if not attached:
+            await conn.execute(text(f"ALTER INDEX {index} ATTACH PARTITION {child}"))
+
+
+async def swap(args) -> None:
+    async with get_engine().begin() as conn:
+        job = await load_job(conn, SHADOW_JOB) if await _jobs_table_exists(conn) else None
+    if job is None:
+        raise SystemExit("Run `prepare` and `run` first")
+    provider = job_provider(job)
+
+    # Indexes are built before the catch-up so they are maintained, not rebuilt
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        partitions = await chunk_partitions(conn)
+        for column in ("embedding_next", "embedding_short_next"):
+            print(f"Building HNSW index on {column}...", flush=True)
+            await build_hnsw_index(conn, column, partitions)
+
+    # Rows written since `run` (new uploads, hand-offs) without the lock
+    async with get_engine().begin() as conn:
+        await conn.execute(text("UPDATE reembed_jobs SET last_id = 0 WHERE name = :name"), {"name": SHADOW_JOB})
+    await run_job(SHADOW_JOB, SHADOW_PENDING, SHADOW_WRITE, provider, args)
+
+    async with get_engine().begin() as conn:
+        # Writers wait, readers continue, until the renames need a brief
+        # ACCESS EXCLUSIVE lock at the end of this transaction
+        await conn.execute(text("LOCK TABLE chunks IN SHARE ROW EXCLUSIVE MODE"))
+        short_dimensions = await vector_width(conn, SHORT_COLUMNS[SHADOW_JOB])
+        watermark = await conn.scalar(text("SELECT coalesce(max(id), 0) FROM chunks"))
+        while True:
+            rows = (await conn.execute(
+                text(SHADOW_PENDING), {"last_id": 0, "batch_size": args.batch_size}
+            )).all()
+            if not rows:
+                break
+            await embed_batch_into(conn, rows, SHADOW_WRITE, provider, short_dimensions, args)
+
+        for old, new in (("embedding", "embedding_next"), ("embedding_short", "embedding_short_next")):
+            await conn.execute(text(f"ALTER TABLE chunks RENAME COLUMN {old} TO {old}_old"))
+            await conn.execute(text(f"ALTER TABLE chunks RENAME COLUMN {new} TO {old}"))
+            for table in ["chunks", *partitions]:
+                current, retired = hnsw_index_name(table, old), hnsw_index_name(table, f"{old}_old")
+                await conn.execute(text(f"ALTER INDEX IF EXISTS {current} RENAME TO {retired}"))
+                await conn.execute(text(f"ALTER INDEX {hnsw_index_name(table, new)} RENAME TO {current}"))
+        await conn.execute(text("DELETE FROM reembed_jobs WHERE name = :name"), {"name": SHADOW_JOB})
+        # Workers switch to the new model when they next load this row
+        await save_job(conn, LIVE_JOB, provider, job["model"])
+        await conn.execute(
+            text("UPDATE reembed_jobs SET last_id = :last_id WHERE name = :name"),
+            {"last_id": watermark, "name": LIVE_JOB},
+        )
+
+    print(
+        f"Swapped: chunks.embedding now holds {job['model']} ({job['dimensions']}-d) vectors. "
+        f"Waiting {settings.EMBEDDING_STATE_TTL_SECONDS:g}s for every worker to switch...",
+        flush=True,
+    )
+    await asyncio.sleep(settings.EMBEDDING_STATE_TTL_SECONDS)
+    await catch_up(args)
+    print(
+        "Set EMBEDDING_MODEL / EMBEDDING_DIMENSIONS / EMBEDDING_SHORT_DIMENSIONS to match at the next deploy; "
+        "run `cleanup` to drop embedding_old (and its indexes, including the original "
+        "ivfflat chunks_embedding_idx) once it is no longer needed."
+    )
+
+
+async def catch_up(args) -> None:
+    async with get_engine().begin() as conn:
+        job = await load_job(conn, LIVE_JOB) if await _jobs_table_exists(conn) else None
+    if job is None:
+        raise SystemExit("Nothing to catch up on: no swap has been recorded")
+    # Re-embeds chunks written since the switch, including by workers that
+    # had already switched; it stops once it reaches the newest chunk
+    done = await run_job(LIVE_JOB, LIVE_PENDING, LIVE_WRITE, job_provider(job), args)
+    print(f"Re-embedded {done} chunks written around the switch")
+
+
+async def cleanup(args) -> None:
+    async with get_engine().begin() as conn:
+        await conn.execute(text(
+            "ALTER TABLE chunks DROP COLUMN IF EXISTS embedding_old, DROP COLUMN IF EXISTS embedding_short_old"
+        ))
+    print("Dropped embedding_old and embedding_short_old with their indexes")
+
+
+async def fill(args) -> None:
+    async with get_engine().begin() as conn:
+        await ensure_jobs_table(conn)
+        live = await load_job(conn, LIVE_JOB)
+        # The model chunks.embedding holds: the swapped-in one, else the settings'
+        provider = job_provider(live) if live is not None else build_embedding_provider()
+        check_dimensions(provider, await vector_width(conn, "embedding"))
+        job = await load_job(conn, FILL_JOB)
+        if job is None or args.restart:
+            await save_job(conn, FILL_JOB, provider, live["model"] if live is not None else settings.EMBEDDING_MODEL)
+    await run_job(FILL_JOB, FILL_PENDING, FILL_WRITE, provider, args)
+
+
+async def _jobs_table_exists(conn) -> bool:
+    return await conn.scalar(text("SELECT to_regclass('reembed_jobs') IS NOT NULL"))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = commands.add_parser("prepare")
+    prepare_parser.add_argument("--provider", choices=["openai", "local"])
+    prepare_parser.add_argument("--model")
+    prepare_parser.add_argument("--dimensions", type=int)
+    prepare_parser.add_argument("--short-dimensions", type=int, help="width of embedding_short (default: current)")
+
+    for name in ("run", "swap", "catch-up", "fill"):
+        command = commands.add_parser(name)
+        command.add_argument("--batch-size", type=int, default=2000, help="rows read and written per batch")
+        command.add_argument("--embed-batch", type=int, default=256, help="texts per embedding call")
+        command.add_argument("--concurrency", type=int, default=8, help="embedding calls in flight")
+        command.add_argument("--max-rows-per-second", type=float, default=0, help="0 = unthrottled")
+        if name not in ("swap", "catch-up"):
+            command.add_argument("--restart", action="store_true", help="ignore saved progress")
+
+    commands.add_parser("cleanup")
+    args = parser.parse_args()
+
+    handlers = {
+        "prepare": prepare, "run": run, "swap": swap, "catch-up": catch_up, "cleanup": cleanup, "fill": fill,
+    }
+    try:
+        await handlers[args.command](args)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
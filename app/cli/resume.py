@@ -0,0 +1,80 @@
+"""
+Resume failed documents from their ingestion checkpoints.
+
+    # Every failed document of one owner
+    python -m app.cli.resume --owner alice
+
+    # Specific documents (looked up on every shard)
+    python -m app.cli.resume --document-id 12 --document-id 40
+
+Chunks committed by earlier attempts are kept; only the remainder is
+embedded, reusing the cached chunk text where it exists.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select
+
+from app.db.session import dispose_engine, get_session_maker, shard_urls
+from app.db.shards import get_shard_router
+from app.models.document import Document
+from app.services.document_service import DocumentService
+from app.services.processing_service import ProcessingService
+
+
+async def failed_document_ids(owner_id: str | None, document_ids: list[int]) -> list[tuple[str, int]]:
+    stmt = select(Document.id).where(Document.status == "failed").order_by(Document.id)
+    if owner_id:
+        stmt = stmt.where(Document.owner_id == owner_id)
+    if document_ids:
+        stmt = stmt.where(Document.id.in_(document_ids))
+    shards = [await get_shard_router().shard_for(owner_id)] if owner_id else list(shard_urls())
+    found = []
+    for shard in shards:
+        async with get_session_maker(shard)() as db:
+            found.extend((shard, document_id) for document_id in (await db.scalars(stmt)).all())
+    return found
+
+
+async def resume_one(shard: str, document_id: int) -> Document | None:
+    async with get_session_maker(shard)() as db:
+        doc = await db.get(Document, document_id)
+        # Another worker may have picked it up since it was listed
+        if doc is None or not await DocumentService(db).reclaim_failed(doc):
+            return None
+        try:
+            await ProcessingService(db).process_document(doc)
+        except Exception:
+            pass
+        return doc
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owner")
+    parser.add_argument("--document-id", type=int, action="append", default=[])
+    args = parser.parse_args()
+
+    if not args.owner and not args.document_id:
+        parser.error("give --owner and/or --document-id")
+
+    ids = await failed_document_ids(args.owner, args.document_id)
+    print(f"Resuming {len(ids)} failed documents")
+
+    ready = 0
+    for shard, document_id in ids:
+        doc = await resume_one(shard, document_id)
+        if doc is None:
+            print(f"[  skipped] doc={document_id}", flush=True)
+            continue
+        ready += doc.status == "ready"
+        suffix = f": {doc.error_message}" if doc.error_message else ""
+        done = 0 if doc.last_chunk_index is None else doc.last_chunk_index + 1
+        print(f"[{doc.status:>9}] doc={document_id} chunks {done}/{doc.chunks_total}{suffix}", flush=True)
+
+    await dispose_engine()
+    print(f"Done: {ready}/{len(ids)} ready")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+"""
+Export a tenant's corpus to a snapshot directory, or import one, without
+re-uploading files or re-paying for embeddings.
+
+    # Ready documents, chunk text and embeddings (float16 halves the size)
+    python -m app.cli.snapshot export --owner acme --output snapshots/acme --dtype float16
+
+    # Load it into this environment, optionally as another tenant
+    python -m app.cli.snapshot import snapshots/acme --owner loadtest-01
+
+Embeddings are one contiguous .npy matrix; documents and chunks are JSON
+lines (see app/utils/snapshot.py). Import memory-maps the matrix and streams
+chunks into Postgres with COPY. Documents the tenant already has (same
+content hash) are skipped. Original files are not part of a snapshot, so
+imported documents cannot be resumed or re-chunked. The same directory loads
+into app.storage.memory_store.MemoryStore for offline analysis.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Iterator
+
+import numpy as np
+from pgvector.asyncpg import register_vector
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.db.session import dispose_engine, get_engine
+from app.db.shards import get_shard_router
+from app.models.chunk import EMBEDDING_DIMENSIONS, EMBEDDING_SHORT_DIMENSIONS, Chunk
+from app.models.document import Document
+from app.models.document_signature import DocumentSignature
+from app.utils.snapshot import EMBEDDING_DTYPES, Snapshot, SnapshotWriter, open_snapshot
+
+DOCUMENTS = Document.__table__
+CHUNKS = Chunk.__table__
+SIGNATURES = DocumentSignature.__table__
+
+COPY_COLUMNS = ("document_id", "owner_id", "chunk_index", "content", "content_hash", "embedding", "embedding_short")
+
+
+def batched(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def export(args) -> None:
+    started = time.perf_counter()
+    engine = get_engine(await get_shard_router().shard_for(args.owner))
+    ready = select(DOCUMENTS.c.id).where(DOCUMENTS.c.owner_id == args.owner, DOCUMENTS.c.status == "ready")
+
+    async with engine.connect() as conn:
+        # One snapshot of the data: the row count sizes the matrix
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            embedded = await conn.scalar(
+                select(func.count()).select_from(CHUNKS).where(
+                    CHUNKS.c.document_id.in_(ready), CHUNKS.c.embedding.is_not(None)
+                )
+            )
+            writer = SnapshotWriter(
+                args.output, args.owner, embedded, EMBEDDING_DIMENSIONS, args.dtype, settings.EMBEDDING_MODEL
+            )
+
+            documents = await conn.execute(
+                select(DOCUMENTS, SIGNATURES.c.signature, SIGNATURES.c.lsh_bands)
+                .outerjoin(SIGNATURES, SIGNATURES.c.document_id == DOCUMENTS.c.id)
+                .where(DOCUMENTS.c.id.in_(ready))
+                .order_by(DOCUMENTS.c.id)
+            )
+            for document in documents.mappings():
+                writer.add_document(dict(document))
+
+            chunks = await conn.stream(
+                select(
+                    CHUNKS.c.document_id, CHUNKS.c.chunk_index, CHUNKS.c.content,
+                    CHUNKS.c.content_hash, CHUNKS.c.embedding,
+                )
+                .where(CHUNKS.c.document_id.in_(ready))
+                .order_by(CHUNKS.c.document_id, CHUNKS.c.chunk_index)
+                .execution_options(yield_per=args.batch_size)
+            )
+            async for partition in chunks.mappings().partitions(args.batch_size):
+                writer.add_chunks([dict(row) for row in partition], [row["embedding"] for row in partition])
+
+    manifest = writer.close()
+    print(
+        f"Exported {manifest['documents']} documents, {manifest['chunks']} chunks "
+        f"({manifest['embedded_chunks']} embedded, {args.dtype}) to {args.output} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def chunk_records(snapshot: Snapshot, document_ids: dict[int, int], owner_id: str) -> Iterator[tuple]:
+    """COPY rows for the chunks of imported documents, vectors read from the memory map."""
+    embeddings = snapshot.embeddings()
+    for chunk in snapshot.chunks():
+        document_id = document_ids.get(chunk["document_id"])
+        if document_id is None:
+            continue
+        embedding = short = None
+        if chunk["row"] is not None:
+            embedding = np.asarray(embeddings[chunk["row"]], dtype=np.float32)
+            # Same Matryoshka prefix ChunkService stores
+            short = embedding[:EMBEDDING_SHORT_DIMENSIONS]
+            short = short / (np.linalg.norm(short) or 1.0)
+        yield (document_id, owner_id, chunk["chunk_index"], chunk["content"], chunk["content_hash"], embedding, short)
+
+
+def document_values(document: dict, owner_id: str) -> dict:
+    chunks_total = document.get("chunks_total")
+    return {
+        "filename": document["filename"],
+        "file_type": document["file_type"],
+        "uploaded_at": datetime.fromisoformat(document["uploaded_at"]),
+        "status": "ready",
+        "content_hash": document["content_hash"],
+        "chunks_total": chunks_total,
+        "last_chunk_index": chunks_total - 1 if chunks_total else None,
+        "owner_id": owner_id,
+    }
+
+
+async def insert_documents(conn, snapshot: Snapshot, owner_id: str) -> dict[int, int]:
+    """Inserts the snapshot's documents; returns snapshot id -> new id for those inserted."""
+    documents = list(snapshot.documents())
+    ids: dict[int, int] = {}
+
+    hashed = [d for d in documents if d["content_hash"]]
+    for batch in batched(hashed, 500):
+        stmt = (
+            pg_insert(DOCUMENTS)
+            .values([document_values(d, owner_id) for d in batch])
+            .on_conflict_do_nothing(constraint="uq_documents_owner_id_content_hash")
+            .returning(DOCUMENTS.c.id, DOCUMENTS.c.content_hash)
+        )
+        inserted = dict((content_hash, new_id) for new_id, content_hash in (await conn.execute(stmt)).all())
+        ids.update({d["id"]: inserted[d["content_hash"]] for d in batch if d["content_hash"] in inserted})
+    # Legacy documents without a content hash cannot conflict
+    for document in documents:
+        if not document["content_hash"]:
+            stmt = pg_insert(DOCUMENTS).values(document_values(document, owner_id)).returning(DOCUMENTS.c.id)
+            ids[document["id"]] = await conn.scalar(stmt)
+
+    near_duplicates = [
+        (ids[d["id"]], ids[d["near_duplicate_of"]])
+        for d in documents
+        if d["id"] in ids and d.get("near_duplicate_of") in ids
+    ]
+    if near_duplicates:
+        await conn.execute(
+            text(
+                "UPDATE documents AS d SET near_duplicate_of = v.target "
+                "FROM unnest(CAST(:ids AS integer[]), CAST(:targets AS integer[])) AS v(id, target) "
+                "WHERE d.id = v.id"
+            ),
+            {"ids": [pair[0] for pair in near_duplicates], "targets": [pair[1] for pair in near_duplicates]},
+        )
+
+    signatures = [
+        {
+            "document_id": ids[d["id"]],
+            "owner_id": owner_id,
+            "signature": bytes.fromhex(d["signature"]),
+            "lsh_bands": d["lsh_bands"],
+        }
+        for d in documents
+        if d["id"] in ids and d.get("signature")
+    ]
+    for batch in batched(signatures, 1000):
+        await conn.execute(pg_insert(SIGNATURES).values(batch).on_conflict_do_nothing())
+    return ids
+
+
+async def import_(args) -> None:
+    started = time.perf_counter()
+    snapshot = open_snapshot(args.path)
+    manifest = snapshot.manifest
+    owner_id = args.owner or manifest["owner_id"]
+
+    if manifest["dimensions"] != EMBEDDING_DIMENSIONS:
+        raise SystemExit(f"Snapshot has {manifest['dimensions']}-d embeddings; chunks.embedding is {EMBEDDING_DIMENSIONS}-d")
+    if manifest["embedding_model"] != settings.EMBEDDING_MODEL and not args.allow_model_mismatch:
+        raise SystemExit(
+            f"Snapshot embeddings come from {manifest['embedding_model']}, this environment queries with "
+            f"{settings.EMBEDDING_MODEL}; pass --allow-model-mismatch to import anyway"
+        )
+
+    engine = get_engine(await get_shard_router().shard_for(owner_id))
+    async with engine.begin() as conn:
+        document_ids = await insert_documents(conn, snapshot, owner_id)
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        await register_vector(driver)
+        await driver.copy_records_to_table(
+            "chunks", records=chunk_records(snapshot, document_ids, owner_id), columns=COPY_COLUMNS
+        )
+        chunks = await conn.scalar(
+            select(func.count()).select_from(CHUNKS).where(CHUNKS.c.document_id.in_(list(document_ids.values())))
+        ) if document_ids else 0
+
+    skipped = manifest["documents"] - len(document_ids)
+    print(
+        f"Imported {len(document_ids)} documents and {chunks} chunks for {owner_id} "
+        f"in {time.perf_counter() - started:.1f}s ({skipped} already present, skipped)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("--owner", required=True)
+    export_parser.add_argument("--output", required=True, help="snapshot directory")
+    export_parser.add_argument("--dtype", choices=EMBEDDING_DTYPES, default="float32")
+    export_parser.add_argument("--batch-size", type=int, default=2000, help="chunks fetched per round trip")
+
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("path", help="snapshot directory")
+    import_parser.add_argument("--owner", help="import as this tenant (default: the exported one)")
+    import_parser.add_argument("--allow-model-mismatch", action="store_true")
+    args = parser.parse_args()
+
+    handlers = {"export": export, "import": import_}
+    try:
+        await handlers[args.command](args)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,4 @@
+from pydantic import ValidationInfo, field_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,10 +8,138 @@ class Settings(BaseSettings):
     CHUNK_OVERLAP_TOKENS: int = 80
     TOKENIZER_MODEL: str = "text-embedding-3-small"
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Tenant sharding: comma-separated name=url pairs (empty = DATABASE_URL
+    # only). The first shard is the primary and holds the tenant_shards
+    # override table. Only ever append: ring positions and id ranges depend
+    # on the order. DB_POOL_SIZE applies per shard.
+    DATABASE_SHARDS: str = ""
+    SHARD_RING_VNODES: int = 64
+    # How long a worker trusts its copy of tenant_shards; the move tool waits
+    # this long between steps so every worker sees each one
+    SHARD_OVERRIDE_TTL_SECONDS: float = 10.0
+    WARMUP_ON_STARTUP: bool = True
+    # Failed warm-up steps are retried in the background, backing off
+    # exponentially from the first delay up to the second
+    WARMUP_RETRY_SECONDS: float = 2.0
+    WARMUP_RETRY_MAX_SECONDS: float = 60.0
+    # Statements slower than this are logged. A sampled fraction of profiled
+    # searches/ingestion writes also get EXPLAIN (ANALYZE, BUFFERS) captured
+    # into an in-memory buffer served at /admin/query-plans.
+    SLOW_QUERY_MS: float = 250.0
+    QUERY_EXPLAIN_SAMPLE_RATE: float = 0.01
+    QUERY_PLAN_BUFFER_SIZE: int = 200
+
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRY_MINUTES: int = 60
     USERS_SEED: str = ""  # "alice:pass1,bob:pass2"
+    ADMIN_USERS: str = ""  # "alice,carol": may use the /admin endpoints
+
+    # Shared across workers: "redis://host:6379/0" (needs the redis package) or
+    # "sqlite:///ratelimit.db" for a single host. "memory://" is per-process.
+    RATE_LIMIT_STORAGE_URI: str = "memory://"
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter"
+
+    OPENAI_BASE_URL: str | None = None
+    OPENAI_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_CONCURRENCY: int = 32
+    OPENAI_MAX_RETRIES: int = 4
+    OPENAI_BACKOFF_BASE_SECONDS: float = 0.5
+    OPENAI_BACKOFF_MAX_SECONDS: float = 20.0
+    # Account tokens-per-minute limit (0 = not enforced here). Ingestion
+    # only uses the budget above OPENAI_INTERACTIVE_RESERVE of it; search
+    # and ask are never held back by it.
+    OPENAI_TOKENS_PER_MINUTE: int = 0
+    OPENAI_INTERACTIVE_RESERVE: float = 0.2
+
+    # "openai" or "local" (offline feature-hashing on CPU). The provider's
+    # dimension must match the chunks.embedding column.
+    EMBEDDING_PROVIDER: str = "openai"
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: int = 1536
+    # Width of Chunk.embedding_short, the Matryoshka prefix of the full vector
+    # searched in the coarse ANN pass. Both widths are column types: a
+    # database created from the models (create_all) gets these widths, the
+    # migrations pin 1536 and 256, and an existing database changes them
+    # through `app.cli.reembed prepare` and `swap`.
+    EMBEDDING_SHORT_DIMENSIONS: int = 256
+    # How often workers re-read the model `app.cli.reembed swap` recorded,
+    # which takes precedence over EMBEDDING_PROVIDER/MODEL/DIMENSIONS
+    EMBEDDING_STATE_TTL_SECONDS: float = 10.0
+    EMBEDDING_BATCH_SIZE: int = 96  # starting point; adapted to throughput
+
+    INGEST_EXTRACT_CONCURRENCY: int = 4
+    INGEST_CHUNK_CONCURRENCY: int = 2
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_WRITE_CONCURRENCY: int = 2
+    INGEST_QUEUE_SIZE: int = 16
+    INGEST_MAX_FILE_BYTES: int = 10 * 1024 * 1024
+    # Per bulk request, counting archive members at their decompressed size
+    INGEST_MAX_FILES: int = 1000
+    INGEST_MAX_TOTAL_BYTES: int = 500 * 1024 * 1024
+    # Chunks embedded and committed per checkpoint in process_document
+    INGEST_CHECKPOINT_CHUNKS: int = 64
+    # An upload of content already being ingested waits this long for the
+    # in-flight document to finish before returning its current status.
+    UPLOAD_ATTACH_WAIT_SECONDS: float = 30.0
+    # An uploaded/processing document whose updated_at is older than this is
+    # presumed abandoned by a crashed worker and may be reclaimed. Must exceed
+    # the longest gap between writes to a document (extraction, one
+    # checkpoint batch, or a pipeline run of one file).
+    INGEST_STALE_SECONDS: float = 30 * 60
+
+    # Uploaded files: content-addressed under STORAGE_ROOT (ab/cd/<sha256>),
+    # gzipped when that saves space. Reads spool to memory up to the limit.
+    STORAGE_BACKEND: str = "content_addressed"
+    STORAGE_ROOT: str = "uploads/objects"
+    STORAGE_COMPRESS: bool = True
+    STORAGE_SPOOL_MAX_MEMORY_BYTES: int = 8 * 1024 * 1024
+
+    # Near-duplicate documents (MinHash over extracted text, per owner) reuse
+    # the earlier document's chunks and only embed the regions that differ.
+    NEAR_DUPLICATE_DETECTION: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.8
+
+    # Document deletion: ids per request on bulk-delete, and documents
+    # deleted per transaction (their chunks go with them)
+    DELETE_MAX_DOCUMENTS: int = 1000
+    DELETE_BATCH_DOCUMENTS: int = 100
+
+    # /ask relevance gate (cosine distance, 0 disables each): chunks farther
+    # than ASK_MAX_DISTANCE are not sent to the LLM, and the ranking stops at
+    # the first jump of more than ASK_MAX_DISTANCE_GAP between neighbours.
+    # With nothing left the question is answered "not found" without a call.
+    ASK_MAX_DISTANCE: float = 0.8
+    ASK_MAX_DISTANCE_GAP: float = 0.15
+
+    # POST /ask/batch: questions per request and answers generated at once
+    ASK_BATCH_MAX_QUESTIONS: int = 100
+    ASK_BATCH_CONCURRENCY: int = 8
+
+    # Filtered search: below this many matching chunks search is exact,
+    # above it the ANN indexes (hnsw, and ivfflat on the full vectors) are
+    # used with iterative scans when pgvector is >= 0.8.
+    EXACT_SEARCH_MAX_CANDIDATES: int = 5000
+    HNSW_ITERATIVE_SCAN: str = "relaxed_order"  # "" disables (ivfflat too)
+    HNSW_MAX_SCAN_TUPLES: int = 20000
+    # Of the ivfflat index's 100 lists
+    IVFFLAT_MAX_PROBES: int = 20
+
+    # Two-stage search: ANN over Chunk.embedding_short, then re-score
+    # top_k * SEARCH_COARSE_CANDIDATES candidates with the full vectors.
+    SEARCH_COARSE_TO_FINE: bool = True
+    SEARCH_COARSE_CANDIDATES: int = 4
+
+    @field_validator("EMBEDDING_SHORT_DIMENSIONS")
+    @classmethod
+    def short_prefix_of_full(cls, value: int, info: ValidationInfo) -> int:
+        full = info.data.get("EMBEDDING_DIMENSIONS")
+        if full is not None and not 0 < value <= full:
+            raise ValueError(f"must be between 1 and EMBEDDING_DIMENSIONS ({full})")
+        return value
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,59 @@
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.config import settings
 from app.core.security import decode_access_token
+from app.db.shards import TenantFrozenError, get_shard_router
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+TENANT_FROZEN_DETAIL = "Tenant data is being moved, retry shortly"
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
-    return decode_access_token(token)
+
+def _tenant_frozen_headers() -> dict[str, str]:
+    # A move between shards is finishing; it takes seconds
+    return {"Retry-After": str(int(settings.SHARD_OVERRIDE_TTL_SECONDS) + 1)}
+
+
+async def tenant_frozen_handler(request: Request, exc: TenantFrozenError) -> JSONResponse:
+    """A request routed before its tenant was frozen, refused at commit."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": TENANT_FROZEN_DETAIL},
+        headers=_tenant_frozen_headers(),
+    )
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> str:
+    user_id = decode_access_token(token)
+    # Lets the rate limiter key on the user without decoding the token again
+    request.state.user_id = user_id
+    return user_id
+
+
+async def get_admin_user(user_id: str = Depends(get_current_user)) -> str:
+    admins = {name.strip() for name in settings.ADMIN_USERS.split(",") if name.strip()}
+    if user_id not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user_id
+
+
+async def get_owner_session_maker(owner_id: str = Depends(get_current_user)) -> async_sessionmaker[AsyncSession]:
+    """Session factory for the shard that holds the caller's data."""
+    try:
+        return await get_shard_router().session_maker_for(owner_id)
+    except TenantFrozenError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=TENANT_FROZEN_DETAIL,
+            headers=_tenant_frozen_headers(),
+        )
+
+
+async def get_owner_db(
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_owner_session_maker),
+) -> AsyncSession:
+    async with session_maker() as session:
+        yield session
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.security import get_user_store
+from app.db.session import dispose_engine, get_engine, shard_urls
+from app.utils.chunking import get_encoding
+from app.utils.embedding_providers import EmbeddingDimensionError, get_embedding_state
+from app.utils.openai_client import close_openai_layer, get_openai_layer
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_db_pool() -> None:
+    async def open_one(shard: str) -> None:
+        async with get_engine(shard).connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Hold pool_size connections per shard at once so they all get opened, not reused
+    await asyncio.gather(*(open_one(shard) for shard in shard_urls() for _ in range(settings.DB_POOL_SIZE)))
+
+
+def _warm_up_steps() -> dict:
+    return {
+        "users": lambda: asyncio.to_thread(get_user_store),
+        "tokenizer": lambda: asyncio.to_thread(get_encoding, settings.TOKENIZER_MODEL),
+        "openai_client": lambda: asyncio.to_thread(get_openai_layer),
+        "embedding_provider": get_embedding_state,
+        "database": _warm_db_pool,
+    }
+
+
+async def warm_up(app: FastAPI, names: list[str] | None = None) -> None:
+    """
+    Pays the one-off costs before the worker takes traffic. Each step is
+    recorded on app.state.readiness for /health/ready; names limits the run
+    to those steps, for retries. An embedding model that does not fit
+    chunks.embedding is also raised: no retry can fix it, so the worker
+    must not start.
+    """
+    steps = _warm_up_steps()
+    if names is not None:
+        steps = {name: steps[name] for name in names}
+
+    async def run(name: str, step) -> None:
+        started = time.perf_counter()
+        try:
+            await step()
+        except EmbeddingDimensionError as e:
+            app.state.readiness[name] = f"failed: {e}"
+            raise
+        except Exception as e:
+            app.state.readiness[name] = f"failed: {e}"
+            logger.warning("warm-up step %s failed: %s", name, e)
+        else:
+            app.state.readiness[name] = "ok"
+            logger.info("warm-up step %s took %.0f ms", name, (time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+    app.state.ready = all(status == "ok" for status in app.state.readiness.values())
+
+
+async def retry_warm_up(app: FastAPI) -> None:
+    # A transient failure (a shard restarting, a tokenizer download timing
+    # out) must not keep /health/ready at 503 for the life of the worker
+    delay = settings.WARMUP_RETRY_SECONDS
+    while not app.state.ready:
+        await asyncio.sleep(delay)
+        failed = [name for name, status in app.state.readiness.items() if status != "ok"]
+        try:
+            await warm_up(app, failed)
+        except EmbeddingDimensionError as e:
+            # The database came back with columns the model does not fit
+            logger.error("warm-up stopped: %s", e)
+            return
+        delay = min(delay * 2, settings.WARMUP_RETRY_MAX_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.readiness = {}
+    retry = None
+    if settings.WARMUP_ON_STARTUP:
+        await warm_up(app)
+        if not app.state.ready:
+            retry = asyncio.create_task(retry_warm_up(app))
+    else:
+        app.state.ready = True
+
+    yield
+
+    app.state.ready = False
+    if retry is not None:
+        retry.cancel()
+        with suppress(asyncio.CancelledError):
+            await retry
+    await close_openai_layer()
+    await dispose_engine()
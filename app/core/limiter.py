@@ -1,4 +1,39 @@
+from fastapi import Request
+from jose import JWTError, jwt
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.core.config import settings
+from app.core import rate_limit_storage  # noqa: F401  registers the sqlite:// scheme
+
+
+def get_rate_limit_key(request: Request) -> str:
+    """
+    Key rate limits on the authenticated user so every client behind the load
+    balancer gets its own budget. Falls back to the remote address for
+    anonymous or invalid requests.
+    """
+    # Set by get_current_user, which runs before the limiter on protected routes
+    user_id = getattr(request.state, "user_id", None)
+    if user_id:
+        return f"user:{user_id}"
+
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            sub = payload.get("sub")
+            if sub:
+                return f"user:{sub}"
+        except JWTError:
+            pass
+
+    return f"ip:{get_remote_address(request)}"
+
+
+limiter = Limiter(
+    key_func=get_rate_limit_key,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+)
@@ -0,0 +1,145 @@
+"""
+File-backed rate limit storage for the `limits` library.
+
+Registers the ``sqlite://`` scheme so ``RATE_LIMIT_STORAGE_URI=sqlite:///path/to/file.db``
+gives every worker on the same host one shared set of counters. It is the local
+stand-in for ``redis://`` in tests and single-host deployments; each acquire is a
+single ``BEGIN IMMEDIATE`` transaction, so the sliding window check-and-increment
+is atomic across processes.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options) -> None:
+        path = uri.split("://", 1)[1] or ":memory:"
+        if path.startswith("/") and path != "/":
+            # sqlite:///relative.db -> "relative.db", sqlite:////abs.db -> "/abs.db"
+            path = path[1:]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=float(options.get("timeout", 5.0)),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _read(self, key: str, now: float) -> tuple[int, float]:
+        row = self._conn.execute(
+            "SELECT count, expires_at FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return 0, now
+        return row[0], row[1]
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        count, expires_at = self._read(key, now)
+        if count == 0:
+            expires_at = now + expiry
+        count += amount
+        self._conn.execute(
+            "INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET count = excluded.count, expires_at = excluded.expires_at",
+            (key, count, expires_at),
+        )
+        return count
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._transaction():
+            return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._read(key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            return self._read(key, time.time())[1]
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM rate_limits")
+            return cursor.rowcount
+
+    def _window_info(self, key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._read(previous_key, now)[0]
+        current_count = self._read(current_key, now)[0]
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction():
+            previous_count, previous_ttl, current_count, _ = self._window_info(key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            # Current window key lives for two windows so it can serve as "previous" next time.
+            self._incr(current_key, 2 * expiry, amount, now)
+            # Opportunistically drop a few expired rows so the table stays small.
+            self._conn.execute(
+                "DELETE FROM rate_limits WHERE rowid IN "
+                "(SELECT rowid FROM rate_limits WHERE expires_at <= ? LIMIT 16)",
+                (now,),
+            )
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        with self._lock:
+            return self._window_info(key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
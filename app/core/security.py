@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
 import bcrypt
@@ -7,16 +8,23 @@ from jose import JWTError, jwt
 
 from app.core.config import settings
 
-# Build user store once at import time from USERS_SEED env var
-USER_STORE: dict[str, bytes] = {}
-if settings.USERS_SEED:
-    for pair in settings.USERS_SEED.split(","):
-        pair = pair.strip()
-        if ":" in pair:
-            username, password = pair.split(":", 1)
-            USER_STORE[username.strip()] = bcrypt.hashpw(
-                password.strip().encode(), bcrypt.gensalt()
-            )
+
+@lru_cache(maxsize=1)
+def get_user_store() -> dict[str, bytes]:
+    """
+    Builds the user store from USERS_SEED on first use. Hashing is slow by
+    design, so the startup warm-up calls this off the event loop.
+    """
+    user_store: dict[str, bytes] = {}
+    if settings.USERS_SEED:
+        for pair in settings.USERS_SEED.split(","):
+            pair = pair.strip()
+            if ":" in pair:
+                username, password = pair.split(":", 1)
+                user_store[username.strip()] = bcrypt.hashpw(
+                    password.strip().encode(), bcrypt.gensalt()
+                )
+    return user_store
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -45,7 +53,7 @@ def decode_access_token(token: str) -> str:
 
 
 def authenticate_user(username: str, password: str) -> Optional[str]:
-    hashed = USER_STORE.get(username)
+    hashed = get_user_store().get(username)
     if not hashed:
         return None
     if not bcrypt.checkpw(password.encode(), hashed):
@@ -0,0 +1,162 @@
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+_ROWS_REMOVED = re.compile(r"Rows Removed by Filter: (\d+)")
+
+
+@dataclass
+class _Scope:
+    label: str
+    tags: dict[str, Any]
+    sampled: bool
+
+
+_scope: ContextVar[_Scope | None] = ContextVar("query_profile_scope", default=None)
+
+
+@dataclass
+class CapturedPlan:
+    label: str
+    tags: dict[str, Any]
+    duration_ms: float
+    statement: str
+    plan: list[str]
+    captured_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def summary(self) -> dict[str, Any]:
+        """The questions a latency spike raises, answered from the plan text."""
+        text = "\n".join(self.plan)
+        return {
+            "index_scan": "Index Scan" in text or "Index Only Scan" in text,
+            "seq_scan": "Seq Scan" in text,
+            "rows_removed_by_filter": sum(int(n) for n in _ROWS_REMOVED.findall(text)),
+        }
+
+
+class QueryProfiler:
+    """
+    Times every statement on an engine and logs those slower than
+    `slow_ms`. Inside a `profile()` scope that is sampled, each statement is
+    also re-run as EXPLAIN (ANALYZE, BUFFERS) on the same connection, and the
+    plan lands in a bounded ring buffer. Statements are explained inside a
+    savepoint that is rolled back, so writes are never applied twice and a
+    failed EXPLAIN does not abort the caller's transaction.
+    """
+
+    def __init__(self, slow_ms: float, sample_rate: float, buffer_size: int):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.plans: deque[CapturedPlan] = deque(maxlen=buffer_size)
+
+    @contextmanager
+    def profile(self, label: str, **tags: Any) -> Iterator[None]:
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        token = _scope.set(_Scope(label=label, tags=tags, sampled=sampled))
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    def install(self, engine: AsyncEngine | Engine) -> None:
+        target = getattr(engine, "sync_engine", engine)
+        event.listen(target, "before_cursor_execute", self._before)
+        event.listen(target, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        # Kept on the statement's own execution context: a statement that
+        # fails never reaches _after, and nothing is left behind on the
+        # pooled connection
+        context._profiler_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        duration_ms = (time.perf_counter() - context._profiler_started) * 1000
+        scope = _scope.get()
+
+        if duration_ms >= self.slow_ms:
+            logger.warning(
+                "slow query %.1f ms [%s %s]: %s",
+                duration_ms,
+                scope.label if scope else "-",
+                scope.tags if scope else {},
+                _shorten(statement),
+            )
+
+        if scope is None or not scope.sampled or not _EXPLAINABLE.match(statement):
+            return
+        try:
+            # For a bulk write, the plan of one row's parameters is representative
+            plan = self._explain(conn, statement, parameters[0] if executemany else parameters)
+        except Exception as e:
+            logger.warning("EXPLAIN capture failed: %s", e)
+            return
+        self.plans.append(CapturedPlan(
+            label=scope.label,
+            tags=dict(scope.tags),
+            duration_ms=round(duration_ms, 3),
+            statement=_shorten(statement, 2000),
+            plan=plan,
+        ))
+
+    def _explain(self, conn, statement: str, parameters) -> list[str]:
+        # A separate cursor keeps the original statement's result intact.
+        # Always inside a savepoint that is rolled back: writes are not
+        # applied twice, and a failed EXPLAIN (timeout, cancel) does not
+        # leave the caller's transaction aborted.
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT query_profiler")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_profiler")
+        finally:
+            cursor.close()
+        return [row[0] for row in rows]
+
+    def snapshot(self, label: str | None = None, owner_id: str | None = None, limit: int = 50) -> list[dict]:
+        captured = []
+        for plan in reversed(self.plans):
+            if label and plan.label != label:
+                continue
+            if owner_id and plan.tags.get("owner_id") != owner_id:
+                continue
+            captured.append({**asdict(plan), "summary": plan.summary()})
+            if len(captured) >= limit:
+                break
+        return captured
+
+
+def _shorten(statement: str, limit: int = 500) -> str:
+    flat = " ".join(statement.split())
+    return flat if len(flat) <= limit else flat[:limit] + "..."
+
+
+_profiler: QueryProfiler | None = None
+
+
+def get_query_profiler() -> QueryProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = QueryProfiler(
+            slow_ms=settings.SLOW_QUERY_MS,
+            sample_rate=settings.QUERY_EXPLAIN_SAMPLE_RATE,
+            buffer_size=settings.QUERY_PLAN_BUFFER_SIZE,
+        )
+    return _profiler
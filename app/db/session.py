@@ -1,9 +1,62 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.db.query_profiler import get_query_profiler
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+PRIMARY_SHARD = "default"
 
-async def get_db() -> AsyncSession:
-    async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+# Built on first use (or by the startup warm-up) rather than at import time,
+# one per shard
+_engines: dict[str, AsyncEngine] = {}
+_session_makers: dict[str, async_sessionmaker[AsyncSession]] = {}
+
+
+def shard_urls() -> dict[str, str]:
+    """Configured shards in order; the first one is the primary."""
+    if not settings.DATABASE_SHARDS.strip():
+        return {PRIMARY_SHARD: settings.DATABASE_URL}
+    shards = {}
+    for entry in settings.DATABASE_SHARDS.split(","):
+        if not entry.strip():
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"DATABASE_SHARDS entry must be name=url, got {entry.strip()!r}")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+def primary_shard() -> str:
+    return next(iter(shard_urls()))
+
+
+def get_engine(shard: str | None = None) -> AsyncEngine:
+    name = shard or primary_shard()
+    engine = _engines.get(name)
+    if engine is None:
+        urls = shard_urls()
+        if name not in urls:
+            raise KeyError(f"Unknown shard {name!r}")
+        engine = _engines[name] = create_async_engine(
+            urls[name],
+            echo=False,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        get_query_profiler().install(engine)
+    return engine
+
+
+def get_session_maker(shard: str | None = None) -> async_sessionmaker[AsyncSession]:
+    name = shard or primary_shard()
+    if name not in _session_makers:
+        _session_makers[name] = async_sessionmaker(get_engine(name), expire_on_commit=False)
+    return _session_makers[name]
+
+
+async def dispose_engine() -> None:
+    engines = list(_engines.values())
+    _engines.clear()
+    _session_makers.clear()
+    for engine in engines:
+        await engine.dispose()
@@ -0,0 +1,147 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import get_engine, get_session_maker, shard_urls
+from app.models.tenant_shard import TenantShard
+
+logger = logging.getLogger(__name__)
+
+
+class TenantFrozenError(Exception):
+    """The tenant is in the final step of a move between shards."""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring with `vnodes` points per shard. Adding a shard only
+    remaps the owners that land on its points (about 1/N of them); every
+    other owner keeps its shard.
+    """
+
+    def __init__(self, shards: list[str], vnodes: int = 64):
+        points = sorted((_hash(f"{shard}#{i}"), shard) for shard in shards for i in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, owner_id: str) -> str:
+        index = bisect.bisect(self._keys, _hash(owner_id)) % len(self._keys)
+        return self._shards[index]
+
+
+@dataclass(frozen=True)
+class Placement:
+    shard: str
+    target_shard: str | None = None
+    state: str = "active"
+
+
+class ShardRouter:
+    """
+    Maps owner_id to a shard: the tenant_shards override on the primary
+    shard if there is one, else the hash ring. Overrides are cached for
+    SHARD_OVERRIDE_TTL_SECONDS. With a single shard there is nothing to look
+    up and every owner goes to it.
+    """
+
+    def __init__(self, shards: list[str], vnodes: int, override_ttl: float):
+        self.shards = shards
+        self.primary = shards[0]
+        self.ring = HashRing(shards, vnodes)
+        self.override_ttl = override_ttl
+        self._overrides: dict[str, Placement] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def placement(self, owner_id: str) -> Placement:
+        if len(self.shards) == 1:
+            return Placement(self.primary)
+        await self._refresh()
+        return self._overrides.get(owner_id) or Placement(self.ring.shard_for(owner_id))
+
+    async def shard_for(self, owner_id: str) -> str:
+        placement = await self.placement(owner_id)
+        if placement.state == "frozen":
+            raise TenantFrozenError(owner_id)
+        return placement.shard
+
+    async def session_maker_for(self, owner_id: str) -> async_sessionmaker[AsyncSession]:
+        shard = await self.shard_for(owner_id)
+        if len(self.shards) == 1:
+            return get_session_maker(shard)
+        # A request can outlive the routing decision: its commits re-check
+        # the placement on the shard itself (see check_tenant_fence)
+        return async_sessionmaker(
+            get_engine(shard), expire_on_commit=False, info={"fence_owner_id": owner_id, "fence_shard": shard}
+        )
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def _refresh(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.override_ttl:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.override_ttl:
+                return
+            try:
+                async with get_session_maker(self.primary)() as db:
+                    rows = (await db.scalars(select(TenantShard))).all()
+            except Exception as e:
+                if self._loaded_at is None:
+                    raise
+                # Keep routing on the last known overrides
+                logger.warning("could not reload tenant_shards: %s", e)
+                self._loaded_at = time.monotonic()
+                return
+            self._overrides = {
+                row.owner_id: Placement(row.shard, row.target_shard, row.state) for row in rows
+            }
+            self._loaded_at = time.monotonic()
+
+
+@event.listens_for(Session, "before_commit")
+def check_tenant_fence(session: Session) -> None:
+    """
+    Refuses to commit a tenant's transaction on a shard the tenant is frozen
+    on or has left. Every shard has a tenant_shards table; a move writes the
+    placement to the source and target shards as well as the primary. The
+    shared row lock makes the move's freeze wait for commits already past
+    this check, and every later commit sees the freeze.
+    """
+    owner_id = session.info.get("fence_owner_id")
+    if owner_id is None:
+        return
+    placement = session.execute(
+        select(TenantShard.shard, TenantShard.state)
+        .where(TenantShard.owner_id == owner_id)
+        .with_for_update(read=True)
+    ).one_or_none()
+    if placement is not None and (placement.state == "frozen" or placement.shard != session.info["fence_shard"]):
+        raise TenantFrozenError(owner_id)
+
+
+_router: ShardRouter | None = None
+
+
+def get_shard_router() -> ShardRouter:
+    global _router
+    if _router is None:
+        _router = ShardRouter(
+            list(shard_urls()),
+            vnodes=settings.SHARD_RING_VNODES,
+            override_ttl=settings.SHARD_OVERRIDE_TTL_SECONDS,
+        )
+    return _router
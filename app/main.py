@@ -2,22 +2,34 @@ from fastapi import FastAPI
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
+from app.api.routes.admin import router as admin_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.health import router as health_router
 from app.api.routes.document import router as document_router
 from app.api.routes.search import router as search_router
 from app.api.routes.ask import router as ask_router
+from app.core.dependencies import tenant_frozen_handler
+from app.core.lifespan import lifespan
 from app.core.limiter import limiter
-from app.middleware.size_limit import RequestSizeLimitMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.db.shards import TenantFrozenError
+from app.middleware.size_limit import DEFAULT_MAX_BYTES, DEFAULT_PATH_LIMITS, RequestSizeLimitMiddleware
 
-app = FastAPI(title="AI Knowledge Assistant API")
+app = FastAPI(title="AI Knowledge Assistant API", lifespan=lifespan)
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(RequestSizeLimitMiddleware)
+app.add_exception_handler(TenantFrozenError, tenant_frozen_handler)
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    default_max_bytes=DEFAULT_MAX_BYTES,
+    path_limits=DEFAULT_PATH_LIMITS,
+)
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(auth_router)
 app.include_router(health_router)
 app.include_router(document_router)
 app.include_router(search_router)
 app.include_router(ask_router)
+app.include_router(admin_router)
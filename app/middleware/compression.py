@@ -0,0 +1,88 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the optional package is installed
+    brotli = None
+
+# Below this a compressed body is barely smaller and costs more CPU than it saves
+DEFAULT_MINIMUM_SIZE = 1024
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding as coding -> q-value, dropping q=0."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Negotiates response compression from Accept-Encoding: br (when the
+    brotli package is available) or gzip, whichever the client ranks higher,
+    preferring br on a tie. Bodies under `minimum_size`, already-encoded
+    responses and event streams pass through untouched (see starlette's
+    GZipMiddleware, whose responders this reuses).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        # Level 4 keeps most of level 6's ratio on JSON at a third of the CPU
+        gzip_level: int = 4,
+        brotli_quality: int = 5,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose(self, accept_encoding: str) -> str | None:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        offers = [("br", accepted.get("br", wildcard))] if brotli is not None else []
+        offers.append(("gzip", accepted.get("gzip", wildcard)))
+        coding, q = max(offers, key=lambda offer: offer[1])
+        return coding if q > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = self.choose(Headers(scope=scope).get("accept-encoding", ""))
+        if coding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+        elif coding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
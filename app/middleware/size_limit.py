@@ -1,31 +1,87 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 UPLOAD_MAX_BYTES = 10 * 1024 * 1024   # 10 MB for /documents/upload
+BULK_UPLOAD_MAX_BYTES = 200 * 1024 * 1024  # 200 MB for /documents/bulk-upload
 DEFAULT_MAX_BYTES = 1 * 1024 * 1024   # 1 MB for all other routes
 
+DEFAULT_PATH_LIMITS = {
+    "/documents/upload": UPLOAD_MAX_BYTES,
+    "/documents/bulk-upload": BULK_UPLOAD_MAX_BYTES,
+}
 
-class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        max_bytes = UPLOAD_MAX_BYTES if request.url.path == "/documents/upload" else DEFAULT_MAX_BYTES
+
+class RequestSizeLimitMiddleware:
+    """
+    Pure ASGI body size limit.
+
+    Rejects on Content-Length before the route runs, otherwise counts bytes
+    as the route consumes them and aborts with 413 once the limit is crossed.
+    Nothing is buffered here.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_max_bytes: int = DEFAULT_MAX_BYTES,
+        path_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.app = app
+        self.default_max_bytes = default_max_bytes
+        self.path_limits = DEFAULT_PATH_LIMITS if path_limits is None else path_limits
+
+    def max_bytes_for(self, path: str) -> int:
+        return self.path_limits.get(path, self.default_max_bytes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.max_bytes_for(scope["path"])
 
         # Fast path: trust Content-Length header when present
-        content_length = request.headers.get("content-length")
-        if content_length is not None:
-            if int(content_length) > max_bytes:
-                return Response(
-                    content="Request body too large",
-                    status_code=413,
-                )
-
-        # Slow path: buffer entire body (BaseHTTPMiddleware caches it so
-        # the route handler can still read it via request.body())
-        body = await request.body()
-        if len(body) > max_bytes:
-            return Response(
-                content="Request body too large",
-                status_code=413,
-            )
-
-        return await call_next(request)
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    await _error_response(400, "Invalid Content-Length")(scope, receive, send)
+                    return
+                if declared > max_bytes:
+                    await _error_response(413, "Request body too large")(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    # Raised inside the route, so ExceptionMiddleware turns it into a 413
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+            await _error_response(413, "Request body too large")(scope, receive, send)
+
+
+def _error_response(status_code: int, content: str) -> PlainTextResponse:
+    return PlainTextResponse(content=content, status_code=status_code)
@@ -1,17 +1,37 @@
-from sqlalchemy import Integer, ForeignKey, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Index, Integer, ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 from pgvector.sqlalchemy import Vector
 
+from app.core.config import settings
 from app.db.base import Base
 
+# Column widths for a database created from the models; migrations pin the
+# widths they were written with, and reembed changes them on a live database
+EMBEDDING_DIMENSIONS = settings.EMBEDDING_DIMENSIONS
+# Matryoshka prefix of the full text-embedding-3 vector, used for the coarse ANN pass
+EMBEDDING_SHORT_DIMENSIONS = settings.EMBEDDING_SHORT_DIMENSIONS
+
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    __table_args__ = (
+        Index("ix_chunks_owner_id_content_hash", "owner_id", "content_hash"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), index=True, nullable=False)
+    document_id: Mapped[int] = mapped_column(
+        ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    # Copied from Document.owner_id so tenant filtering needs no join
+    owner_id: Mapped[str] = mapped_column(String, index=True, nullable=False)
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    embedding: Mapped[list[float] | None] = mapped_column(Vector(1536), nullable=True)
+    # sha256 of content. Within an owner only the first copy stores an embedding.
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    embedding: Mapped[list[float] | None] = mapped_column(Vector(EMBEDDING_DIMENSIONS), nullable=True)
+    embedding_short: Mapped[list[float] | None] = mapped_column(Vector(EMBEDDING_SHORT_DIMENSIONS), nullable=True)
+    # Leading characters of content, filled in by queries that ask for it
+    # (search excerpt mode) so the full text never leaves the database
+    excerpt: Mapped[str | None] = query_expression()
 
     document = relationship("Document", back_populates="chunks")
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, Text
+from sqlalchemy import ForeignKey, String, Integer, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -6,17 +6,38 @@ from app.db.base import Base
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # One document per (owner, content): concurrent uploads of the same
+        # bytes collapse onto a single row
+        UniqueConstraint("owner_id", "content_hash", name="uq_documents_owner_id_content_hash"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     file_type: Mapped[str] = mapped_column(String(50), nullable=False)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped by every write, so each committed checkpoint renews the worker's
+    # lease; an in-flight document left untouched for INGEST_STALE_SECONDS
+    # is taken over by the next upload of its content
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
     
     status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
     content_hash: Mapped[str|None] = mapped_column(String(64), nullable=True, index=True)
     storage_path: Mapped[str|None] = mapped_column(String(1024), nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Ingestion checkpoint: chunks are committed in batches and a retry
+    # resumes after last_chunk_index instead of starting over.
+    chunks_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_chunk_index: Mapped[int | None] = mapped_column(Integer, nullable=True)
     
     owner_id: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    # Earlier document of the same owner whose chunks this one reused
+    near_duplicate_of: Mapped[int | None] = mapped_column(
+        ForeignKey("documents.id", ondelete="SET NULL"), nullable=True
+    )
     
-    chunks = relationship("Chunk", back_populates="document", cascade="all, delete-orphan")
\ No newline at end of file
+    # The database deletes chunks with their document; the ORM never loads
+    # them (embeddings included) just to delete them
+    chunks = relationship("Chunk", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, ForeignKey, Index, LargeBinary, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class DocumentSignature(Base):
+    """
+    MinHash signature of a document's extracted text, with its LSH band keys
+    for finding near-duplicates of the same owner.
+    """
+
+    __tablename__ = "document_signatures"
+    __table_args__ = (
+        Index("ix_document_signatures_lsh_bands", "lsh_bands", postgresql_using="gin"),
+    )
+
+    document_id: Mapped[int] = mapped_column(
+        ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+    )
+    owner_id: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    # NUM_PERMUTATIONS uint32 minima
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    lsh_bands: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StoredFile(Base):
+    """
+    One row per file in the storage backend. ref_count is the number of
+    documents whose storage_path is this key; the file is deleted with the
+    last reference. The storage backend is shared by every shard, so only
+    the primary shard's table is used; documents on any shard count there.
+    """
+
+    __tablename__ = "stored_files"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Storage backend key; set once the bytes are written
+    key: Mapped[str | None] = mapped_column(String(1024), index=True, nullable=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TenantShard(Base):
+    """
+    Shard placement that overrides the hash ring for one owner. Routing reads
+    it on the primary shard. While a tenant is being moved, `target_shard` is
+    set and `state` is "copying" (served from `shard`) and then "frozen"
+    (requests are refused until the move completes). The move also writes
+    the row to the source and target shards, where commits check it.
+    """
+
+    __tablename__ = "tenant_shards"
+
+    owner_id: Mapped[str] = mapped_column(String, primary_key=True)
+    shard: Mapped[str] = mapped_column(String(64), nullable=False)
+    target_shard: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    state: Mapped[str] = mapped_column(String(20), default="active", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
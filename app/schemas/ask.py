@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 
+from app.core.config import settings
+from app.schemas.search import SearchFilters
 
-class AskRequest(BaseModel):
+
+class AskRequest(SearchFilters):
     question: str = Field(..., min_length=1)
     top_k: int = Field(default=5, ge=1, le=20)
 
@@ -19,3 +22,27 @@ class AskResponse(BaseModel):
         excerpt: str
 
     sources: List[Source]
+
+
+class AskBatchRequest(SearchFilters):
+    questions: List[str] = Field(..., min_length=1, max_length=settings.ASK_BATCH_MAX_QUESTIONS)
+    top_k: int = Field(default=5, ge=1, le=20)
+
+    @field_validator("questions")
+    @classmethod
+    def check_questions_not_blank(cls, questions: List[str]) -> List[str]:
+        if any(not question.strip() for question in questions):
+            raise ValueError("questions must not be blank")
+        return questions
+
+
+class AskBatchItem(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    sources: List[AskResponse.Source] = []
+    error: Optional[str] = None
+
+
+class AskBatchResponse(BaseModel):
+    results: List[AskBatchItem]
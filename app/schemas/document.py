@@ -1,8 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List
+
+from app.core.config import settings
 
 class DocumentResponse(BaseModel):
     id: int
     filename: str
     file_type: str
-    uploaded_at: datetime
\ No newline at end of file
+    uploaded_at: datetime
+
+
+class BulkDeleteRequest(BaseModel):
+    document_ids: List[int] = Field(..., min_length=1, max_length=settings.DELETE_MAX_DOCUMENTS)
@@ -1,18 +1,61 @@
-from pydantic import BaseModel, Field
-from typing import List
+from datetime import datetime, timezone
 
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional
 
-class SearchRequest(BaseModel):
+
+class SearchFilters(BaseModel):
+    document_ids: Optional[List[int]] = Field(default=None, min_length=1, max_length=100)
+    file_type: Optional[str] = Field(default=None, min_length=1, max_length=50)
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+    @field_validator("uploaded_after", "uploaded_before")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Document.uploaded_at is naive UTC; asyncpg rejects comparing it with an aware value
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def check_uploaded_range(self):
+        if self.uploaded_after and self.uploaded_before and self.uploaded_after > self.uploaded_before:
+            raise ValueError("uploaded_after must not be later than uploaded_before")
+        return self
+
+    def has_filters(self) -> bool:
+        return any((self.document_ids, self.file_type, self.uploaded_after, self.uploaded_before))
+
+
+SearchResultField = Literal["chunk_id", "document_id", "chunk_index", "content", "distance", "sources"]
+
+
+class SearchRequest(SearchFilters):
     query: str = Field(..., min_length=1)
     top_k: int = Field(default=5, ge=1, le=20)
+    # Result fields to return; all of them by default
+    fields: Optional[List[SearchResultField]] = Field(default=None, min_length=1)
+    # Return only the first N characters of each chunk as `content`
+    excerpt_chars: Optional[int] = Field(default=None, ge=1, le=10_000)
 
 
-class SearchResult(BaseModel):
+class SearchSource(BaseModel):
     chunk_id: int
     document_id: int
     chunk_index: int
-    content: str
-    distance: float
+    filename: str
+
+
+class SearchResult(BaseModel):
+    # Every field is present unless the request narrowed them with `fields`
+    chunk_id: Optional[int] = None
+    document_id: Optional[int] = None
+    chunk_index: Optional[int] = None
+    content: Optional[str] = None
+    distance: Optional[float] = None
+    # Every document containing this exact chunk text (duplicates are collapsed)
+    sources: Optional[List[SearchSource]] = None
 
 
 class SearchResponse(BaseModel):
@@ -0,0 +1,141 @@
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.query_profiler import get_query_profiler
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.utils.embedding_providers import live_short_dimensions
+from app.utils.embeddings import embed_texts, truncate_embedding
+from app.utils.file_storage import sha256_bytes
+from app.utils.upstream_scheduler import Priority, upstream_priority
+
+
+def chunk_content_hash(content: str) -> str:
+    return sha256_bytes(content.encode("utf-8"))
+
+
+class ChunkService:
+    """
+    Chunk writes with per-tenant dedup: within one owner, only the first
+    chunk with a given content_hash stores an embedding. Later copies keep
+    embedding NULL, so they cost no API call and stay out of the ANN index;
+    search maps a hit back to every copy through content_hash, and document
+    filters admit the embedded copy when any copy lies inside them.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def embedded_hashes(self, owner_id: str, hashes: set[str]) -> set[str]:
+        if not hashes:
+            return set()
+        stmt = (
+            select(Chunk.content_hash)
+            .where(
+                Chunk.owner_id == owner_id,
+                Chunk.content_hash.in_(hashes),
+                Chunk.embedding.isnot(None),
+            )
+            .distinct()
+        )
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def build_rows(self, document_id: int, owner_id: str, contents: list[str], start_index: int = 0) -> list[dict]:
+        hashes = [chunk_content_hash(content) for content in contents]
+        already_embedded = await self.embedded_hashes(owner_id, set(hashes))
+
+        to_embed: dict[str, str] = {}
+        for content, content_hash in zip(contents, hashes):
+            if content_hash not in already_embedded and content_hash not in to_embed:
+                to_embed[content_hash] = content
+
+        embeddings = []
+        if to_embed:
+            # Bulk work: queued behind interactive calls, fair-shared per owner
+            with upstream_priority(Priority.INGESTION, tenant=owner_id):
+                embeddings = await embed_texts(list(to_embed.values()))
+        by_hash = dict(zip(to_embed.keys(), embeddings))
+        # The width of embedding_short as of the embedding call's model
+        short_dimensions = live_short_dimensions()
+
+        rows = []
+        for i, (content, content_hash) in enumerate(zip(contents, hashes), start=start_index):
+            # pop: only the first copy of a repeated chunk carries the vector
+            embedding = by_hash.pop(content_hash, None)
+            rows.append({
+                "document_id": document_id,
+                "owner_id": owner_id,
+                "chunk_index": i,
+                "content": content,
+                "content_hash": content_hash,
+                "embedding": embedding,
+                "embedding_short": (
+                    truncate_embedding(embedding, short_dimensions) if embedding is not None else None
+                ),
+            })
+        return rows
+
+    async def insert_rows(self, rows: list[dict]) -> None:
+        if rows:
+            with get_query_profiler().profile("ingest_write", owner_id=rows[0]["owner_id"], rows=len(rows)):
+                await self.db.execute(insert(Chunk), rows)
+
+    async def hand_off_embeddings(self, document_ids: list[int]) -> None:
+        """
+        Call before deleting the chunks of `document_ids`: any embedding those
+        chunks hold for content that also exists in other documents is moved
+        to the oldest surviving copy, so the content stays searchable.
+        """
+        if not document_ids:
+            return
+        stmt = text(
+            """
+            UPDATE chunks AS dup
+            SET embedding = src.embedding, embedding_short = src.embedding_short
+            FROM chunks AS src
+            WHERE src.document_id = ANY(:document_ids)
+              AND src.embedding IS NOT NULL
+              AND dup.owner_id = src.owner_id
+              AND dup.content_hash = src.content_hash
+              AND dup.embedding IS NULL
+              AND dup.id = (
+                  SELECT min(other.id) FROM chunks AS other
+                  WHERE other.owner_id = src.owner_id
+                    AND other.content_hash = src.content_hash
+                    AND other.document_id <> ALL(:document_ids)
+              )
+            """
+        )
+        await self.db.execute(stmt, {"document_ids": list(document_ids)})
+
+    async def sources_for(self, owner_id: str, hashes: set[str], allowed_documents=None) -> dict[str, list[dict]]:
+        """
+        Every chunk (and its ready document) holding one of `hashes`, grouped
+        by hash. `allowed_documents`, a select of document ids, narrows the
+        sources to the documents a filtered search admits.
+        """
+        if not hashes:
+            return {}
+        stmt = (
+            select(Chunk.content_hash, Chunk.id, Chunk.document_id, Chunk.chunk_index, Document.filename)
+            .join(Document, Chunk.document_id == Document.id)
+            .where(
+                Chunk.owner_id == owner_id,
+                Chunk.content_hash.in_(hashes),
+                Document.status == "ready",
+            )
+            .order_by(Chunk.document_id, Chunk.chunk_index)
+        )
+        if allowed_documents is not None:
+            stmt = stmt.where(Chunk.document_id.in_(allowed_documents))
+        result = await self.db.execute(stmt)
+        sources: dict[str, list[dict]] = {}
+        for content_hash, chunk_id, document_id, chunk_index, filename in result.all():
+            sources.setdefault(content_hash, []).append({
+                "chunk_id": chunk_id,
+                "document_id": document_id,
+                "chunk_index": chunk_index,
+                "filename": filename,
+            })
+        return sources
@@ -1,9 +1,48 @@
-from datetime import datetime
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.core.config import settings
+from app.db.session import get_session_maker
+from app.models.chunk import Chunk
 from app.models.document import Document
-from app.utils.file_storage import build_storage_path, save_bytes
+from app.models.stored_file import StoredFile
+from app.services.chunk_service import ChunkService
+from app.utils.file_storage import drop_chunk_cache, get_storage_backend, sha256_bytes
+
+IN_FLIGHT_STATUSES = ("uploaded", "processing")
+
+# Drops one reference per deleted document; rows that reach zero are kept
+# for purge_files, which deletes file and row together under the row lock
+RELEASE_REFERENCES = text(
+    """
+    UPDATE stored_files AS f
+    SET ref_count = f.ref_count - v.n
+    FROM unnest(CAST(:keys AS text[]), CAST(:counts AS integer[])) AS v(key, n)
+    WHERE f.key = v.key
+    RETURNING f.key, f.ref_count
+    """
+)
+
+
+def stored_files_session() -> AsyncSession:
+    # Stored files are shared by every shard, so their reference counts are
+    # kept in one place: the primary's stored_files, next to tenant_shards
+    return get_session_maker()()
+
+
+@dataclass
+class DeletionResult:
+    deleted: list[int] = field(default_factory=list)
+    not_found: list[int] = field(default_factory=list)
+    # Still being ingested; deleting them would race the worker
+    in_progress: list[int] = field(default_factory=list)
+    # Storage keys left without references, for purge_files
+    unreferenced_keys: list[str] = field(default_factory=list)
 
 
 class DocumentService:
@@ -16,20 +55,29 @@ class DocumentService:
         file_type: str,
         owner_id: str,
         content_hash: str | None = None,
-    ) -> Document:
-
-        doc = Document(
-            filename=filename,
-            file_type=file_type,
-            uploaded_at=datetime.utcnow(),
-            status="uploaded",
-            owner_id=owner_id,
-            content_hash=content_hash,
+    ) -> Document | None:
+        """
+        Inserts a new document. Returns None if this owner already has a
+        document with the same content_hash (unique per owner), so concurrent
+        uploads across workers cannot both create one.
+        """
+        stmt = (
+            pg_insert(Document)
+            .values(
+                filename=filename,
+                file_type=file_type,
+                uploaded_at=datetime.utcnow(),
+                status="uploaded",
+                owner_id=owner_id,
+                content_hash=content_hash,
+            )
+            .on_conflict_do_nothing(constraint="uq_documents_owner_id_content_hash")
+            .returning(Document)
         )
-
-        self.db.add(doc)
+        doc = (await self.db.scalars(stmt)).one_or_none()
         await self.db.commit()
-        await self.db.refresh(doc)
+        if doc is not None:
+            await self.db.refresh(doc)
 
         return doc
 
@@ -46,14 +94,222 @@ class DocumentService:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_for_owner(self, document_id: int, owner_id: str) -> Document | None:
+        stmt = select(Document).where(Document.id == document_id, Document.owner_id == owner_id)
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def claim(
+        self,
+        filename: str,
+        file_type: str,
+        owner_id: str,
+        content_hash: str,
+    ) -> tuple[Document, bool]:
+        """
+        Single-flight entry point for an upload. Returns (document, owned):
+        owned=True means the caller must store and process the document;
+        owned=False means another upload of the same content holds it and
+        the caller should attach to it instead of redoing the work.
+        """
+        while True:
+            existing = await self.get_by_owner_and_hash(owner_id=owner_id, content_hash=content_hash)
+            if existing is None:
+                doc = await self.create_document_stub(
+                    filename=filename,
+                    file_type=file_type,
+                    owner_id=owner_id,
+                    content_hash=content_hash,
+                )
+                if doc is not None:
+                    return doc, True
+                # Lost the insert race; read the winner's document
+                continue
+
+            if existing.status == "failed" and await self.reclaim_failed(existing):
+                return existing, True
+            if existing.status in IN_FLIGHT_STATUSES and await self.reclaim_stale(existing):
+                return existing, True
+            return existing, False
+
+    async def reclaim_failed(self, doc: Document) -> bool:
+        """
+        Moves a failed document back to "uploaded" so it can be retried.
+        Only one concurrent caller wins the conditional update.
+        """
+        result = await self.db.execute(
+            update(Document)
+            .where(Document.id == doc.id, Document.status == "failed")
+            .values(status="uploaded", error_message=None)
+        )
+        await self.db.commit()
+        if result.rowcount == 0:
+            return False
+        await self.db.refresh(doc)
+        return True
+
+    async def reclaim_stale(self, doc: Document) -> bool:
+        """
+        Takes over an in-flight document whose worker stopped writing to it
+        for INGEST_STALE_SECONDS, moving it back to "uploaded". The update
+        only matches the updated_at this caller read, so a live worker's
+        next checkpoint or a concurrent reclaim makes it a no-op.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.INGEST_STALE_SECONDS)
+        if doc.status not in IN_FLIGHT_STATUSES or doc.updated_at >= stale_before:
+            return False
+        result = await self.db.execute(
+            update(Document)
+            .where(
+                Document.id == doc.id,
+                Document.status.in_(IN_FLIGHT_STATUSES),
+                Document.updated_at == doc.updated_at,
+            )
+            .values(status="uploaded", error_message=None)
+        )
+        await self.db.commit()
+        if result.rowcount == 0:
+            return False
+        await self.db.refresh(doc)
+        return True
+
+    async def wait_until_settled(self, doc: Document, timeout: float, interval: float = 0.5) -> Document:
+        """
+        Polls an in-flight document until it is ready/failed or the timeout
+        passes, then returns it with its latest status.
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while doc.status in IN_FLIGHT_STATUSES and asyncio.get_running_loop().time() < deadline:
+            # End the read transaction so the pooled connection goes back
+            # while sleeping; a retry storm of attached uploads must not
+            # drain the pool (doc is not expired: expire_on_commit=False)
+            await self.db.commit()
+            await asyncio.sleep(interval)
+            await self.db.refresh(doc)
+        return doc
+
     async def save_file(self, doc: Document, original_filename: str, content: bytes) -> None:
         """
-        Saves file to disk and updates storage_path.
+        Stores the file through the storage backend, takes a reference on it
+        on the primary and updates storage_path. The stored_files row stays
+        locked while the bytes are written, so a concurrent purge of the same
+        content, from any shard, cannot delete the file underneath this upload.
         """
-        storage_path = build_storage_path(doc.id, original_filename)
-        save_bytes(storage_path, content)
+        if doc.storage_path:
+            # A retried document already holds its reference
+            return
 
-        doc.storage_path = storage_path
+        content_hash = sha256_bytes(content)
+        async with stored_files_session() as files:
+            await files.execute(
+                pg_insert(StoredFile)
+                .values(content_hash=content_hash, size_bytes=len(content), ref_count=1)
+                .on_conflict_do_update(
+                    index_elements=[StoredFile.content_hash],
+                    set_={"ref_count": StoredFile.ref_count + 1},
+                )
+            )
+            key = await get_storage_backend().put(content)
+            await files.execute(
+                update(StoredFile).where(StoredFile.content_hash == content_hash).values(key=key)
+            )
+            await files.commit()
 
+        # Failing from here on leaves a reference no document holds: the
+        # file is kept for good rather than deleted while in use
+        doc.storage_path = key
         await self.db.commit()
         await self.db.refresh(doc)
+
+    async def delete_documents(self, owner_id: str, document_ids: list[int]) -> DeletionResult:
+        """
+        Deletes the owner's documents with set-based statements, at most
+        DELETE_BATCH_DOCUMENTS per transaction: no chunk (or embedding) is
+        loaded into the session. Stored files are only dereferenced here, on
+        the primary once the batch has committed, so a failure in between
+        keeps a file rather than losing one; pass result.unreferenced_keys to
+        purge_files, typically after the
+        response is sent.
+        """
+        result = DeletionResult()
+        requested = list(dict.fromkeys(document_ids))
+        found = dict(
+            (await self.db.execute(
+                select(Document.id, Document.status)
+                .where(Document.owner_id == owner_id, Document.id.in_(requested))
+            )).all()
+        )
+        result.not_found = [doc_id for doc_id in requested if doc_id not in found]
+        candidates = [doc_id for doc_id in requested if doc_id in found]
+
+        batch_size = settings.DELETE_BATCH_DOCUMENTS
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            # Locks the batch's rows: a concurrent reclaim or resume waits and
+            # then finds nothing to update
+            rows = (await self.db.execute(
+                select(Document.id, Document.storage_path)
+                .where(
+                    Document.id.in_(batch),
+                    Document.owner_id == owner_id,
+                    Document.status.not_in(IN_FLIGHT_STATUSES),
+                )
+                .with_for_update()
+            )).all()
+            ids = [doc_id for doc_id, _ in rows]
+            locked = set(ids)
+            result.in_progress.extend(doc_id for doc_id in batch if doc_id not in locked)
+            if not ids:
+                await self.db.rollback()
+                continue
+
+            await ChunkService(self.db).hand_off_embeddings(ids)
+            await self.db.execute(delete(Chunk).where(Chunk.document_id.in_(ids)))
+            # Signatures cascade; near_duplicate_of pointers are set to NULL
+            await self.db.execute(delete(Document).where(Document.id.in_(ids)))
+
+            await self.db.commit()
+            result.deleted.extend(ids)
+
+            references = Counter(path for _, path in rows if path)
+            if references:
+                async with stored_files_session() as files:
+                    released = dict(
+                        (await files.execute(
+                            RELEASE_REFERENCES,
+                            {"keys": list(references), "counts": list(references.values())},
+                        )).all()
+                    )
+                    await files.commit()
+                # Files stored before reference counting have no row and
+                # belonged to the deleted document alone
+                result.unreferenced_keys.extend(
+                    key for key in references if released.get(key, 0) <= 0
+                )
+
+        return result
+
+    async def purge_files(self, keys: list[str], document_ids: list[int] = ()) -> None:
+        """
+        Deletes stored files left unreferenced by delete_documents, plus any
+        chunk cache of the deleted documents. A key that gained a reference
+        in the meantime (the same content uploaded again) is kept.
+        """
+        backend = get_storage_backend()
+        async with stored_files_session() as files:
+            for key in keys:
+                stored = (
+                    await files.scalars(select(StoredFile).where(StoredFile.key == key).with_for_update())
+                ).one_or_none()
+                if stored is not None and stored.ref_count > 0:
+                    await files.rollback()
+                    continue
+                # Under the row lock: a concurrent save_file of the same
+                # content waits and then writes the file again
+                await backend.delete(key)
+                if stored is not None:
+                    await files.delete(stored)
+                await files.commit()
+
+        for document_id in document_ids:
+            drop_chunk_cache(document_id)
@@ -0,0 +1,223 @@
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Awaitable, Callable, Iterable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.chunk_service import ChunkService
+from app.services.document_service import DocumentService
+from app.services.near_duplicate_service import NearDuplicateService
+from app.utils.chunking import chunk_text_by_tokens
+from app.utils.file_storage import drop_chunk_cache, get_storage_backend, save_chunk_cache, sha256_bytes
+from app.utils.text_extraction import extract_text
+
+
+@dataclass
+class FileResult:
+    filename: str
+    document_id: int | None = None
+    status: str = "queued"
+    deduplicated: bool = False
+    chunks: int = 0
+    error: str | None = None
+
+
+@dataclass
+class _Job:
+    result: FileResult
+    doc: Document
+    text: str = ""
+    chunks: list[str] = field(default_factory=list)
+    rows: list[dict] = field(default_factory=list)
+
+
+ProgressCallback = Callable[[FileResult], Awaitable[None] | None]
+
+
+class IngestionPipeline:
+    """
+    Ingests many files for one owner as an overlapping pipeline:
+
+        intake (dedupe, stub, store) -> extract -> chunk -> embed -> bulk write
+
+    Stages are connected by bounded queues and each runs its own pool of
+    workers, so extraction of file N+1 overlaps with embedding of file N.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        owner_id: str,
+        extract_concurrency: int | None = None,
+        chunk_concurrency: int | None = None,
+        embed_concurrency: int | None = None,
+        write_concurrency: int | None = None,
+        queue_size: int | None = None,
+        on_progress: ProgressCallback | None = None,
+    ):
+        self.session_maker = session_maker
+        self.owner_id = owner_id
+        self.extract_concurrency = extract_concurrency or settings.INGEST_EXTRACT_CONCURRENCY
+        self.chunk_concurrency = chunk_concurrency or settings.INGEST_CHUNK_CONCURRENCY
+        self.embed_concurrency = embed_concurrency or settings.INGEST_EMBED_CONCURRENCY
+        self.write_concurrency = write_concurrency or settings.INGEST_WRITE_CONCURRENCY
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.on_progress = on_progress
+
+    async def _report(self, result: FileResult, status: str) -> None:
+        result.status = status
+        if self.on_progress is not None:
+            maybe_awaitable = self.on_progress(result)
+            if maybe_awaitable is not None:
+                await maybe_awaitable
+
+    async def _fail(self, job: _Job, error: Exception) -> None:
+        job.result.error = str(error)
+        async with self.session_maker() as db:
+            # Chunked text survives in the cache, so a resume skips extraction
+            await db.execute(
+                update(Document)
+                .where(Document.id == job.doc.id)
+                .values(
+                    status="failed",
+                    error_message=str(error),
+                    chunks_total=len(job.chunks) if job.chunks else None,
+                    last_chunk_index=None,
+                )
+            )
+            await db.commit()
+        await self._report(job.result, "failed")
+
+    async def _intake(self, files: Iterable[tuple[str, bytes]], results: list[FileResult], outbox: asyncio.Queue) -> None:
+        seen_hashes: dict[str, FileResult] = {}
+        async with self.session_maker() as db:
+            document_service = DocumentService(db)
+            for filename, content in files:
+                result = FileResult(filename=filename)
+                results.append(result)
+                content_hash = sha256_bytes(content)
+
+                duplicate = seen_hashes.get(content_hash)
+                if duplicate is not None:
+                    result.document_id = duplicate.document_id
+                    result.deduplicated = True
+                    await self._report(result, duplicate.status)
+                    continue
+
+                doc, owned = await document_service.claim(
+                    filename=filename,
+                    file_type=filename.split(".")[-1],
+                    owner_id=self.owner_id,
+                    content_hash=content_hash,
+                )
+                if not owned:
+                    result.document_id = doc.id
+                    result.deduplicated = True
+                    await self._report(result, doc.status)
+                    continue
+
+                await document_service.save_file(doc, filename, content)
+                result.document_id = doc.id
+                seen_hashes[content_hash] = result
+                await self._report(result, "uploaded")
+                await outbox.put(_Job(result=result, doc=doc))
+
+    async def _extract(self, job: _Job) -> None:
+        if not job.doc.storage_path:
+            raise ValueError("storage_path is null; file not stored")
+        with await get_storage_backend().spool(job.doc.storage_path) as source:
+            job.text = await asyncio.to_thread(extract_text, source, job.doc.file_type)
+        await self._report(job.result, "extracted")
+
+    async def _chunk(self, job: _Job) -> None:
+        chunker = partial(
+            chunk_text_by_tokens,
+            chunk_size_tokens=settings.CHUNK_SIZE_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+        )
+        async with self.session_maker() as db:
+            job.chunks = await NearDuplicateService(db).chunk(job.doc, job.text, chunker)
+            await db.commit()
+        job.text = ""
+        if not job.chunks:
+            raise ValueError("No extractable text found")
+        await asyncio.to_thread(save_chunk_cache, job.doc.id, job.chunks)
+        await self._report(job.result, "chunked")
+
+    async def _embed(self, job: _Job) -> None:
+        # Chunks this owner already has embedded elsewhere are not re-embedded
+        async with self.session_maker() as db:
+            job.rows = await ChunkService(db).build_rows(job.doc.id, self.owner_id, job.chunks)
+        await self._report(job.result, "embedded")
+
+    async def _write(self, job: _Job) -> None:
+        async with self.session_maker() as db:
+            await ChunkService(db).insert_rows(job.rows)
+            await db.execute(
+                update(Document)
+                .where(Document.id == job.doc.id)
+                .values(
+                    status="ready",
+                    error_message=None,
+                    chunks_total=len(job.chunks),
+                    last_chunk_index=len(job.chunks) - 1,
+                )
+            )
+            await db.commit()
+        drop_chunk_cache(job.doc.id)
+        job.result.chunks = len(job.chunks)
+        job.chunks, job.rows = [], []
+        await self._report(job.result, "ready")
+
+    async def _stage(
+        self,
+        handler: Callable[[_Job], Awaitable[None]],
+        workers: int,
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue | None,
+        next_workers: int,
+    ) -> None:
+        async def worker() -> None:
+            while True:
+                job = await inbox.get()
+                if job is None:
+                    return
+                try:
+                    await handler(job)
+                except Exception as e:
+                    await self._fail(job, e)
+                    continue
+                if outbox is not None:
+                    await outbox.put(job)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            for _ in range(next_workers):
+                await outbox.put(None)
+
+    async def run(self, files: Iterable[tuple[str, bytes]]) -> list[FileResult]:
+        extract_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        chunk_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        embed_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        write_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        results: list[FileResult] = []
+
+        async def intake() -> None:
+            try:
+                await self._intake(files, results, extract_q)
+            finally:
+                for _ in range(self.extract_concurrency):
+                    await extract_q.put(None)
+
+        await asyncio.gather(
+            intake(),
+            self._stage(self._extract, self.extract_concurrency, extract_q, chunk_q, self.chunk_concurrency),
+            self._stage(self._chunk, self.chunk_concurrency, chunk_q, embed_q, self.embed_concurrency),
+            self._stage(self._embed, self.embed_concurrency, embed_q, write_q, self.write_concurrency),
+            self._stage(self._write, self.write_concurrency, write_q, None, 0),
+        )
+        return results
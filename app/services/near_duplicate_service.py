@@ -0,0 +1,103 @@
+import asyncio
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.models.document_signature import DocumentSignature
+from app.utils.minhash import align_chunks, estimated_similarity, lsh_bands, minhash_signature
+
+# Band collisions checked exactly per lookup; more than this many is a sign
+# of templated documents, and the first ones are as good as any
+MAX_CANDIDATES = 50
+
+
+class NearDuplicateService:
+    """
+    Per-owner near-duplicate index over extracted text. A document whose
+    MinHash similarity to an earlier ready document of the same owner reaches
+    NEAR_DUPLICATE_THRESHOLD is chunked by reusing that document's chunks
+    wherever they still occur, so only the regions that changed produce new
+    chunk text (and new embeddings). Reused chunks keep their content_hash
+    and carry no vector of their own; searches filtered to the new document
+    reach them through the earlier copy's embedding.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def store(self, document_id: int, owner_id: str, signature: np.ndarray, bands: list[int]) -> None:
+        stmt = pg_insert(DocumentSignature).values(
+            document_id=document_id,
+            owner_id=owner_id,
+            signature=signature.tobytes(),
+            lsh_bands=bands,
+        )
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[DocumentSignature.document_id],
+            set_={"signature": stmt.excluded.signature, "lsh_bands": stmt.excluded.lsh_bands},
+        ))
+
+    async def find(
+        self,
+        document_id: int,
+        owner_id: str,
+        signature: np.ndarray,
+        bands: list[int],
+    ) -> tuple[int, float] | None:
+        """Most similar ready document of the owner at or above the threshold."""
+        stmt = (
+            select(DocumentSignature.document_id, DocumentSignature.signature)
+            .join(Document, Document.id == DocumentSignature.document_id)
+            .where(
+                DocumentSignature.owner_id == owner_id,
+                DocumentSignature.document_id != document_id,
+                DocumentSignature.lsh_bands.overlap(bands),
+                Document.status == "ready",
+            )
+            .limit(MAX_CANDIDATES)
+        )
+        result = await self.db.execute(stmt)
+
+        best = None
+        for candidate_id, candidate_signature in result.all():
+            similarity = estimated_similarity(signature, np.frombuffer(candidate_signature, dtype=np.uint32))
+            if similarity >= settings.NEAR_DUPLICATE_THRESHOLD and (best is None or similarity > best[1]):
+                best = (candidate_id, similarity)
+        return best
+
+    async def chunk(self, doc: Document, text: str, chunker: Callable[[str], list[str]]) -> list[str]:
+        """
+        Chunks `text` for `doc`, reusing a near-duplicate's chunks when one
+        exists, and records the signature and `near_duplicate_of`. The
+        caller commits.
+        """
+        if not settings.NEAR_DUPLICATE_DETECTION:
+            return await asyncio.to_thread(chunker, text)
+
+        signature = await asyncio.to_thread(minhash_signature, text)
+        bands = lsh_bands(signature)
+        await self.store(doc.id, doc.owner_id, signature, bands)
+
+        match = await self.find(doc.id, doc.owner_id, signature, bands)
+        near_duplicate_of = None
+        if match is None:
+            chunks = await asyncio.to_thread(chunker, text)
+        else:
+            near_duplicate_of = match[0]
+            previous = await self.db.scalars(
+                select(Chunk.content)
+                .where(Chunk.document_id == near_duplicate_of)
+                .order_by(Chunk.chunk_index)
+            )
+            chunks, _reused = await asyncio.to_thread(align_chunks, text, list(previous.all()), chunker)
+
+        await self.db.execute(
+            update(Document).where(Document.id == doc.id).values(near_duplicate_of=near_duplicate_of)
+        )
+        return chunks
@@ -1,20 +1,71 @@
+from functools import partial
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import delete
 
 from app.core.config import settings
 from app.models.document import Document
 from app.models.chunk import Chunk
+from app.services.chunk_service import ChunkService
+from app.services.near_duplicate_service import NearDuplicateService
 from app.utils.text_extraction import extract_text
 from app.utils.chunking import chunk_text_by_tokens
-from app.utils.embeddings import embed_text
+from app.utils.file_storage import drop_chunk_cache, get_storage_backend, load_chunk_cache, save_chunk_cache
 
 
 
 class ProcessingService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.chunks = ChunkService(db)
+
+    async def _load_checkpoint(self, doc: Document) -> tuple[list[str], int] | None:
+        """
+        Chunked text and the next chunk_index to embed, if an earlier attempt
+        left a usable checkpoint for this document.
+        """
+        if doc.chunks_total is None or not doc.storage_path:
+            return None
+        chunks = load_chunk_cache(doc.id)
+        if chunks is None or len(chunks) != doc.chunks_total:
+            return None
+        start = 0 if doc.last_chunk_index is None else doc.last_chunk_index + 1
+        return chunks, start
+
+    async def _start_fresh(self, doc: Document, chunk_size_tokens: int | None, overlap_tokens: int | None) -> list[str]:
+        with await get_storage_backend().spool(doc.storage_path) as source:
+            text = extract_text(source, doc.file_type)
+        chunker = partial(chunk_text_by_tokens, chunk_size_tokens=chunk_size_tokens or settings.CHUNK_SIZE_TOKENS, overlap_tokens=overlap_tokens or settings.CHUNK_OVERLAP_TOKENS)
+        if chunk_size_tokens is None and overlap_tokens is None:
+            # Default chunking: a near-duplicate's chunks can be reused as-is
+            chunks = await NearDuplicateService(self.db).chunk(doc, text, chunker)
+        else:
+            chunks = chunker(text)
+
+        await self.chunks.hand_off_embeddings([doc.id])
+        await self.db.execute(delete(Chunk).where(Chunk.document_id == doc.id))
+
+        if chunks:
+            save_chunk_cache(doc.id, chunks)
+        doc.chunks_total = len(chunks)
+        doc.last_chunk_index = None
+        await self.db.commit()
+        return chunks
 
-    async def process_document(self, doc: Document, chunk_size_tokens: int | None = None, overlap_tokens: int | None = None) -> None:
+    async def process_document(
+        self,
+        doc: Document,
+        chunk_size_tokens: int | None = None,
+        overlap_tokens: int | None = None,
+        resume: bool = True,
+    ) -> None:
+        """
+        Extracts, chunks and embeds a document, committing every
+        INGEST_CHECKPOINT_CHUNKS chunks together with last_chunk_index.
+        With resume=True a document that failed part-way continues from its
+        checkpoint, reusing the cached chunk text instead of re-extracting.
+        Explicit chunking parameters always start over.
+        """
 
         doc.status = "processing"
         doc.error_message = None
@@ -25,14 +76,24 @@ class ProcessingService:
             if not doc.storage_path:
                 raise ValueError("storage_path is null; file not stored")
 
-            text = extract_text(doc.storage_path, doc.file_type)
-            chunks = chunk_text_by_tokens(text, chunk_size_tokens=chunk_size_tokens or settings.CHUNK_SIZE_TOKENS, overlap_tokens=overlap_tokens or settings.CHUNK_OVERLAP_TOKENS)
+            checkpoint = None
+            if resume and chunk_size_tokens is None and overlap_tokens is None:
+                checkpoint = await self._load_checkpoint(doc)
 
-            await self.db.execute(delete(Chunk).where(Chunk.document_id == doc.id))
+            if checkpoint is not None:
+                chunks, start = checkpoint
+            else:
+                chunks, start = await self._start_fresh(doc, chunk_size_tokens, overlap_tokens), 0
 
-            for i, content in enumerate(chunks):
-                embedding = await embed_text(content)
-                self.db.add(Chunk(document_id=doc.id, chunk_index=i, content=content, embedding=embedding))
+            step = settings.INGEST_CHECKPOINT_CHUNKS
+            for batch_start in range(start, len(chunks), step):
+                batch = chunks[batch_start:batch_start + step]
+                rows = await self.chunks.build_rows(doc.id, doc.owner_id, batch, start_index=batch_start)
+                await self.chunks.insert_rows(rows)
+                # Rows and checkpoint commit together, so a retry never
+                # sees half a batch
+                doc.last_chunk_index = batch_start + len(batch) - 1
+                await self.db.commit()
 
             doc.status = "ready" if chunks else "failed"
             if not chunks:
@@ -40,8 +101,10 @@ class ProcessingService:
 
             await self.db.commit()
             await self.db.refresh(doc)
+            drop_chunk_cache(doc.id)
 
         except Exception as e:
+            await self.db.rollback()
             doc.status = "failed"
             doc.error_message = str(e)
             await self.db.commit()
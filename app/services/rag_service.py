@@ -1,20 +1,72 @@
+import asyncio
 import re
+
+from app.core.config import settings
+from app.schemas.search import SearchFilters
+from app.services.relevance_gate import BELOW_THRESHOLD, get_relevance_gate
 from app.services.retrieval_service import RetrievalService
-from app.utils.llm import generate_answer
+from app.utils.llm import NOT_FOUND_ANSWER, generate_answer
 
 
 class RAGService:
     def __init__(self, db):
         self.retrieval = RetrievalService(db)
 
-    async def ask(self, question: str, owner_id: str, top_k: int = 5):
+    async def ask(self, question: str, owner_id: str, top_k: int = 5, filters: SearchFilters | None = None):
 
         results = await self.retrieval.search(
             query=question,
             owner_id=owner_id,
-            top_k=top_k
+            top_k=top_k,
+            filters=filters,
+        )
+
+        return await self._answer(question, results)
+
+    async def ask_many(
+        self,
+        questions: list[str],
+        owner_id: str,
+        top_k: int = 5,
+        filters: SearchFilters | None = None,
+        concurrency: int | None = None,
+    ) -> list[dict]:
+        """
+        Answers several questions with shared retrieval (see
+        RetrievalService.search_many) and at most `concurrency` answer
+        generations in flight. Results are in input order; a failed
+        generation yields an item with `error` set instead of failing the batch.
+        """
+        results_per_question = await self.retrieval.search_many(
+            queries=questions,
+            owner_id=owner_id,
+            top_k=top_k,
+            filters=filters,
         )
 
+        semaphore = asyncio.Semaphore(concurrency or settings.ASK_BATCH_CONCURRENCY)
+
+        async def answer_one(index: int, question: str, results) -> dict:
+            async with semaphore:
+                try:
+                    answered = await self._answer(question, results)
+                except Exception as e:
+                    return {"index": index, "question": question, "answer": None, "sources": [], "error": str(e)}
+            return {"index": index, "question": question, **answered, "error": None}
+
+        return await asyncio.gather(*(
+            answer_one(i, question, results)
+            for i, (question, results) in enumerate(zip(questions, results_per_question))
+        ))
+
+    async def _answer(self, question: str, results) -> dict:
+        results, decision = get_relevance_gate().apply(results)
+        if decision == BELOW_THRESHOLD:
+            # What the model says for unrelated context, without asking it
+            return {
+                "answer": NOT_FOUND_ANSWER,
+                "sources": []
+            }
         if not results:
             return {
                 "answer": "No relevant information found.",
@@ -24,7 +76,7 @@ class RAGService:
         context_blocks = []
         sources_by_citation = {}
 
-        for i, (chunk, filename, _distance) in enumerate(results, start=1):
+        for i, (chunk, filename, _distance, _sources) in enumerate(results, start=1):
             context_blocks.append(
                 f"[{i}] (chunk_id={chunk.id}, document_id={chunk.document_id}, filename={filename}, chunk_index={chunk.chunk_index})\n{chunk.content}"
             )
@@ -0,0 +1,75 @@
+from collections import Counter
+from typing import Any, List, Sequence
+
+from app.core.config import settings
+
+# Decisions counted per question
+ANSWERED = "answered"
+NO_RESULTS = "no_results"
+BELOW_THRESHOLD = "below_threshold"
+
+
+class RelevanceGate:
+    """
+    Decides which retrieved chunks are worth sending to the LLM. Results
+    (ranked by distance, nearest first) farther than `max_distance` are
+    dropped, and the ranking is cut at the first step between neighbours
+    larger than `max_gap`: a cluster of close matches followed by a jump
+    means the rest are about something else. Either check is off at 0.
+
+    When nothing is left the caller answers "not found" without a
+    completion call. Decisions and dropped chunks are counted in-process
+    and exposed through /admin/answer-gate.
+    """
+
+    def __init__(self, max_distance: float, max_gap: float):
+        self.max_distance = max_distance
+        self.max_gap = max_gap
+        self.decisions: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+
+    def apply(self, results: Sequence[tuple]) -> tuple[List[tuple], str]:
+        """Returns (kept results, decision) for (chunk, filename, distance, sources) results."""
+        if not results:
+            self.decisions[NO_RESULTS] += 1
+            return [], NO_RESULTS
+
+        kept = list(results)
+        if self.max_distance > 0:
+            kept = [result for result in kept if result[2] <= self.max_distance]
+            self.dropped["distance"] += len(results) - len(kept)
+
+        if self.max_gap > 0:
+            for i in range(1, len(kept)):
+                if kept[i][2] - kept[i - 1][2] > self.max_gap:
+                    self.dropped["gap"] += len(kept) - i
+                    kept = kept[:i]
+                    break
+
+        decision = ANSWERED if kept else BELOW_THRESHOLD
+        self.decisions[decision] += 1
+        return kept, decision
+
+    def snapshot(self) -> dict[str, Any]:
+        asked = sum(self.decisions.values())
+        return {
+            "max_distance": self.max_distance,
+            "max_gap": self.max_gap,
+            "decisions": {name: self.decisions[name] for name in (ANSWERED, NO_RESULTS, BELOW_THRESHOLD)},
+            "chunks_dropped": {name: self.dropped[name] for name in ("distance", "gap")},
+            # Share of questions answered without a completion call
+            "skipped_ratio": round((asked - self.decisions[ANSWERED]) / asked, 4) if asked else 0.0,
+        }
+
+
+_gate: RelevanceGate | None = None
+
+
+def get_relevance_gate() -> RelevanceGate:
+    global _gate
+    if _gate is None:
+        _gate = RelevanceGate(
+            max_distance=settings.ASK_MAX_DISTANCE,
+            max_gap=settings.ASK_MAX_DISTANCE_GAP,
+        )
+    return _gate
@@ -1,39 +1,307 @@
+import logging
+import re
 from typing import List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, func, literal, or_, select, text, union_all
+from sqlalchemy.orm import aliased, defer, with_expression
+from app.core.config import settings
+from app.db.query_profiler import get_query_profiler
 from app.models.chunk import Chunk
 from app.models.document import Document
-from app.utils.embeddings import embed_text
+from app.schemas.search import SearchFilters
+from app.services.chunk_service import ChunkService
+from app.utils.embedding_providers import live_short_dimensions
+from app.utils.embeddings import embed_text, embed_texts, truncate_embedding
+
+logger = logging.getLogger(__name__)
+
+# Database URL -> whether its pgvector has iterative index scans (>= 0.8);
+# older versions reject the settings outright
+_iterative_scan_support: dict[str, bool] = {}
 
 
 class RetrievalService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    def _allowed_documents(self, owner_id: str, filters: SearchFilters | None):
+        """Ids of the owner's documents the filters admit, or None when nothing is filtered."""
+        if filters is None or not filters.has_filters():
+            return None
+
+        document_conditions = [Document.owner_id == owner_id]
+        if filters.document_ids:
+            document_conditions.append(Document.id.in_(filters.document_ids))
+        if filters.file_type:
+            document_conditions.append(func.lower(Document.file_type) == filters.file_type.lower())
+        if filters.uploaded_after:
+            document_conditions.append(Document.uploaded_at >= filters.uploaded_after)
+        if filters.uploaded_before:
+            document_conditions.append(Document.uploaded_at <= filters.uploaded_before)
+        return select(Document.id).where(*document_conditions)
+
+    def _conditions(self, owner_id: str, allowed_documents) -> list:
+        conditions = [
+            Chunk.owner_id == owner_id,
+            Chunk.embedding.isnot(None),
+        ]
+        if allowed_documents is None:
+            return conditions
+
+        # Only the first copy of shared content carries the vector, and it may
+        # sit in a document the filters exclude: the embedded copy qualifies
+        # when any document the filters admit holds the same content.
+        copy = aliased(Chunk)
+        conditions.append(
+            or_(
+                Chunk.document_id.in_(allowed_documents),
+                Chunk.content_hash.in_(
+                    select(copy.content_hash)
+                    .where(copy.owner_id == owner_id, copy.document_id.in_(allowed_documents))
+                ),
+            )
+        )
+        return conditions
+
+    async def _count_candidates(self, conditions: list, cap: int) -> int:
+        # Bounded: stops reading as soon as it knows the set is "large"
+        capped = select(Chunk.id).where(*conditions).limit(cap + 1).subquery()
+        return await self.db.scalar(select(func.count()).select_from(capped))
+
+    async def _supports_iterative_scan(self) -> bool:
+        key = str(self.db.get_bind().url)
+        if key not in _iterative_scan_support:
+            version = await self.db.scalar(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+            supported = tuple(int(part) for part in re.findall(r"\d+", version or "")[:2]) >= (0, 8)
+            if not supported:
+                logger.warning(
+                    "pgvector %s has no iterative index scans; filtered searches may return fewer than top_k",
+                    version,
+                )
+            _iterative_scan_support[key] = supported
+        return _iterative_scan_support[key]
+
+    async def _enable_iterative_scan(self) -> None:
+        if not settings.HNSW_ITERATIVE_SCAN or not await self._supports_iterative_scan():
+            return
+        # Both index types: the full vectors use ivfflat (hnsw once chunks is
+        # partitioned), embedding_short uses hnsw. ivfflat only has
+        # relaxed_order; results are re-sorted by distance either way.
+        # is_local=true: lasts until the session's transaction ends
+        await self.db.execute(
+            text(
+                "SELECT set_config('hnsw.iterative_scan', :mode, true), "
+                "set_config('hnsw.max_scan_tuples', :max_tuples, true), "
+                "set_config('ivfflat.iterative_scan', 'relaxed_order', true), "
+                "set_config('ivfflat.max_probes', :max_probes, true)"
+            ),
+            {
+                "mode": settings.HNSW_ITERATIVE_SCAN,
+                "max_tuples": str(settings.HNSW_MAX_SCAN_TUPLES),
+                "max_probes": str(settings.IVFFLAT_MAX_PROBES),
+            },
+        )
+
     async def search(
         self,
         query: str,
         owner_id: str,
-        top_k: int = 5
-    ) -> List[Tuple[Chunk, str, float]]:
+        top_k: int = 5,
+        filters: SearchFilters | None = None,
+        excerpt_chars: int | None = None,
+        with_sources: bool = True,
+    ) -> List[Tuple[Chunk, str, float, List[dict]]]:
+        """
+        Returns (chunk, filename, distance, sources) rows. Hits with identical
+        content are collapsed into one row; `sources` lists every chunk and
+        document holding that content (only the hit itself when
+        `with_sources` is false). With `excerpt_chars`, `chunk.content` is not
+        loaded and `chunk.excerpt` holds its first `excerpt_chars` characters.
+        """
 
         query_embedding = await embed_text(query)
+        with get_query_profiler().profile("search", owner_id=owner_id, top_k=top_k):
+            groups = await self._nearest([query_embedding], owner_id, top_k, filters, excerpt_chars)
+        return (await self._collapse_many(owner_id, groups, with_sources, filters))[0]
+
+    async def search_many(
+        self,
+        queries: List[str],
+        owner_id: str,
+        top_k: int = 5,
+        filters: SearchFilters | None = None,
+    ) -> List[List[Tuple[Chunk, str, float, List[dict]]]]:
+        """
+        `search` for several queries sharing one owner and filter set: one
+        embedding call, one k-NN round trip (a UNION ALL of per-query index
+        scans) and one sources lookup. Results are in input order.
+        """
+        query_embeddings = await embed_texts(queries, batch_size=len(queries))
+        with get_query_profiler().profile("search", owner_id=owner_id, top_k=top_k, queries=len(queries)):
+            groups = await self._nearest(query_embeddings, owner_id, top_k, filters)
+        return await self._collapse_many(owner_id, groups, filters=filters)
+
+    async def _nearest(
+        self,
+        query_embeddings: List[List[float]],
+        owner_id: str,
+        top_k: int,
+        filters: SearchFilters | None,
+        excerpt_chars: int | None = None,
+    ) -> List[list]:
+        allowed_documents = self._allowed_documents(owner_id, filters)
+        conditions = self._conditions(owner_id, allowed_documents)
+
+        # The search path depends only on the filters, so it is decided once
+        # for all queries
+        exact = False
+        if allowed_documents is not None:
+            cap = settings.EXACT_SEARCH_MAX_CANDIDATES
+            exact = await self._count_candidates(conditions, cap) <= cap
 
+        candidates = None
+        if exact:
+            # Small filtered set: score every candidate. MATERIALIZED keeps the
+            # planner from pushing the ORDER BY into the ANN index.
+            candidates = (
+                select(Chunk.id, Chunk.embedding)
+                .where(*conditions)
+                .cte("candidates")
+                .prefix_with("MATERIALIZED")
+            )
+        else:
+            await self._enable_iterative_scan()
+
+        branches = [
+            self._nearest_select(query_embedding, conditions, top_k, candidates)
+            .add_columns(literal(i, Integer).label("query_index"))
+            for i, query_embedding in enumerate(query_embeddings)
+        ]
+        nearest = (branches[0] if len(branches) == 1 else union_all(*branches)).subquery()
+
+        # Only the top_k winners are joined to documents for their filename;
+        # re-sorting also fixes relaxed_order output from iterative scans.
+        stmt = select(Chunk, Document.filename, nearest.c.distance, nearest.c.query_index).select_from(nearest)
+        if allowed_documents is None:
+            stmt = stmt.join(Chunk, Chunk.id == nearest.c.id)
+        else:
+            # A hit is shown as its first copy inside the filtered documents
+            # (itself when it is one), not as an excluded document's copy
+            hit, copy = aliased(Chunk), aliased(Chunk)
+            shown = (
+                select(copy.id)
+                .where(
+                    copy.owner_id == owner_id,
+                    copy.content_hash == hit.content_hash,
+                    copy.document_id.in_(allowed_documents),
+                )
+                .order_by((copy.id == hit.id).desc(), copy.document_id, copy.chunk_index)
+                .limit(1)
+                .correlate(hit)
+                .scalar_subquery()
+            )
+            stmt = (
+                stmt.join(hit, hit.id == nearest.c.id)
+                .join(Chunk, Chunk.id == func.coalesce(shown, hit.id))
+            )
         stmt = (
-            select(
-                Chunk,
-                Document.filename,
-                Chunk.embedding.cosine_distance(query_embedding).label("distance")
+            stmt.join(Document, Chunk.document_id == Document.id)
+            .order_by(nearest.c.query_index, nearest.c.distance)
+            # Results never need the vectors: ~8 KB per row left in the database
+            .options(defer(Chunk.embedding), defer(Chunk.embedding_short))
+        )
+        if excerpt_chars:
+            stmt = stmt.options(
+                defer(Chunk.content),
+                with_expression(Chunk.excerpt, func.left(Chunk.content, excerpt_chars)),
             )
-            .join(Document, Chunk.document_id == Document.id)
-            .where(
-                Chunk.embedding.isnot(None),
-                Document.owner_id == owner_id
+
+        result = await self.db.execute(stmt)
+        groups: List[list] = [[] for _ in query_embeddings]
+        for chunk, filename, distance, query_index in result.all():
+            groups[query_index].append((chunk, filename, distance))
+        return groups
+
+    def _nearest_select(self, query_embedding: List[float], conditions: list, top_k: int, candidates=None):
+        """(id, distance) of the top_k chunks for one query embedding."""
+        if candidates is not None:
+            distance = candidates.c.embedding.cosine_distance(query_embedding)
+            return (
+                select(candidates.c.id, distance.label("distance"))
+                .order_by(distance)
+                .limit(top_k)
             )
-            .order_by(Chunk.embedding.cosine_distance(query_embedding))
+
+        if settings.SEARCH_COARSE_TO_FINE:
+            # Coarse ANN over the short Matryoshka vectors (smaller index, fewer
+            # pages touched), then exact re-scoring of the survivors at full size.
+            short_query = truncate_embedding(query_embedding, live_short_dimensions())
+            coarse_distance = Chunk.embedding_short.cosine_distance(short_query)
+            coarse = (
+                select(Chunk.id)
+                .where(*conditions, Chunk.embedding_short.isnot(None))
+                .order_by(coarse_distance)
+                .limit(top_k * settings.SEARCH_COARSE_CANDIDATES)
+                .subquery()
+            )
+            distance = Chunk.embedding.cosine_distance(query_embedding)
+            return (
+                select(Chunk.id, distance.label("distance"))
+                .join(coarse, Chunk.id == coarse.c.id)
+                .order_by(distance)
+                .limit(top_k)
+            )
+
+        # Broad or no filter: ANN on chunks alone; iterative scans keep
+        # walking the index until top_k rows survive the filters.
+        distance = Chunk.embedding.cosine_distance(query_embedding)
+        return (
+            select(Chunk.id, distance.label("distance"))
+            .where(*conditions)
+            .order_by(distance)
             .limit(top_k)
         )
 
-        result = await self.db.execute(stmt)
+    async def _collapse_duplicates(self, owner_id: str, rows) -> List[Tuple[Chunk, str, float, List[dict]]]:
+        return (await self._collapse_many(owner_id, [rows]))[0]
+
+    async def _collapse_many(
+        self,
+        owner_id: str,
+        groups: List[list],
+        with_sources: bool = True,
+        filters: SearchFilters | None = None,
+    ) -> List[List[Tuple[Chunk, str, float, List[dict]]]]:
+        bests = []
+        for rows in groups:
+            best: dict = {}
+            for chunk, filename, distance in rows:
+                key = chunk.content_hash or ("chunk", chunk.id)
+                if key not in best:
+                    best[key] = (chunk, filename, distance)
+            bests.append(best)
+
+        # One sources lookup for every group
+        hashes = {
+            chunk.content_hash
+            for best in bests
+            for chunk, _, _ in best.values()
+            if chunk.content_hash
+        } if with_sources else set()
+        sources = await ChunkService(self.db).sources_for(
+            owner_id, hashes, self._allowed_documents(owner_id, filters)
+        )
 
-        return result.all()
+        collapsed_groups = []
+        for best in bests:
+            collapsed = []
+            for chunk, filename, distance in best.values():
+                chunk_sources = sources.get(chunk.content_hash) or [{
+                    "chunk_id": chunk.id,
+                    "document_id": chunk.document_id,
+                    "chunk_index": chunk.chunk_index,
+                    "filename": filename,
+                }]
+                collapsed.append((chunk, filename, distance, chunk_sources))
+            collapsed_groups.append(collapsed)
+        return collapsed_groups
@@ -1 +1,79 @@
-documents_store = {}
\ No newline at end of file
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.utils.snapshot import Snapshot, open_snapshot
+
+# Rows scored per block, so a float16 matrix is never upcast all at once
+SEARCH_BLOCK_ROWS = 65536
+
+
+class MemoryStore:
+    """
+    A tenant snapshot (see app.cli.snapshot) loaded for offline analysis:
+    documents and chunk text in memory, the embedding matrix memory-mapped,
+    and exact cosine search over it. Nothing touches the database.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.manifest = snapshot.manifest
+        self.owner_id: str = snapshot.manifest["owner_id"]
+        self.documents: dict[int, dict[str, Any]] = {d["id"]: d for d in snapshot.documents()}
+        self.chunks: list[dict[str, Any]] = list(snapshot.chunks())
+        self.embeddings: np.ndarray = snapshot.embeddings()
+        # Matrix row -> its chunk
+        self._row_chunks = np.full(len(self.embeddings), -1, dtype=np.int64)
+        self._chunks_by_document: dict[int, list[int]] = defaultdict(list)
+        for position, chunk in enumerate(self.chunks):
+            if chunk["row"] is not None:
+                self._row_chunks[chunk["row"]] = position
+            self._chunks_by_document[chunk["document_id"]].append(position)
+        self._norms: np.ndarray | None = None
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MemoryStore":
+        return cls(open_snapshot(path))
+
+    def document_chunks(self, document_id: int) -> list[dict[str, Any]]:
+        return [self.chunks[position] for position in self._chunks_by_document.get(document_id, [])]
+
+    def search(
+        self,
+        query_embedding: list[float] | np.ndarray,
+        top_k: int = 5,
+        document_ids: list[int] | None = None,
+    ) -> list[tuple[dict[str, Any], float]]:
+        """(chunk, cosine distance) pairs, nearest first, like RetrievalService."""
+        if not len(self.embeddings):
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        scores = np.empty(len(self.embeddings), dtype=np.float32)
+        for start in range(0, len(self.embeddings), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        scores /= self._row_norms()
+
+        if document_ids is not None:
+            wanted = set(document_ids)
+            allowed = np.array([self.chunks[c]["document_id"] in wanted for c in self._row_chunks], dtype=bool)
+            scores[~allowed] = -np.inf
+
+        k = min(top_k, int(np.isfinite(scores).sum()))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.chunks[self._row_chunks[row]], float(1.0 - scores[row])) for row in best]
+
+    def _row_norms(self) -> np.ndarray:
+        if self._norms is None:
+            norms = np.empty(len(self.embeddings), dtype=np.float32)
+            for start in range(0, len(self.embeddings), SEARCH_BLOCK_ROWS):
+                block = np.asarray(self.embeddings[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+            self._norms = np.where(norms == 0, 1.0, norms)
+        return self._norms
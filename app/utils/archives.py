@@ -0,0 +1,149 @@
+import io
+import lzma
+import tarfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from pathlib import PurePosixPath
+from typing import IO, Callable, Iterable, Iterator
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+SUPPORTED_FILE_TYPES = {"txt", "pdf"}
+# What zipfile/tarfile and their codecs raise on corrupt or truncated input
+# (gzip and bz2 raise OSError)
+CORRUPT_ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error, lzma.LZMAError, OSError)
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(name: str) -> bool:
+    path = PurePosixPath(name)
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower().lstrip(".") in SUPPORTED_FILE_TYPES
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+class ArchiveLimitError(ArchiveError):
+    pass
+
+
+@contextmanager
+def _corrupt_as_archive_error(filename: str):
+    try:
+        yield
+    except CORRUPT_ARCHIVE_ERRORS as e:
+        raise ArchiveError(f"{filename} is not a readable archive: {e}") from e
+
+
+def _entries(archive: zipfile.ZipFile | tarfile.TarFile, max_member_bytes: int) -> Iterator[tuple[str, int, Callable[[], IO[bytes]]]]:
+    # (name, decompressed size, opener) from the headers; nothing is inflated
+    # until the member is read. zipfile and tarfile never read past the
+    # declared size, so the sizes are safe to budget on.
+    if isinstance(archive, zipfile.ZipFile):
+        for info in archive.infolist():
+            if info.is_dir() or not _wanted(info.filename) or info.file_size > max_member_bytes:
+                continue
+            yield info.filename, info.file_size, lambda info=info: archive.open(info)
+        return
+
+    for member in archive:
+        if not member.isfile() or not _wanted(member.name) or member.size > max_member_bytes:
+            continue
+        yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+
+def _open(filename: str, content: bytes) -> zipfile.ZipFile | tarfile.TarFile:
+    if filename.lower().endswith(".zip"):
+        return zipfile.ZipFile(io.BytesIO(content))
+    return tarfile.open(fileobj=io.BytesIO(content), mode="r:*")
+
+
+def archive_totals(filename: str, content: bytes, max_member_bytes: int) -> tuple[int, int]:
+    """
+    Returns (member count, decompressed bytes) of the supported files that
+    iter_archive_members would yield, read from the headers only.
+    """
+    with _corrupt_as_archive_error(filename), _open(filename, content) as archive:
+        sizes = [size for _, size, _ in _entries(archive, max_member_bytes)]
+    return len(sizes), sum(sizes)
+
+
+def verify_archive(filename: str, content: bytes, max_member_bytes: int, block: int = 1024 * 1024) -> None:
+    """
+    Inflates every member iter_archive_members would yield, a block at a
+    time, so checksum and truncation errors surface as ArchiveError before
+    ingestion starts. Check the totals first: this does the full
+    decompression work.
+    """
+    with _corrupt_as_archive_error(filename), _open(filename, content) as archive:
+        for _, _, open_member in _entries(archive, max_member_bytes):
+            with open_member() as member:
+                while member.read(block):
+                    pass
+
+
+def check_ingest_limits(members: int, total_bytes: int, max_members: int | None, max_total_bytes: int | None) -> None:
+    if max_members is not None and members > max_members:
+        raise ArchiveLimitError(f"{members} files exceed the limit of {max_members}")
+    if max_total_bytes is not None and total_bytes > max_total_bytes:
+        raise ArchiveLimitError(f"{total_bytes} decompressed bytes exceed the limit of {max_total_bytes}")
+
+
+def iter_archive_members(
+    filename: str,
+    content: bytes,
+    max_member_bytes: int,
+    max_members: int | None = None,
+    max_total_bytes: int | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Yields (member name, bytes) for every supported file in a zip or tar archive,
+    inflating one member at a time. Members larger than max_member_bytes are
+    skipped; ArchiveLimitError is raised before anything is yielded when the
+    archive holds more than max_members files or max_total_bytes in total, and
+    ArchiveError when it turns out to be corrupt.
+    """
+    with _corrupt_as_archive_error(filename), _open(filename, content) as archive:
+        entries = list(_entries(archive, max_member_bytes))
+        check_ingest_limits(len(entries), sum(size for _, size, _ in entries), max_members, max_total_bytes)
+        for name, _, open_member in entries:
+            with open_member() as member:
+                data = member.read()
+            yield name, data
+
+
+def upload_totals(uploads: Iterable[tuple[str, bytes]], max_member_bytes: int) -> tuple[int, int]:
+    """
+    Returns (file count, bytes) that expand_uploads would feed to ingestion,
+    counting archive members at their decompressed size.
+    """
+    members = total_bytes = 0
+    for filename, content in uploads:
+        count, size = archive_totals(filename, content, max_member_bytes) if is_archive(filename) else (1, len(content))
+        members += count
+        total_bytes += size
+    return members, total_bytes
+
+
+def verify_uploads(uploads: Iterable[tuple[str, bytes]], max_member_bytes: int) -> None:
+    for filename, content in uploads:
+        if is_archive(filename):
+            verify_archive(filename, content, max_member_bytes)
+
+
+def expand_uploads(uploads: Iterable[tuple[str, bytes]], max_member_bytes: int) -> Iterator[tuple[str, bytes]]:
+    """
+    Lazily yields plain uploads as-is and the members of archives, so only the
+    files the pipeline is currently taking in are held decompressed.
+    """
+    for filename, content in uploads:
+        if is_archive(filename):
+            yield from iter_archive_members(filename, content, max_member_bytes)
+        else:
+            yield filename, content
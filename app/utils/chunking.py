@@ -1,6 +1,17 @@
+from functools import lru_cache
+
 import tiktoken
 
 
+@lru_cache(maxsize=8)
+def get_encoding(model: str = "text-embedding-3-small") -> tiktoken.Encoding:
+    """Loads the BPE once per process; the startup warm-up calls this early."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
 def chunk_text_by_tokens(
     text: str,
     chunk_size_tokens: int = 500,
@@ -18,10 +29,7 @@ def chunk_text_by_tokens(
     if overlap_tokens >= chunk_size_tokens:
         raise ValueError("overlap_tokens must be smaller than chunk_size_tokens")
 
-    try:
-        enc = tiktoken.encoding_for_model(model)
-    except KeyError:
-        enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoding(model)
 
     token_ids = enc.encode(text)
     if not token_ids:
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import re
+import time
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import get_engine
+from app.utils.openai_client import get_openai_layer
+
+logger = logging.getLogger(__name__)
+
+# Width of each vector column; pgvector keeps it as the type modifier
+COLUMN_WIDTHS = text(
+    """
+    SELECT
+        max(atttypmod) FILTER (WHERE attname = 'embedding') AS dimensions,
+        max(atttypmod) FILTER (WHERE attname = 'embedding_short') AS short_dimensions
+    FROM pg_attribute
+    WHERE attrelid = 'chunks'::regclass
+    """
+)
+# Recorded by `app.cli.reembed swap`: the model chunks.embedding holds now
+LIVE_MODEL = text("SELECT provider, model, dimensions FROM reembed_jobs WHERE name = 'live'")
+
+
+class EmbeddingProvider(ABC):
+    name: str
+    dimensions: int
+    # Largest batch a single embed() call may receive
+    max_batch_size: int
+
+    @abstractmethod
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+    max_batch_size = 2048
+
+    def __init__(self, model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        # text-embedding-3 models can shorten their output natively
+        kwargs = {"dimensions": self.dimensions} if self.model.startswith("text-embedding-3") else {}
+        return await get_openai_layer().create_embeddings(model=self.model, inputs=texts, **kwargs)
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature: str, dimensions: int) -> tuple[int, float]:
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dimensions, 1.0 if (h >> 31) & 1 else -1.0
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local CPU embeddings with no model download: signed feature hashing of
+    word unigrams and bigrams, log-scaled and L2-normalized. A whole batch is
+    scattered into one numpy matrix. Text with no tokens gets a fixed unit
+    vector, since a zero vector has no cosine distance to anything. Quality is lexical rather than semantic,
+    but it is fully offline and deterministic, which is what air-gapped runs
+    and load tests need.
+    """
+
+    name = "local"
+    max_batch_size = 4096
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> list[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed_sync(self, texts: list[str]) -> list[list[float]]:
+        rows: list[int] = []
+        cols: list[int] = []
+        signs: list[float] = []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = _bucket(feature, self.dimensions)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), signs)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        empty = ~matrix.any(axis=1)
+        matrix[empty, 0] = 1.0
+        return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).tolist()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        # CPU-bound: keep it off the event loop
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+
+class EmbeddingDimensionError(ValueError):
+    pass
+
+
+def check_dimensions(provider: EmbeddingProvider, column_dimensions: int) -> None:
+    if provider.dimensions != column_dimensions:
+        raise EmbeddingDimensionError(
+            f"Embedding provider '{provider.name}' produces {provider.dimensions}-d vectors "
+            f"but chunks.embedding is vector({column_dimensions})"
+        )
+
+
+def build_embedding_provider(
+    provider: str | None = None,
+    model: str | None = None,
+    dimensions: int | None = None,
+) -> EmbeddingProvider:
+    """Builds the configured provider; arguments override settings (used by the re-embed CLI)."""
+    provider = provider or settings.EMBEDDING_PROVIDER
+    model = model or settings.EMBEDDING_MODEL
+    dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+    if provider == "openai":
+        return OpenAIEmbeddingProvider(model, dimensions)
+    if provider == "local":
+        return HashingEmbeddingProvider(dimensions)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
+
+
+_provider: EmbeddingProvider | None = None
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """The provider the EMBEDDING_* settings describe; EmbeddingState checks it against the catalog."""
+    global _provider
+    if _provider is None:
+        _provider = build_embedding_provider()
+    return _provider
+
+
+class EmbeddingState:
+    """
+    The provider and short-vector width that match chunks as they are now.
+    Once `app.cli.reembed swap` has recorded a model, it wins over the
+    EMBEDDING_* settings, so every worker follows a swap on its own; the
+    state is reloaded every EMBEDDING_STATE_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.provider: EmbeddingProvider | None = None
+        self.short_dimensions: int | None = None
+        self._key: tuple | None = None
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> "EmbeddingState":
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self
+            try:
+                await self._load()
+            except Exception as e:
+                if self._loaded_at is None:
+                    raise
+                # Keep embedding with the last known model
+                logger.warning("could not reload the embedding state: %s", e)
+            self._loaded_at = time.monotonic()
+        return self
+
+    async def _load(self) -> None:
+        async with get_engine().connect() as conn:
+            widths = (await conn.execute(COLUMN_WIDTHS)).one()
+            live = None
+            if await conn.scalar(text("SELECT to_regclass('reembed_jobs') IS NOT NULL")):
+                live = (await conn.execute(LIVE_MODEL)).one_or_none()
+
+        key = tuple(live) if live is not None else None
+        if self.provider is None or key != self._key:
+            provider = build_embedding_provider(*key) if key is not None else get_embedding_provider()
+            if self.provider is not None:
+                logger.info("embedding model switched to %s (%s-d)", provider.name, provider.dimensions)
+            self.provider, self._key = provider, key
+        check_dimensions(self.provider, widths.dimensions)
+        self.short_dimensions = widths.short_dimensions
+
+
+_state: EmbeddingState | None = None
+
+
+async def get_embedding_state() -> EmbeddingState:
+    global _state
+    if _state is None:
+        _state = EmbeddingState(settings.EMBEDDING_STATE_TTL_SECONDS)
+    return await _state.refresh()
+
+
+def live_short_dimensions() -> int:
+    """Width of chunks.embedding_short as last loaded; the model's until then."""
+    if _state is not None and _state.short_dimensions is not None:
+        return _state.short_dimensions
+    from app.models.chunk import EMBEDDING_SHORT_DIMENSIONS
+
+    return EMBEDDING_SHORT_DIMENSIONS
@@ -1,11 +1,74 @@
-from openai import AsyncOpenAI
+import math
+import time
+
 from app.core.config import settings
+from app.utils.embedding_providers import get_embedding_provider, get_embedding_state
+
+
+class AdaptiveBatchSizer:
+    """
+    Hill-climbs the batch size on observed throughput: keeps doubling (or
+    halving) while items/second improves and reverses direction when it drops.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 2048):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(initial, maximum))
+        self._factor = 2.0
+        self._last_throughput: float | None = None
+
+    def record(self, items: int, seconds: float) -> None:
+        # Short tail batches say nothing about the current size
+        if items < self.size or seconds <= 0:
+            return
+        throughput = items / seconds
+        if self._last_throughput is not None and throughput < self._last_throughput * 0.95:
+            self._factor = 1 / self._factor
+        self._last_throughput = throughput
+        self.size = max(self.minimum, min(self.maximum, round(self.size * self._factor)))
+
+
+_batch_sizer: AdaptiveBatchSizer | None = None
+
+
+def get_batch_sizer() -> AdaptiveBatchSizer:
+    global _batch_sizer
+    if _batch_sizer is None:
+        _batch_sizer = AdaptiveBatchSizer(
+            settings.EMBEDDING_BATCH_SIZE,
+            maximum=get_embedding_provider().max_batch_size,
+        )
+    return _batch_sizer
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 async def embed_text(text: str) -> list[float]:
-    response = await client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text,
-    )
-    return response.data[0].embedding
+    embeddings = await (await get_embedding_state()).provider.embed([text])
+    return embeddings[0]
+
+
+async def embed_texts(texts: list[str], batch_size: int | None = None) -> list[list[float]]:
+    provider = (await get_embedding_state()).provider
+    sizer = None if batch_size else get_batch_sizer()
+    embeddings: list[list[float]] = []
+    start = 0
+    while start < len(texts):
+        size = batch_size or sizer.size
+        batch = texts[start:start + size]
+        started = time.perf_counter()
+        embeddings.extend(await provider.embed(batch))
+        if sizer is not None:
+            sizer.record(len(batch), time.perf_counter() - started)
+        start += len(batch)
+    return embeddings
+
+
+def truncate_embedding(embedding: list[float], dimensions: int) -> list[float]:
+    """
+    Matryoshka truncation: text-embedding-3 vectors keep most of their meaning
+    in the leading dimensions, so the re-normalized prefix is equivalent to
+    asking the API for `dimensions` directly.
+    """
+    head = embedding[:dimensions]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
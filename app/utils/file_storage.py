@@ -1,15 +1,153 @@
+import asyncio
+import gzip
 import hashlib
+import json
+import os
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import AsyncIterator
+
+from app.core.config import settings
 
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+CHECKPOINT_DIR = UPLOAD_DIR / "checkpoints"
+GZIP_SUFFIX = ".gz"
 
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
-def build_storage_path(document_id: int, original_filename: str) -> str:
-    safe_name = original_filename.replace("/", "_").replace("\\", "_")
-    return str(UPLOAD_DIR / f"{document_id}_{safe_name}")
-
 def save_bytes(path: str, data: bytes) -> None:
-    Path(path).write_bytes(data)
\ No newline at end of file
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files live. A key is what Document.storage_path stores;
+    reference counting of keys is done by DocumentService on top of this.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def put(self, content: bytes) -> str:
+        """Stores `content` and returns its key."""
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Yields the original (decompressed) bytes of `key`."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def spool(self, key: str) -> tempfile.SpooledTemporaryFile:
+        """
+        Streams `key` into a seekable file object for extractors (pypdf needs
+        random access). Small files stay in memory; the caller closes it.
+        """
+        spooled = tempfile.SpooledTemporaryFile(max_size=settings.STORAGE_SPOOL_MAX_MEMORY_BYTES)
+        async for block in self.stream(key):
+            await asyncio.to_thread(spooled.write, block)
+        spooled.seek(0)
+        return spooled
+
+
+class ContentAddressedStorage(StorageBackend):
+    """
+    Files are named by the sha256 of their bytes and sharded two levels deep
+    (`ab/cd/abcd...`), so identical uploads, from any tenant, are stored once
+    and no directory grows past a few hundred entries. Writes are atomic
+    (temp file + rename) and run off the event loop. With compression on,
+    a file is gzipped when that saves at least 10%.
+    """
+
+    name = "content_addressed"
+
+    def __init__(self, root: Path, compress: bool = True):
+        self.root = root
+        self.compress = compress
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def _put_sync(self, content: bytes) -> str:
+        path = self._path(sha256_bytes(content))
+        gz_path = path.with_name(path.name + GZIP_SUFFIX)
+        # Already stored, possibly by another tenant or under another setting
+        for existing in (path, gz_path):
+            if existing.exists():
+                return str(existing)
+
+        data, target = content, path
+        if self.compress:
+            compressed = gzip.compress(content, compresslevel=6, mtime=0)
+            if len(compressed) <= 0.9 * len(content):
+                data, target = compressed, gz_path
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return str(target)
+
+    async def put(self, content: bytes) -> str:
+        return await asyncio.to_thread(self._put_sync, content)
+
+    async def stream(self, key: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        # Keys are paths, so files written before this backend (flat
+        # uploads/{id}_{name}) are read the same way.
+        decompressor = zlib.decompressobj(wbits=31) if key.endswith(GZIP_SUFFIX) else None
+        f = await asyncio.to_thread(open, key, "rb")
+        try:
+            while block := await asyncio.to_thread(f.read, chunk_size):
+                yield decompressor.decompress(block) if decompressor else block
+            if decompressor:
+                yield decompressor.flush()
+        finally:
+            f.close()
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(Path(key).unlink, missing_ok=True)
+
+
+def build_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "content_addressed":
+        return ContentAddressedStorage(Path(settings.STORAGE_ROOT), compress=settings.STORAGE_COMPRESS)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+
+_backend: StorageBackend | None = None
+
+
+def get_storage_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        _backend = build_storage_backend()
+    return _backend
+
+
+# Ingestion checkpoints are per document, not per stored file: two documents
+# can share one content-addressed file.
+def chunk_cache_path(document_id: int) -> str:
+    return str(CHECKPOINT_DIR / f"{document_id}.chunks.json")
+
+def save_chunk_cache(document_id: int, chunks: list[str]) -> None:
+    save_bytes(chunk_cache_path(document_id), json.dumps(chunks).encode("utf-8"))
+
+def load_chunk_cache(document_id: int) -> list[str] | None:
+    path = Path(chunk_cache_path(document_id))
+    if not path.exists():
+        return None
+    return json.loads(path.read_bytes())
+
+def drop_chunk_cache(document_id: int) -> None:
+    Path(chunk_cache_path(document_id)).unlink(missing_ok=True)
@@ -1,18 +1,17 @@
-from openai import AsyncOpenAI
-from app.core.config import settings
+from app.utils.openai_client import get_openai_layer
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+NOT_FOUND_ANSWER = "I cannot find this information in the uploaded documents."
 
 
 async def generate_answer(question: str, context: str) -> str:
 
-    system_prompt = """
+    system_prompt = f"""
 You are an AI assistant.
 Answer ONLY using the provided context.
 Every factual claim must include citation markers like [1], [2] that map to the numbered context blocks.
 Do not invent citations.
 If the answer is not in the context, say:
-"I cannot find this information in the uploaded documents."
+"{NOT_FOUND_ANSWER}"
 """
 
     user_prompt = f"""
@@ -23,7 +22,7 @@ Question:
 {question}
 """
 
-    response = await client.chat.completions.create(
+    return await get_openai_layer().create_chat_completion(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -31,5 +30,3 @@ Question:
         ],
         temperature=0.2,
     )
-
-    return response.choices[0].message.content
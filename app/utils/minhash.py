@@ -0,0 +1,95 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+NUM_PERMUTATIONS = 128
+# 16 bands x 8 rows: documents with Jaccard similarity around 0.7 and above
+# share at least one band with high probability
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 5
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(1, _PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_whitespace(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def shingles(text: str) -> set[str]:
+    """Lower-cased word 5-grams: insensitive to whitespace, case and punctuation."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str, block: int = 8192) -> np.ndarray:
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles(text)),
+        dtype=np.uint64,
+    )
+    signature = np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.uint64)
+    # Blocked so a long document does not build a shingles x permutations matrix at once
+    for start in range(0, len(hashes), block):
+        chunk = hashes[start:start + block, None]
+        signature = np.minimum(signature, ((chunk * _A + _B) % _PRIME).min(axis=0))
+    return signature.astype(np.uint32)
+
+
+def lsh_bands(signature: np.ndarray) -> list[int]:
+    """One signed 64-bit key per band; the band number is part of the key."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(band.to_bytes(2, "big") + rows.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def align_chunks(text: str, previous_chunks: list[str], chunker) -> tuple[list[str], int]:
+    """
+    Chunks `text` reusing `previous_chunks` (those of a near-duplicate
+    document) wherever they still occur, in order, after whitespace
+    normalization. Only the regions between reused chunks go through
+    `chunker`. Returns the chunks and how many were reused; reused chunks
+    keep their exact text, so their content_hash matches and they need no
+    new embedding.
+    """
+    normalized = normalize_whitespace(text)
+    chunks: list[str] = []
+    reused = 0
+    covered_end = 0
+    search_from = 0
+    for previous in previous_chunks:
+        needle = normalize_whitespace(previous)
+        if not needle:
+            continue
+        # Chunks overlap, so the next one may start before the last one ended
+        index = normalized.find(needle, search_from)
+        if index < 0:
+            continue
+        gap = normalized[covered_end:index]
+        if index > covered_end and gap.strip():
+            chunks.extend(chunker(gap))
+        chunks.append(previous)
+        reused += 1
+        covered_end = max(covered_end, index + len(needle))
+        search_from = index + 1
+
+    tail = normalized[covered_end:]
+    if tail.strip():
+        chunks.extend(chunker(tail))
+    return chunks, reused
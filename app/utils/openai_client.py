@@ -0,0 +1,242 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable, TypeVar
+
+from app.core.config import settings
+from app.utils.upstream_scheduler import UpstreamScheduler, estimate_tokens
+
+# The openai SDK takes ~0.5s to import; it is loaded when the client is built.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: the first caller for a key starts the
+    call in its own task, and everyone arriving while it is running awaits
+    the same result. A caller that is cancelled only stops waiting; the call
+    is cancelled when its last waiter leaves.
+    """
+
+    def __init__(self) -> None:
+        # key -> [task, number of callers waiting on it]
+        self._inflight: dict[Hashable, list] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._forget(key, flight))
+
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                # Everyone left: nobody wants the result
+                self._forget(key, flight)
+                task.cancel()
+
+    def _forget(self, key: Hashable, flight: list) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on in-flight upstream requests: grows by one after a run of
+    successes, halves whenever the upstream answers with a rate limit.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64, increase_every: int = 10) -> None:
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_every = increase_every
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.increase_every and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limited(self) -> None:
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+def _is_retryable(error: Exception) -> bool:
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _total_tokens(response: Any) -> int | None:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+class OpenAIClientLayer:
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        max_retries: int = 4,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 20.0,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+        scheduler: UpstreamScheduler | None = None,
+    ) -> None:
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.limiter = limiter or AdaptiveConcurrencyLimiter(initial=8)
+        # Admission by priority, tenant and token budget; the AIMD limiter
+        # sets how many calls it lets through at once
+        self.scheduler = scheduler or UpstreamScheduler(self.limiter)
+        self.singleflight = SingleFlight()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter; never wait less than the server asked for
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max_seconds))
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            try:
+                async with self.scheduler.slot(estimated_tokens) as grant:
+                    result = await fn()
+                    grant.actual_tokens = _total_tokens(result)
+            except Exception as e:
+                if getattr(e, "status_code", None) == 429:
+                    self.limiter.on_rate_limited()
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+            else:
+                self.limiter.on_success()
+                self.scheduler.notify()
+                return result
+
+    async def create_embeddings(self, model: str, inputs: list[str], **kwargs: Any) -> list[list[float]]:
+        key = ("embeddings", model, tuple(inputs), tuple(sorted(kwargs.items())))
+
+        async def run() -> list[list[float]]:
+            response = await self.call(
+                lambda: self.client.embeddings.create(model=model, input=inputs, **kwargs),
+                estimated_tokens=estimate_tokens(inputs),
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+        return await self.singleflight.do(key, run)
+
+    async def create_chat_completion(self, model: str, messages: list[dict[str, str]], **kwargs: Any) -> str:
+        key = (
+            "chat",
+            model,
+            tuple((m["role"], m["content"]) for m in messages),
+            tuple(sorted(kwargs.items())),
+        )
+
+        async def run() -> str:
+            response = await self.call(
+                lambda: self.client.chat.completions.create(model=model, messages=messages, **kwargs),
+                # Prompt plus a typical answer; corrected from usage afterwards
+                estimated_tokens=estimate_tokens([m["content"] for m in messages]) + 500,
+            )
+            return response.choices[0].message.content
+
+        return await self.singleflight.do(key, run)
+
+
+_layer: OpenAIClientLayer | None = None
+
+
+def build_openai_layer() -> OpenAIClientLayer:
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+        ),
+    )
+    client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        http_client=http_client,
+        # Retries are handled here so the concurrency limiter sees every 429
+        max_retries=0,
+    )
+    limiter = AdaptiveConcurrencyLimiter(
+        initial=settings.OPENAI_MAX_CONCURRENCY,
+        minimum=1,
+        maximum=settings.OPENAI_MAX_CONCURRENCY,
+    )
+    return OpenAIClientLayer(
+        client,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+        backoff_base_seconds=settings.OPENAI_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds=settings.OPENAI_BACKOFF_MAX_SECONDS,
+        limiter=limiter,
+        scheduler=UpstreamScheduler(
+            limiter,
+            tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE,
+            interactive_reserve=settings.OPENAI_INTERACTIVE_RESERVE,
+        ),
+    )
+
+
+def get_openai_layer() -> OpenAIClientLayer:
+    global _layer
+    if _layer is None:
+        _layer = build_openai_layer()
+    return _layer
+
+
+async def close_openai_layer() -> None:
+    global _layer
+    if _layer is not None:
+        await _layer.client.close()
+    _layer = None
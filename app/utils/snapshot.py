@@ -0,0 +1,143 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.jsonl"
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDING_DTYPES = ("float32", "float16")
+
+DOCUMENT_FIELDS = (
+    "id", "filename", "file_type", "uploaded_at", "content_hash", "chunks_total", "near_duplicate_of",
+    # MinHash signature (hex) and LSH bands, so near-duplicate detection
+    # keeps working for imported documents
+    "signature", "lsh_bands",
+)
+
+
+class SnapshotWriter:
+    """
+    Writes a tenant snapshot directory:
+
+    - manifest.json: owner, embedding model/dimensions/dtype, counts
+    - documents.jsonl: one document per line
+    - chunks.jsonl: one chunk per line, in document and chunk order; `row` is
+      its row in embeddings.npy, or null for a duplicate stored without one
+    - embeddings.npy: one contiguous (rows, dimensions) matrix
+
+    The matrix is preallocated with `embedded_rows` rows and filled through a
+    memory map, so an export never holds more than one batch of vectors.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        owner_id: str,
+        embedded_rows: int,
+        dimensions: int,
+        dtype: str = "float32",
+        model: str | None = None,
+    ):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"dtype must be one of {EMBEDDING_DTYPES}, got {dtype!r}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.manifest: dict[str, Any] = {
+            "format": SNAPSHOT_FORMAT,
+            "owner_id": owner_id,
+            "embedding_model": model,
+            "dimensions": dimensions,
+            "dtype": dtype,
+            "documents": 0,
+            "chunks": 0,
+            "embedded_chunks": embedded_rows,
+        }
+        self._embeddings = np.lib.format.open_memmap(
+            self.path / EMBEDDINGS_FILE, mode="w+", dtype=dtype, shape=(embedded_rows, dimensions)
+        )
+        self._documents = open(self.path / DOCUMENTS_FILE, "w", encoding="utf-8")
+        self._chunks = open(self.path / CHUNKS_FILE, "w", encoding="utf-8")
+        self._next_row = 0
+
+    def add_document(self, document: dict[str, Any]) -> None:
+        record = {field: document.get(field) for field in DOCUMENT_FIELDS}
+        if isinstance(record["uploaded_at"], datetime):
+            record["uploaded_at"] = record["uploaded_at"].isoformat()
+        if isinstance(record["signature"], (bytes, memoryview)):
+            record["signature"] = bytes(record["signature"]).hex()
+        self._documents.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.manifest["documents"] += 1
+
+    def add_chunks(self, chunks: list[dict[str, Any]], embeddings: list[Any]) -> None:
+        """`embeddings[i]` is the vector of `chunks[i]`, or None."""
+        vectors = [vector for vector in embeddings if vector is not None]
+        start = self._next_row
+        if start + len(vectors) > len(self._embeddings):
+            raise ValueError("More embedded chunks than the snapshot was sized for")
+        if vectors:
+            self._embeddings[start:start + len(vectors)] = np.asarray(vectors, dtype=np.float32)
+
+        row = start
+        for chunk, vector in zip(chunks, embeddings):
+            record = {
+                "document_id": chunk["document_id"],
+                "chunk_index": chunk["chunk_index"],
+                "content": chunk["content"],
+                "content_hash": chunk.get("content_hash"),
+                "row": None if vector is None else row,
+            }
+            row += vector is not None
+            self._chunks.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._next_row = row
+        self.manifest["chunks"] += len(chunks)
+
+    def close(self) -> dict[str, Any]:
+        if self._next_row != len(self._embeddings):
+            raise ValueError(f"Snapshot sized for {len(self._embeddings)} embedded chunks, got {self._next_row}")
+        self._embeddings.flush()
+        del self._embeddings
+        self._documents.close()
+        self._chunks.close()
+        self.manifest["exported_at"] = datetime.now(timezone.utc).isoformat()
+        (self.path / MANIFEST_FILE).write_text(json.dumps(self.manifest, indent=2) + "\n")
+        return self.manifest
+
+
+@dataclass
+class Snapshot:
+    path: Path
+    manifest: dict[str, Any]
+
+    def documents(self) -> Iterator[dict[str, Any]]:
+        yield from _read_jsonl(self.path / DOCUMENTS_FILE)
+
+    def chunks(self) -> Iterator[dict[str, Any]]:
+        yield from _read_jsonl(self.path / CHUNKS_FILE)
+
+    def embeddings(self) -> np.ndarray:
+        """The embedding matrix, memory-mapped read-only in its stored dtype."""
+        return np.load(self.path / EMBEDDINGS_FILE, mmap_mode="r")
+
+
+def open_snapshot(path: str | Path) -> Snapshot:
+    path = Path(path)
+    manifest_path = path / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No {MANIFEST_FILE} in {path}; not a snapshot or an unfinished export")
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')!r}")
+    return Snapshot(path=path, manifest=manifest)
+
+
+def _read_jsonl(path: Path) -> Iterator[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
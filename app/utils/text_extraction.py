@@ -1,23 +1,31 @@
 from pathlib import Path
+from typing import BinaryIO
+
 from pypdf import PdfReader
 
+# Extractors take a path or a seekable binary file object (see
+# StorageBackend.spool for stored files that may be compressed).
+Source = str | BinaryIO
+
 
-def extract_text_from_txt(path: str) -> str:
-    return Path(path).read_text(encoding="utf-8", errors="ignore")
+def extract_text_from_txt(source: Source) -> str:
+    if isinstance(source, str):
+        return Path(source).read_text(encoding="utf-8", errors="ignore")
+    return source.read().decode("utf-8", errors="ignore")
 
 
-def extract_text_from_pdf(path: str) -> str:
-    reader = PdfReader(path)
+def extract_text_from_pdf(source: Source) -> str:
+    reader = PdfReader(source)
     parts: list[str] = []
     for page in reader.pages:
         parts.append(page.extract_text() or "")
     return "\n".join(parts)
 
 
-def extract_text(path: str, file_type: str) -> str:
+def extract_text(source: Source, file_type: str) -> str:
     ft = file_type.lower()
     if ft == "txt":
-        return extract_text_from_txt(path)
+        return extract_text_from_txt(source)
     if ft == "pdf":
-        return extract_text_from_pdf(path)
+        return extract_text_from_pdf(source)
     raise ValueError(f"Unsupported file_type for extraction: {file_type}")
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator, Protocol
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    INGESTION = 1
+
+
+_priority: ContextVar[tuple[Priority, str | None]] = ContextVar(
+    "upstream_priority", default=(Priority.INTERACTIVE, None)
+)
+
+
+@contextmanager
+def upstream_priority(priority: Priority, tenant: str | None = None) -> Iterator[None]:
+    """
+    Marks upstream calls made inside the block (including in tasks spawned
+    from it) with a priority class and the tenant they are made for.
+    Unmarked calls are interactive.
+    """
+    token = _priority.set((priority, tenant))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _ConcurrencyLimit(Protocol):
+    limit: int
+
+
+@dataclass
+class Grant:
+    priority: Priority
+    tenant: str | None
+    estimated_tokens: int
+    # Set by the caller from the response's usage, if it reports one
+    actual_tokens: int | None = None
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+class TokenBucket:
+    """Tokens-per-minute budget, refilled continuously; may go into debt."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.level = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, level: float) -> float:
+        self.refill()
+        return max(0.0, (level - self.level) / self.rate) if self.rate else float("inf")
+
+
+class UpstreamScheduler:
+    """
+    Admission control in front of upstream API calls.
+
+    - Concurrency: at most `limit.limit` calls in flight (the AIMD limiter
+      still adjusts that number on 429s).
+    - Priority: a free slot always goes to a waiting interactive call first.
+    - Fair share: ingestion calls queue per tenant; the tenant that has been
+      granted the fewest tokens goes next, so one large upload cannot crowd
+      out other tenants' ingestion.
+    - Budget: with a tokens-per-minute budget, ingestion only spends tokens
+      above `interactive_reserve` of it, soaking up spare capacity while
+      leaving headroom for interactive calls, which are never held back by
+      the budget.
+    """
+
+    def __init__(self, limit: _ConcurrencyLimit, tokens_per_minute: int = 0, interactive_reserve: float = 0.2):
+        self.limit = limit
+        self.bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.reserve = (self.bucket.capacity * interactive_reserve) if self.bucket else 0.0
+        self.in_flight = 0
+        self._interactive: deque[Grant] = deque()
+        self._ingestion: dict[str | None, deque[Grant]] = {}
+        self._served: dict[str | None, float] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        priority, tenant = _priority.get()
+        grant = Grant(priority, tenant, estimated_tokens, future=asyncio.get_running_loop().create_future())
+        self._enqueue(grant)
+        self._dispatch()
+        try:
+            await grant.future
+        except asyncio.CancelledError:
+            if grant.future.done() and not grant.future.cancelled():
+                self._release(grant)
+            else:
+                self._remove(grant)
+            raise
+        try:
+            yield grant
+        finally:
+            self._release(grant)
+
+    def queued(self) -> dict[str, int]:
+        return {
+            "interactive": len(self._interactive),
+            "ingestion": sum(len(q) for q in self._ingestion.values()),
+        }
+
+    def _enqueue(self, grant: Grant) -> None:
+        if grant.priority == Priority.INTERACTIVE:
+            self._interactive.append(grant)
+            return
+        queue = self._ingestion.get(grant.tenant)
+        if queue is None:
+            # A tenant (re)joining starts level with the least-served active
+            # tenant rather than with credit for the time it was idle
+            active = [self._served.get(t, 0.0) for t in self._ingestion]
+            self._served[grant.tenant] = max(self._served.get(grant.tenant, 0.0), min(active, default=0.0))
+            queue = self._ingestion[grant.tenant] = deque()
+        queue.append(grant)
+
+    def _remove(self, grant: Grant) -> None:
+        if grant.priority == Priority.INTERACTIVE:
+            if grant in self._interactive:
+                self._interactive.remove(grant)
+            return
+        queue = self._ingestion.get(grant.tenant)
+        if queue is not None and grant in queue:
+            queue.remove(grant)
+            if not queue:
+                del self._ingestion[grant.tenant]
+
+    def _next_ingestion_tenant(self) -> str | None:
+        return min(self._ingestion, key=lambda t: self._served.get(t, 0.0))
+
+    def _ingestion_fits(self, tokens: int) -> bool:
+        if self.bucket is None:
+            return True
+        self.bucket.refill()
+        # A request larger than the spare budget runs once the bucket is full
+        return self.bucket.level - tokens >= self.reserve or self.bucket.level >= self.bucket.capacity
+
+    def _grant(self, grant: Grant) -> None:
+        self.in_flight += 1
+        if self.bucket is not None:
+            self.bucket.refill()
+            self.bucket.level -= grant.estimated_tokens
+        grant.future.set_result(None)
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.limit.limit:
+            if self._interactive:
+                self._grant(self._interactive.popleft())
+                continue
+            if not self._ingestion:
+                return
+            tenant = self._next_ingestion_tenant()
+            queue = self._ingestion[tenant]
+            if not self._ingestion_fits(queue[0].estimated_tokens):
+                self._wake_when_budget_allows(queue[0].estimated_tokens)
+                return
+            grant = queue.popleft()
+            if not queue:
+                del self._ingestion[tenant]
+            self._served[tenant] = self._served.get(tenant, 0.0) + max(1, grant.estimated_tokens)
+            self._grant(grant)
+
+    def _wake_when_budget_allows(self, tokens: int) -> None:
+        if self._timer is not None:
+            return
+        target = min(self.bucket.capacity, self.reserve + tokens)
+        delay = max(0.01, self.bucket.seconds_until(target))
+
+        def wake() -> None:
+            self._timer = None
+            self._dispatch()
+
+        self._timer = asyncio.get_running_loop().call_later(delay, wake)
+
+    def _release(self, grant: Grant) -> None:
+        self.in_flight -= 1
+        if self.bucket is not None and grant.actual_tokens is not None:
+            self.bucket.level -= grant.actual_tokens - grant.estimated_tokens
+        self._dispatch()
+
+    def notify(self) -> None:
+        """Call when the concurrency limit may have grown."""
+        self._dispatch()
+
+
+def estimate_tokens(texts: list[str]) -> int:
+    # ~4 characters per token for English; reconciled with reported usage
+    return sum(len(t) for t in texts) // 4 + len(texts)
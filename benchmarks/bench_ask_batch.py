@@ -0,0 +1,74 @@
+"""
+Throughput of POST /ask/batch vs a client looping over POST /ask, with
+simulated upstream latencies (no database or API key needed).
+
+    python -m benchmarks.bench_ask_batch --questions 200 --concurrency 1 4 16 32
+
+Per question, the loop pays an embedding call, a k-NN round trip and a
+completion. The batch pays one embedding call and one round trip in total,
+then runs completions `concurrency` at a time.
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from app.services.rag_service import RAGService
+from app.services.retrieval_service import RetrievalService
+
+
+def fake_results(n: int):
+    chunk = SimpleNamespace(id=1, document_id=1, chunk_index=0, content="context")
+    return [(chunk, "doc.txt", 0.1, [])] * n
+
+
+async def run(args: argparse.Namespace) -> None:
+    questions = [f"question {i}" for i in range(args.questions)]
+
+    async def search(self, query, owner_id, top_k=5, filters=None):
+        await asyncio.sleep((args.embed_ms + args.db_ms) / 1000)
+        return fake_results(top_k)
+
+    async def search_many(self, queries, owner_id, top_k=5, filters=None):
+        await asyncio.sleep((args.embed_ms + args.db_ms * 2) / 1000)
+        return [fake_results(top_k) for _ in queries]
+
+    async def generate_answer(question: str, context: str) -> str:
+        await asyncio.sleep(args.llm_ms / 1000)
+        return "answer [1]"
+
+    with mock.patch.object(RetrievalService, "search", search), \
+            mock.patch.object(RetrievalService, "search_many", search_many), \
+            mock.patch("app.services.rag_service.generate_answer", generate_answer):
+        service = RAGService(db=None)
+
+        started = time.perf_counter()
+        for question in questions:
+            await service.ask(question, "bench")
+        loop_seconds = time.perf_counter() - started
+        print(f"{'client loop':>16}: {args.questions / loop_seconds:8.1f} questions/s")
+
+        for concurrency in args.concurrency:
+            started = time.perf_counter()
+            await service.ask_many(questions, "bench", concurrency=concurrency)
+            seconds = time.perf_counter() - started
+            print(
+                f"{f'batch c={concurrency}':>16}: {args.questions / seconds:8.1f} questions/s "
+                f"({loop_seconds / seconds:.1f}x)"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--embed-ms", type=float, default=60)
+    parser.add_argument("--db-ms", type=float, default=15)
+    parser.add_argument("--llm-ms", type=float, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Recall, latency and footprint of coarse-to-fine search over Matryoshka
+prefixes at several dimensions.
+
+    # Real embeddings from the chunks table (queries are held-out chunks)
+    python -m benchmarks.bench_matryoshka --source db --rows 50000
+
+    # Synthetic vectors whose variance decays across dimensions, like MRL models
+    python -m benchmarks.bench_matryoshka --source synthetic
+
+Latency is a brute-force numpy scan, a stand-in for the relative cost of
+the coarse pass; footprint is pgvector's on-disk size per vector.
+"""
+import argparse
+import time
+
+import numpy as np
+
+FULL_DIMENSIONS = 1536
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def synthetic(rows: int, queries: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    scale = 1.0 / np.sqrt(np.arange(1, FULL_DIMENSIONS + 1))
+    centres = rng.normal(size=(max(1, rows // 50), FULL_DIMENSIONS)) * scale
+    assignment = rng.integers(0, len(centres), size=rows + queries)
+    # Noise decays more slowly than signal, so short prefixes lose real information
+    data = centres[assignment] + 0.5 * rng.normal(size=(rows + queries, FULL_DIMENSIONS)) * np.sqrt(scale)
+    data = normalize(data.astype(np.float32))
+    return data[:rows], data[rows:]
+
+
+def from_db(rows: int, queries: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    from sqlalchemy import create_engine, text
+
+    from app.core.config import settings
+
+    engine = create_engine(settings.DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+    with engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT embedding::text FROM chunks WHERE embedding IS NOT NULL LIMIT :n"),
+            {"n": rows + queries},
+        )
+        data = np.array([np.fromstring(row[0][1:-1], sep=",") for row in result], dtype=np.float32)
+    rng.shuffle(data)
+    data = normalize(data)
+    return data[queries:], data[:queries]
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    idx = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=4, help="coarse candidates per result")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 512, 768, 1536])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    loader = synthetic if args.source == "synthetic" else from_db
+    corpus, queries = loader(args.rows, args.queries, rng)
+    truth = top_k(corpus, queries, args.top_k)
+
+    print(f"{len(corpus)} vectors, {len(queries)} queries, recall@{args.top_k} with {args.candidates}x candidates")
+    print(f"{'dims':>6} {'recall':>8} {'coarse ms/q':>12} {'bytes/vec':>10} {'vs full':>8}")
+    full_bytes = 4 * FULL_DIMENSIONS + 8
+    for dims in args.dims:
+        short_corpus = normalize(corpus[:, :dims])
+        short_queries = normalize(queries[:, :dims])
+
+        start = time.perf_counter()
+        candidates = top_k(short_corpus, short_queries, args.top_k * args.candidates)
+        coarse_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recalls = []
+        for q, cand, expected in zip(queries, candidates, truth):
+            rescored = cand[np.argsort(-(corpus[cand] @ q))[: args.top_k]]
+            recalls.append(len(set(rescored) & set(expected)) / args.top_k)
+
+        vec_bytes = 4 * dims + 8
+        print(
+            f"{dims:>6} {np.mean(recalls):>8.3f} {coarse_ms:>12.3f} "
+            f"{vec_bytes:>10} {vec_bytes / full_bytes:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Response bytes and serialization CPU per /search response: the previous
+path (response_model validation + stdlib JSON) against the orjson fast path,
+field selection and excerpt mode, each with and without gzip.
+
+    python -m benchmarks.bench_search_response --top-k 20 --chars 2000 --requests 2000
+
+No database needed: results are synthetic chunks of English-like text with
+two sources each.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+from fastapi.responses import ORJSONResponse
+
+from app.schemas.search import SearchResponse
+
+WORDS = (
+    "the policy applies to all employees and contractors who access customer data "
+    "requests must be approved by a manager before the start of the quarter "
+    "reports are stored for seven years in the archive system"
+).split()
+
+
+def make_results(top_k: int, chars: int, rng: random.Random) -> list[dict]:
+    results = []
+    for i in range(top_k):
+        text = ""
+        while len(text) < chars:
+            text += rng.choice(WORDS) + " "
+        results.append({
+            "chunk_id": 1000 + i,
+            "document_id": 10 + i % 4,
+            "chunk_index": i,
+            "content": text[:chars],
+            "distance": rng.random(),
+            "sources": [
+                {"chunk_id": 1000 + i, "document_id": 10 + i % 4, "chunk_index": i, "filename": "handbook.pdf"},
+                {"chunk_id": 5000 + i, "document_id": 90, "chunk_index": i, "filename": "handbook-v2.pdf"},
+            ],
+        })
+    return results
+
+
+def previous_path(payload: dict) -> bytes:
+    # What FastAPI did with response_model: validate, dump, stdlib-encode
+    data = SearchResponse.model_validate(payload).model_dump(mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(payload: dict) -> bytes:
+    return ORJSONResponse(payload).body
+
+
+def measure(name: str, render, payload: dict, requests: int, gzip_level: int) -> None:
+    started = time.process_time()
+    for _ in range(requests):
+        body = render(payload)
+    cpu_us = (time.process_time() - started) / requests * 1e6
+
+    started = time.process_time()
+    for _ in range(requests):
+        compressed = gzip.compress(body, compresslevel=gzip_level)
+    gzip_us = (time.process_time() - started) / requests * 1e6
+
+    print(
+        f"{name:>28}: {len(body):>7} B {cpu_us:8.1f} us/resp | "
+        f"gzip {len(compressed):>6} B +{gzip_us:7.1f} us/resp"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--chars", type=int, default=2000, help="characters per chunk (~500 tokens)")
+    parser.add_argument("--excerpt-chars", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--gzip-level", type=int, default=4, help="CompressionMiddleware's default")
+    args = parser.parse_args()
+
+    results = make_results(args.top_k, args.chars, random.Random(0))
+    full = {"results": results}
+    narrow = {"results": [{k: r[k] for k in ("chunk_id", "document_id", "distance")} for r in results]}
+    excerpt = {"results": [{**r, "content": r["content"][:args.excerpt_chars]} for r in results]}
+
+    print(f"top_k={args.top_k}, {args.chars} chars per chunk, {args.requests} responses each")
+    measure("response_model + json", previous_path, full, args.requests, args.gzip_level)
+    measure("orjson", fast_path, full, args.requests, args.gzip_level)
+    measure(f"orjson excerpt_chars={args.excerpt_chars}", fast_path, excerpt, args.requests, args.gzip_level)
+    measure("orjson fields=id,doc,dist", fast_path, narrow, args.requests, args.gzip_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of a /search-shaped JSON route behind the old BaseHTTPMiddleware
+size limit vs the pure ASGI one.
+
+    python -m benchmarks.bench_size_limit --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.middleware.size_limit import DEFAULT_MAX_BYTES, RequestSizeLimitMiddleware
+
+
+class LegacyRequestSizeLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next) -> Response:
+        content_length = request.headers.get("content-length")
+        if content_length is not None and int(content_length) > DEFAULT_MAX_BYTES:
+            return Response(content="Request body too large", status_code=413)
+        body = await request.body()
+        if len(body) > DEFAULT_MAX_BYTES:
+            return Response(content="Request body too large", status_code=413)
+        return await call_next(request)
+
+
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/search/")
+    async def search(payload: SearchRequest):
+        return {"results": []}
+
+    app.add_middleware(middleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {"query": "what is the refund policy?", "top_k": 5}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.post("/search/", json=payload)
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    for name, middleware in (
+        ("BaseHTTPMiddleware", LegacyRequestSizeLimitMiddleware),
+        ("pure ASGI", RequestSizeLimitMiddleware),
+    ):
+        app = build_app(middleware)
+        await run(app, min(requests, 200), concurrency)  # warm-up
+        rps = await run(app, requests, concurrency)
+        print(f"{name:>20}: {rps:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,62 @@
+"""
+Worker start-up cost: import time of app.main and latency of the first
+requests, with and without the lifespan warm-up.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import app.main
+print(time.perf_counter() - t)
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import asyncio, time
+from httpx import ASGITransport, AsyncClient
+from app.core.config import settings
+
+async def main(warm):
+    from app.main import app
+    async with app.router.lifespan_context(app) if warm else _null():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            username, password = settings.USERS_SEED.split(",")[0].split(":", 1)
+            t = time.perf_counter()
+            await client.post("/auth/token", data={"username": username, "password": password})
+            print(time.perf_counter() - t)
+
+class _null:
+    async def __aenter__(self): return None
+    async def __aexit__(self, *exc): return False
+
+asyncio.run(main(__WARM__))
+"""
+
+
+def measure(snippet: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"import app.main:               {measure(IMPORT_SNIPPET, args.runs):7.1f} ms")
+    for warm in (False, True):
+        label = "first /auth/token (warmed)" if warm else "first /auth/token (cold)"
+        snippet = FIRST_REQUEST_SNIPPET.replace("__WARM__", str(warm))
+        print(f"{label:<30} {measure(snippet, args.runs):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
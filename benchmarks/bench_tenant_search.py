@@ -0,0 +1,154 @@
+"""
+Tenant-filtered vector search: join-on-documents vs denormalized owner_id vs
+owner_id hash partitions, on 1,000 tenants with Zipf-skewed corpus sizes.
+
+Needs a Postgres with pgvector (docker-compose up db). Everything is created in
+a throwaway `bench_tenant` schema.
+
+    python -m benchmarks.bench_tenant_search --rows 200000 --dim 64 --queries 200
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+SCHEMA = "bench_tenant"
+
+
+def zipf_sizes(tenants: int, rows: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    weights = 1.0 / np.arange(1, tenants + 1) ** skew
+    sizes = np.maximum(1, np.floor(weights / weights.sum() * rows)).astype(int)
+    rng.shuffle(sizes)
+    return sizes
+
+
+def vector_literal(vec: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.5f}" for x in vec) + "]"
+
+
+def setup(conn, sizes: np.ndarray, dim: int, partitions: int, rng: np.random.Generator) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+    conn.execute(text("CREATE TABLE docs (id int PRIMARY KEY, owner_id text NOT NULL)"))
+    conn.execute(text(f"CREATE TABLE chunks_join (id int PRIMARY KEY, document_id int NOT NULL, embedding vector({dim}))"))
+    conn.execute(text(
+        f"CREATE TABLE chunks_denorm (id int PRIMARY KEY, document_id int NOT NULL, owner_id text NOT NULL, embedding vector({dim}))"
+    ))
+    conn.execute(text(
+        f"CREATE TABLE chunks_part (id int, document_id int NOT NULL, owner_id text NOT NULL, embedding vector({dim}), "
+        "PRIMARY KEY (id, owner_id)) PARTITION BY HASH (owner_id)"
+    ))
+    for r in range(partitions):
+        conn.execute(text(
+            f"CREATE TABLE chunks_part_{r} PARTITION OF chunks_part FOR VALUES WITH (MODULUS {partitions}, REMAINDER {r})"
+        ))
+
+    docs, join_rows, denorm_rows = io.StringIO(), io.StringIO(), io.StringIO()
+    chunk_id = 0
+    for tenant, size in enumerate(sizes):
+        owner = f"tenant{tenant:04d}"
+        docs.write(f"{tenant}\t{owner}\n")
+        # Each tenant's corpus clusters around its own centre, like real topical data
+        centre = rng.normal(size=dim)
+        for vec in centre + 0.5 * rng.normal(size=(size, dim)):
+            literal = vector_literal(vec)
+            join_rows.write(f"{chunk_id}\t{tenant}\t{literal}\n")
+            denorm_rows.write(f"{chunk_id}\t{tenant}\t{owner}\t{literal}\n")
+            chunk_id += 1
+
+    raw = conn.connection.dbapi_connection
+    with raw.cursor() as cur:
+        for table, buffer in (("docs", docs), ("chunks_join", join_rows), ("chunks_denorm", denorm_rows)):
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {SCHEMA}.{table} FROM STDIN", buffer)
+    conn.execute(text("INSERT INTO chunks_part SELECT * FROM chunks_denorm"))
+
+    conn.execute(text("CREATE INDEX ON chunks_join (document_id)"))
+    conn.execute(text("CREATE INDEX ON chunks_denorm (owner_id)"))
+    for table in ("chunks_join", "chunks_denorm", "chunks_part"):
+        conn.execute(text(f"CREATE INDEX ON {table} USING hnsw (embedding vector_cosine_ops)"))
+    conn.execute(text("ANALYZE"))
+
+
+QUERIES = {
+    "join": (
+        "SELECT c.id FROM chunks_join c JOIN docs d ON d.id = c.document_id "
+        "WHERE d.owner_id = :owner ORDER BY c.embedding <=> CAST(:q AS vector) LIMIT :k"
+    ),
+    "denormalized": (
+        "SELECT id FROM chunks_denorm WHERE owner_id = :owner "
+        "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    ),
+    "partitioned": (
+        "SELECT id FROM chunks_part WHERE owner_id = :owner "
+        "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    ),
+}
+
+
+def exact_ids(conn, owner: str, query: str, k: int) -> set[int]:
+    conn.execute(text("SET LOCAL enable_indexscan = off"))
+    ids = {row[0] for row in conn.execute(text(QUERIES["denormalized"]), {"owner": owner, "q": query, "k": k})}
+    conn.execute(text("SET LOCAL enable_indexscan = on"))
+    return ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    sizes = zipf_sizes(args.tenants, args.rows, args.skew, rng)
+    order = np.argsort(sizes)
+    buckets = {
+        "small (bottom 50%)": order[: args.tenants // 2],
+        "large (top 1%)": order[-max(1, args.tenants // 100):],
+    }
+
+    engine = create_engine(settings.DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        setup(conn, sizes, args.dim, args.partitions, rng)
+        print(f"loaded {sizes.sum()} chunks for {args.tenants} tenants in {time.perf_counter() - started:.1f}s")
+
+    for bucket, tenants in buckets.items():
+        print(f"\n{bucket}: median corpus {int(np.median(sizes[tenants]))} chunks")
+        for name, sql in QUERIES.items():
+            latencies, recalls = [], []
+            for _ in range(args.queries):
+                tenant = int(rng.choice(tenants))
+                owner = f"tenant{tenant:04d}"
+                query = vector_literal(rng.normal(size=args.dim))
+                with engine.begin() as conn:
+                    conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}, public"))
+                    start = time.perf_counter()
+                    got = {row[0] for row in conn.execute(text(sql), {"owner": owner, "q": query, "k": args.top_k})}
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    expected = exact_ids(conn, owner, query, args.top_k)
+                recalls.append(len(got & expected) / len(expected) if expected else 1.0)
+            latencies.sort()
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(
+                f"  {name:>13}: p50 {statistics.median(latencies):6.2f} ms  "
+                f"p95 {p95:6.2f} ms  recall@{args.top_k} {statistics.mean(recalls):.3f}"
+            )
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
+import os
 from datetime import timedelta
 
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from app.core.security import create_access_token
+from app.db.base import Base
 from app.main import app
+from app.models.chunk import Chunk  # noqa: F401  (registers the tables)
+from app.models.document_signature import DocumentSignature  # noqa: F401
+from app.models.stored_file import StoredFile  # noqa: F401
+
+# Postgres with pgvector; tests that need a real database skip without it
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
 
 
 @pytest_asyncio.fixture
@@ -33,3 +43,29 @@ def bob_token() -> str:
 @pytest.fixture
 def expired_token() -> str:
     return make_token("alice", expired=True)
+
+
+@pytest_asyncio.fixture
+async def pg_session():
+    """
+    Session on TEST_DATABASE_URL inside a throwaway schema. Everything runs in
+    one transaction that is rolled back, so the database is left untouched.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL (Postgres with pgvector) is not set")
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            await conn.begin()
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(text("CREATE SCHEMA pytest_scratch"))
+            await conn.execute(text("SET LOCAL search_path TO pytest_scratch, public"))
+            await conn.run_sync(Base.metadata.create_all, checkfirst=False)
+            session = AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint")
+            try:
+                yield session
+            finally:
+                await session.close()
+                await conn.rollback()
+    finally:
+        await engine.dispose()
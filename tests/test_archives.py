@@ -0,0 +1,131 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.dependencies import get_owner_session_maker
+from app.main import app
+from app.utils.archives import (
+    ArchiveError,
+    ArchiveLimitError,
+    check_ingest_limits,
+    expand_uploads,
+    is_archive,
+    iter_archive_members,
+    upload_totals,
+    verify_uploads,
+)
+
+
+def make_zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_is_archive():
+    assert is_archive("kb.zip")
+    assert is_archive("kb.TAR.GZ")
+    assert not is_archive("notes.txt")
+
+
+def test_zip_members_are_filtered():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("docs/a.txt", b"alpha")
+        archive.writestr("docs/b.pdf", b"%PDF")
+        archive.writestr("docs/image.png", b"png")
+        archive.writestr("__MACOSX/docs/._a.txt", b"junk")
+        archive.writestr("docs/huge.txt", b"x" * 100)
+
+    members = dict(iter_archive_members("kb.zip", buffer.getvalue(), max_member_bytes=50))
+    assert members == {"docs/a.txt": b"alpha", "docs/b.pdf": b"%PDF"}
+
+
+def test_tar_members():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        data = b"hello"
+        info = tarfile.TarInfo("notes/hello.txt")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+    members = list(iter_archive_members("kb.tar.gz", buffer.getvalue(), max_member_bytes=1024))
+    assert members == [("notes/hello.txt", b"hello")]
+
+
+@pytest.mark.parametrize(
+    "limits, message",
+    [({"max_members": 2}, "3 files exceed the limit of 2"), ({"max_total_bytes": 2500}, "3000 decompressed bytes")],
+)
+def test_archive_limits_are_checked_before_any_member_is_inflated(limits, message):
+    # Each member is under the per-file cap; together they are over budget
+    content = make_zip({f"docs/{i}.txt": b"x" * 1000 for i in range(3)})
+
+    members = iter_archive_members("kb.zip", content, max_member_bytes=1000, **limits)
+    with pytest.raises(ArchiveLimitError, match=message):
+        next(members)
+
+
+def test_upload_totals_count_archive_members_at_decompressed_size():
+    uploads = [("kb.zip", make_zip({"a.txt": b"x" * 4000, "b.txt": b"y" * 4000, "c.png": b"z"})), ("notes.txt", b"hi")]
+
+    assert upload_totals(uploads, max_member_bytes=10_000) == (3, 8002)
+    with pytest.raises(ArchiveLimitError):
+        check_ingest_limits(*upload_totals(uploads, max_member_bytes=10_000), max_members=10, max_total_bytes=8000)
+
+
+def test_expand_uploads_inflates_members_lazily(mocker):
+    uploads = [("kb.zip", make_zip({"a.txt": b"alpha", "b.txt": b"beta"})), ("notes.txt", b"hi")]
+    opened = mocker.spy(zipfile.ZipFile, "open")
+
+    items = expand_uploads(uploads, max_member_bytes=1024)
+    assert next(items) == ("a.txt", b"alpha")
+    assert opened.call_count == 1
+    assert list(items) == [("b.txt", b"beta"), ("notes.txt", b"hi")]
+
+
+def truncated_tar_gz() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        data = os.urandom(64 * 1024)
+        info = tarfile.TarInfo("notes/big.txt")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()[:-4096]
+
+
+@pytest.mark.parametrize(
+    "filename, content",
+    [("kb.zip", b"PK\x03\x04 not really a zip"), ("kb.tar", b"not a tar"), ("kb.tar.gz", truncated_tar_gz())],
+)
+def test_corrupt_archives_raise_archive_error(filename, content):
+    # The truncated tar.gz has intact headers; only inflating the member fails
+    with pytest.raises(ArchiveError, match=f"{filename} is not a readable archive"):
+        upload_totals([(filename, content)], max_member_bytes=1024 * 1024)
+        verify_uploads([(filename, content)], max_member_bytes=1024 * 1024)
+    with pytest.raises(ArchiveError):
+        list(iter_archive_members(filename, content, max_member_bytes=1024 * 1024))
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_rejects_a_corrupt_archive_before_ingesting(client: AsyncClient, alice_token: str, mocker):
+    app.dependency_overrides[get_owner_session_maker] = lambda: None
+    run = mocker.patch("app.api.routes.document.IngestionPipeline.run")
+    try:
+        response = await client.post(
+            "/documents/bulk-upload",
+            files=[("files", ("notes.txt", b"fine", "text/plain")), ("files", ("kb.tar.gz", truncated_tar_gz(), "application/gzip"))],
+            headers={"Authorization": f"Bearer {alice_token}"},
+        )
+    finally:
+        app.dependency_overrides.pop(get_owner_session_maker)
+
+    assert response.status_code == 400
+    assert "kb.tar.gz is not a readable archive" in response.json()["detail"]
+    run.assert_not_called()
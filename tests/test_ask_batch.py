@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.rag_service import RAGService
+from app.services.retrieval_service import RetrievalService
+
+pytestmark = pytest.mark.asyncio
+
+
+def hit(chunk_id: int, content: str):
+    chunk = SimpleNamespace(id=chunk_id, document_id=1, chunk_index=chunk_id, content=content)
+    return (chunk, "handbook.pdf", 0.1, [])
+
+
+async def test_ask_many_bounds_concurrency_and_keeps_order(mocker):
+    mocker.patch.object(
+        RetrievalService, "search_many",
+        return_value=[[hit(i, f"fact {i}")] for i in range(6)],
+    )
+    in_flight = peak = 0
+
+    async def fake_generate(question: str, context: str) -> str:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later questions finish first
+        await asyncio.sleep(0.01 * (6 - int(question[1:])))
+        in_flight -= 1
+        return f"answer to {question} [1]"
+
+    mocker.patch("app.services.rag_service.generate_answer", side_effect=fake_generate)
+
+    results = await RAGService(db=None).ask_many([f"q{i}" for i in range(6)], "alice", concurrency=2)
+
+    assert peak == 2
+    assert [r["index"] for r in results] == list(range(6))
+    assert results[3]["answer"] == "answer to q3 [1]"
+    assert results[3]["sources"][0]["chunk_id"] == 3
+
+
+async def test_batch_endpoint_reports_per_item_errors(client: AsyncClient, alice_token: str, mocker):
+    search_many = mocker.patch.object(
+        RetrievalService, "search_many",
+        return_value=[[hit(1, "a")], [hit(2, "b")]],
+    )
+
+    async def fake_generate(question: str, context: str) -> str:
+        if question == "bad":
+            raise RuntimeError("upstream timeout")
+        return "fine [1]"
+
+    mocker.patch("app.services.rag_service.generate_answer", side_effect=fake_generate)
+
+    response = await client.post(
+        "/ask/batch",
+        json={"questions": ["good", "bad"], "top_k": 3},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.status_code == 200
+    good, bad = response.json()["results"]
+    assert good["answer"] == "fine [1]" and good["error"] is None
+    assert bad["answer"] is None and bad["error"] == "upstream timeout"
+    assert search_many.call_args.kwargs["queries"] == ["good", "bad"]
+    assert search_many.call_args.kwargs["owner_id"] == "alice"
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.chunk_service import ChunkService, chunk_content_hash
+from app.services.retrieval_service import RetrievalService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_build_rows_embeds_each_new_text_once(mocker):
+    already = chunk_content_hash("known paragraph")
+    mocker.patch.object(ChunkService, "embedded_hashes", return_value={already})
+    embed = mocker.patch(
+        "app.services.chunk_service.embed_texts",
+        side_effect=lambda texts: [[1.0] + [0.0] * 1535 for _ in texts],
+    )
+
+    rows = await ChunkService(db=None).build_rows(
+        document_id=7,
+        owner_id="alice",
+        contents=["new paragraph", "known paragraph", "new paragraph"],
+    )
+
+    embed.assert_called_once_with(["new paragraph"])
+    assert [row["chunk_index"] for row in rows] == [0, 1, 2]
+    assert rows[0]["embedding"] is not None
+    assert rows[0]["embedding_short"] is not None
+    assert rows[1]["embedding"] is None
+    assert rows[2]["embedding"] is None
+    assert rows[0]["content_hash"] == rows[2]["content_hash"]
+
+
+async def test_search_collapses_identical_hits(mocker):
+    first = SimpleNamespace(id=1, document_id=10, chunk_index=0, content_hash="h1")
+    copy = SimpleNamespace(id=2, document_id=11, chunk_index=4, content_hash="h1")
+    other = SimpleNamespace(id=3, document_id=10, chunk_index=1, content_hash="h2")
+    mocker.patch.object(ChunkService, "sources_for", return_value={
+        "h1": [
+            {"chunk_id": 1, "document_id": 10, "chunk_index": 0, "filename": "v1.pdf"},
+            {"chunk_id": 2, "document_id": 11, "chunk_index": 4, "filename": "v2.pdf"},
+        ],
+    })
+
+    collapsed = await RetrievalService(db=None)._collapse_duplicates(
+        "alice",
+        [(first, "v1.pdf", 0.1), (copy, "v2.pdf", 0.1), (other, "v1.pdf", 0.3)],
+    )
+
+    assert [row[0].id for row in collapsed] == [1, 3]
+    assert [s["document_id"] for s in collapsed[0][3]] == [10, 11]
+    assert collapsed[1][3] == [{"chunk_id": 3, "document_id": 10, "chunk_index": 1, "filename": "v1.pdf"}]
@@ -0,0 +1,194 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.document_service import DeletionResult, DocumentService
+from app.utils.file_storage import sha256_bytes
+
+pytestmark = pytest.mark.asyncio
+
+
+def use_stored_files(mocker, files) -> None:
+    @asynccontextmanager
+    async def session():
+        yield files
+
+    mocker.patch("app.services.document_service.stored_files_session", side_effect=session)
+
+
+async def test_delete_removes_document_and_purges_in_background(client: AsyncClient, alice_token: str, mocker):
+    delete = mocker.patch(
+        "app.api.routes.document.DocumentService.delete_documents",
+        return_value=DeletionResult(deleted=[7], unreferenced_keys=["ab/cd"]),
+    )
+    purge = mocker.patch("app.api.routes.document.DocumentService.purge_files")
+
+    response = await client.delete("/documents/7", headers={"Authorization": f"Bearer {alice_token}"})
+
+    assert response.status_code == 200
+    assert response.json() == {"document_id": 7, "deleted": True}
+    assert delete.call_args.args == ("alice", [7])
+    purge.assert_awaited_once_with(["ab/cd"], [7])
+
+
+@pytest.mark.parametrize(
+    "result, code",
+    [
+        (DeletionResult(not_found=[7]), 404),
+        (DeletionResult(in_progress=[7]), 409),
+    ],
+)
+async def test_delete_reports_missing_and_in_flight_documents(
+    client: AsyncClient, alice_token: str, mocker, result, code
+):
+    mocker.patch("app.api.routes.document.DocumentService.delete_documents", return_value=result)
+    purge = mocker.patch("app.api.routes.document.DocumentService.purge_files")
+
+    response = await client.delete("/documents/7", headers={"Authorization": f"Bearer {alice_token}"})
+
+    assert response.status_code == code
+    purge.assert_not_called()
+
+
+async def test_bulk_delete_reports_each_id(client: AsyncClient, alice_token: str, mocker):
+    mocker.patch(
+        "app.api.routes.document.DocumentService.delete_documents",
+        return_value=DeletionResult(deleted=[1, 2], not_found=[3], in_progress=[4]),
+    )
+    mocker.patch("app.api.routes.document.DocumentService.purge_files")
+
+    response = await client.post(
+        "/documents/bulk-delete",
+        json={"document_ids": [1, 2, 3, 4]},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.json() == {
+        "owner_id": "alice", "deleted": [1, 2], "not_found": [3], "in_progress": [4],
+    }
+
+
+async def test_bulk_delete_rejects_empty_list(client: AsyncClient, alice_token: str):
+    response = await client.post(
+        "/documents/bulk-delete",
+        json={"document_ids": []},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+    assert response.status_code == 422
+
+
+async def test_delete_documents_runs_in_batches_and_skips_in_flight(mocker):
+    mocker.patch("app.services.document_service.settings.DELETE_BATCH_DOCUMENTS", 2)
+    hand_off = mocker.patch("app.services.document_service.ChunkService.hand_off_embeddings")
+    db = MagicMock()
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    statements = []
+    responses = iter([
+        # owner's documents
+        [(1, "ready"), (2, "ready"), (3, "processing")],
+        # batch [1, 2]: locked rows, chunk delete, document delete, then
+        # references released on the primary
+        [(1, "shared"), (2, "legacy")], [], [], [("shared", 0)],
+        # batch [3]: nothing deletable
+        [],
+    ])
+
+    async def execute(stmt, params=None):
+        statements.append(str(stmt))
+        return MagicMock(all=lambda rows=next(responses): rows)
+
+    db.execute = execute
+    use_stored_files(mocker, db)
+
+    result = await DocumentService(db).delete_documents("alice", [1, 2, 3, 9, 1])
+
+    assert result.deleted == [1, 2]
+    assert result.not_found == [9]
+    assert result.in_progress == [3]
+    # "legacy" predates reference counting and has no stored_files row
+    assert sorted(result.unreferenced_keys) == ["legacy", "shared"]
+    hand_off.assert_awaited_once_with([1, 2])
+    assert statements[2].startswith("DELETE FROM chunks")
+    # The batch, then its released references
+    assert db.commit.await_count == 2
+
+
+async def test_purge_keeps_files_that_were_referenced_again(mocker):
+    backend = MagicMock(delete=AsyncMock())
+    mocker.patch("app.services.document_service.get_storage_backend", return_value=backend)
+    drop = mocker.patch("app.services.document_service.drop_chunk_cache")
+    rows = {"reused": SimpleNamespace(ref_count=1), "orphan": SimpleNamespace(ref_count=0), "legacy": None}
+    db = MagicMock()
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    db.delete = AsyncMock()
+    db.scalars = AsyncMock(side_effect=[MagicMock(one_or_none=lambda v=rows[k]: v) for k in rows])
+    use_stored_files(mocker, db)
+
+    await DocumentService(db=None).purge_files(list(rows), [7])
+
+    assert [call.args[0] for call in backend.delete.await_args_list] == ["orphan", "legacy"]
+    db.delete.assert_awaited_once_with(rows["orphan"])
+    drop.assert_called_once_with(7)
+
+
+class PrimaryStoredFiles:
+    """stored_files on the primary, as seen by DocumentService: counts per key."""
+
+    def __init__(self):
+        self.refs: Counter = Counter()
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+        self.delete = AsyncMock()
+
+    async def execute(self, stmt, params=None):
+        if params is not None:
+            # RELEASE_REFERENCES
+            for key, n in zip(params["keys"], params["counts"]):
+                self.refs[key] -= n
+            return MagicMock(all=lambda: [(key, self.refs[key]) for key in params["keys"]])
+        if stmt.is_insert:
+            self.refs[stmt.compile().params["content_hash"]] += 1
+        return MagicMock()
+
+    async def scalars(self, stmt):
+        key = stmt.compile().params["key_1"]
+        return MagicMock(one_or_none=lambda: SimpleNamespace(ref_count=self.refs[key]))
+
+
+def shard_session(responses: list) -> MagicMock:
+    db = MagicMock(commit=AsyncMock(), rollback=AsyncMock(), refresh=AsyncMock())
+    results = iter(responses)
+    db.execute = AsyncMock(side_effect=lambda *args: MagicMock(all=lambda rows=next(results): rows))
+    return db
+
+
+async def test_file_shared_by_two_shards_survives_a_delete_on_one(mocker):
+    files = PrimaryStoredFiles()
+    use_stored_files(mocker, files)
+    hand_off = mocker.patch("app.services.document_service.ChunkService.hand_off_embeddings")
+    # Content-addressed: the key is the content hash, as in the local backend
+    backend = MagicMock(put=AsyncMock(side_effect=lambda content: sha256_bytes(content)), delete=AsyncMock())
+    mocker.patch("app.services.document_service.get_storage_backend", return_value=backend)
+    mocker.patch("app.services.document_service.drop_chunk_cache")
+    key = sha256_bytes(b"same bytes")
+
+    shard_a, shard_b = shard_session([]), shard_session([])
+    for shard in (shard_a, shard_b):
+        await DocumentService(shard).save_file(SimpleNamespace(storage_path=None), "a.txt", b"same bytes")
+    assert files.refs[key] == 2
+
+    shard_a = shard_session([[(1, "ready")], [(1, key)], [], []])
+    result = await DocumentService(shard_a).delete_documents("alice", [1])
+    await DocumentService(shard_a).purge_files(result.unreferenced_keys, result.deleted)
+
+    assert result.deleted == [1]
+    assert result.unreferenced_keys == []
+    assert files.refs[key] == 1
+    backend.delete.assert_not_called()
+    hand_off.assert_awaited_once_with([1])
@@ -0,0 +1,109 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from app.utils.embedding_providers import (
+    EmbeddingDimensionError,
+    EmbeddingState,
+    HashingEmbeddingProvider,
+    check_dimensions,
+)
+from app.utils.embeddings import AdaptiveBatchSizer
+
+
+def test_hashing_provider_is_deterministic_and_normalized():
+    provider = HashingEmbeddingProvider(dimensions=256)
+    first, second = provider.embed_sync(["refund policy for orders", "refund policy for orders"])
+    assert first == second
+    assert len(first) == 256
+    assert np.linalg.norm(first) == pytest.approx(1.0, rel=1e-5)
+
+
+def test_hashing_provider_ranks_lexical_overlap_higher():
+    provider = HashingEmbeddingProvider(dimensions=1536)
+    query, related, unrelated = np.array(provider.embed_sync([
+        "how do I request a refund",
+        "to request a refund, open the orders page",
+        "the office is closed on public holidays",
+    ]))
+    assert query @ related > query @ unrelated
+
+
+def test_token_less_text_embeds_to_a_fixed_unit_vector():
+    provider = HashingEmbeddingProvider(dimensions=8)
+    empty, punctuation, words = provider.embed_sync(["", "?!", "some words"])
+    assert empty == punctuation == [1.0] + [0.0] * 7
+    assert np.isclose(np.linalg.norm(words), 1.0)
+
+
+def test_dimension_mismatch_is_rejected():
+    with pytest.raises(EmbeddingDimensionError, match="vector\\(1536\\)"):
+        check_dimensions(HashingEmbeddingProvider(dimensions=384), 1536)
+
+
+def test_batch_sizer_grows_while_throughput_improves_and_backs_off():
+    sizer = AdaptiveBatchSizer(initial=16, maximum=1024)
+    sizer.record(16, 1.0)       # 16/s
+    assert sizer.size == 32
+    sizer.record(32, 1.0)       # 32/s, better: keep growing
+    assert sizer.size == 64
+    sizer.record(64, 4.0)       # 16/s, worse: reverse
+    assert sizer.size == 32
+    sizer.record(5, 0.01)       # tail batch is ignored
+    assert sizer.size == 32
+
+
+def fake_primary(mocker, live):
+    # chunks.embedding is vector(8), embedding_short vector(4); `live` is the
+    # reembed_jobs row recorded by swap, or an exception for an outage
+    conn = MagicMock()
+    conn.scalar = AsyncMock(return_value=True)
+
+    async def execute(stmt):
+        if "pg_attribute" in str(stmt):
+            return MagicMock(one=lambda: SimpleNamespace(dimensions=8, short_dimensions=4))
+        if isinstance(live, Exception):
+            raise live
+        return MagicMock(one_or_none=lambda: live)
+
+    conn.execute = execute
+
+    @asynccontextmanager
+    async def connect():
+        yield conn
+
+    mocker.patch("app.utils.embedding_providers.get_engine", return_value=SimpleNamespace(connect=connect))
+
+
+@pytest.mark.asyncio
+async def test_embedding_state_follows_a_recorded_swap(mocker):
+    mocker.patch("app.utils.embedding_providers.get_embedding_provider", return_value=HashingEmbeddingProvider(8))
+    state = EmbeddingState(ttl=0)
+
+    fake_primary(mocker, live=None)
+    await state.refresh()
+    assert (state.provider.dimensions, state.short_dimensions) == (8, 4)
+    before = state.provider
+
+    # A swap to another 8-d model: picked up on the next load, over the settings
+    fake_primary(mocker, live=("local", "hashing-v2", 8))
+    await state.refresh()
+    assert state.provider is not before
+
+    # Outages keep the last known model
+    switched = state.provider
+    fake_primary(mocker, live=ConnectionError("primary down"))
+    await state.refresh()
+    assert state.provider is switched
+
+
+@pytest.mark.asyncio
+async def test_embedding_state_rejects_a_provider_that_does_not_fit_the_column(mocker):
+    mocker.patch("app.utils.embedding_providers.get_embedding_provider", return_value=HashingEmbeddingProvider(16))
+    fake_primary(mocker, live=None)
+
+    with pytest.raises(EmbeddingDimensionError, match="vector\\(8\\)"):
+        await EmbeddingState(ttl=0).refresh()
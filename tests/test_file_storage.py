@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from app.utils.file_storage import ContentAddressedStorage, sha256_bytes
+
+pytestmark = pytest.mark.asyncio
+
+
+async def read_all(storage: ContentAddressedStorage, key: str) -> bytes:
+    return b"".join([block async for block in storage.stream(key, chunk_size=7)])
+
+
+async def test_identical_content_is_stored_once_in_shards(tmp_path):
+    storage = ContentAddressedStorage(tmp_path, compress=False)
+    content = b"quarterly report"
+    digest = sha256_bytes(content)
+
+    first = await storage.put(content)
+    second = await storage.put(content)
+
+    assert first == second == str(tmp_path / digest[:2] / digest[2:4] / digest)
+    assert await read_all(storage, first) == content
+
+
+async def test_compressible_content_is_gzipped_and_streams_back(tmp_path):
+    storage = ContentAddressedStorage(tmp_path, compress=True)
+    content = b"the same line over and over\n" * 500
+
+    key = await storage.put(content)
+
+    assert key.endswith(".gz")
+    assert (tmp_path / key).stat().st_size < len(content) // 10
+    assert await read_all(storage, key) == content
+    with await storage.spool(key) as source:
+        assert source.read() == content
+
+
+async def test_incompressible_content_is_kept_raw(tmp_path):
+    storage = ContentAddressedStorage(tmp_path, compress=True)
+    content = random.Random(0).randbytes(4096)
+
+    key = await storage.put(content)
+
+    assert not key.endswith(".gz")
+    assert await read_all(storage, key) == content
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+from app.core import lifespan
+from app.main import app
+from app.utils.embedding_providers import EmbeddingDimensionError
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_health(client: AsyncClient):
+    response = await client.get("/health")
+    assert response.status_code == 200
+
+
+async def test_ready_reports_readiness(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(app.state, "ready", False, raising=False)
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    monkeypatch.setattr(app.state, "ready", True)
+    monkeypatch.setattr(app.state, "readiness", {"database": "ok"}, raising=False)
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "checks": {"database": "ok"}}
+
+
+async def test_failed_warm_up_steps_are_retried_until_ready(mocker):
+    mocker.patch.object(lifespan.settings, "WARMUP_RETRY_SECONDS", 0)
+    database = mocker.AsyncMock(side_effect=[ConnectionRefusedError("shard 1 down"), None])
+    tokenizer = mocker.AsyncMock()
+    mocker.patch.object(lifespan, "_warm_up_steps", return_value={"database": database, "tokenizer": tokenizer})
+    target = SimpleNamespace(state=SimpleNamespace(ready=False, readiness={}))
+
+    await lifespan.warm_up(target)
+    assert not target.state.ready
+    assert target.state.readiness == {"database": "failed: shard 1 down", "tokenizer": "ok"}
+
+    await lifespan.retry_warm_up(target)
+    assert target.state.ready
+    assert target.state.readiness == {"database": "ok", "tokenizer": "ok"}
+    # Only the failed step is run again
+    assert (database.await_count, tokenizer.await_count) == (2, 1)
+
+
+async def test_embedding_dimension_mismatch_fails_startup(mocker):
+    mismatch = mocker.AsyncMock(side_effect=EmbeddingDimensionError("chunks.embedding is vector(1536)"))
+    mocker.patch.object(lifespan, "_warm_up_steps", return_value={"embedding_provider": mismatch})
+    target = SimpleNamespace(state=SimpleNamespace())
+    mocker.patch.object(lifespan.settings, "WARMUP_ON_STARTUP", True)
+
+    with pytest.raises(EmbeddingDimensionError):
+        async with lifespan.lifespan(target):
+            pass
+    assert target.state.readiness == {"embedding_provider": "failed: chunks.embedding is vector(1536)"}
@@ -0,0 +1,53 @@
+import random
+
+from app.utils.minhash import align_chunks, estimated_similarity, lsh_bands, minhash_signature
+
+rng = random.Random(3)
+VOCABULARY = [f"word{i}" for i in range(2000)]
+
+
+def paragraph(words: int = 400) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def word_chunker(text: str, size: int = 50) -> list[str]:
+    words = text.split()
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+
+def test_whitespace_and_case_changes_keep_signature():
+    text = paragraph()
+    reformatted = text.upper().replace(" ", "  \n", 50)
+
+    assert estimated_similarity(minhash_signature(text), minhash_signature(reformatted)) == 1.0
+
+
+def test_small_edit_is_similar_and_shares_a_band():
+    text = paragraph(2000)
+    edited = "Exported 2026-10-19 12:00 " + text + " page 1 of 40"
+
+    a, b = minhash_signature(text), minhash_signature(edited)
+
+    assert estimated_similarity(a, b) > 0.9
+    assert set(lsh_bands(a)) & set(lsh_bands(b))
+
+
+def test_unrelated_documents_are_not_similar():
+    a, b = minhash_signature(paragraph(2000)), minhash_signature(paragraph(2000))
+
+    assert estimated_similarity(a, b) < 0.1
+    assert not set(lsh_bands(a)) & set(lsh_bands(b))
+
+
+def test_align_reuses_unchanged_chunks_and_rechunks_only_the_edit():
+    original = paragraph(500)
+    previous = word_chunker(original)
+    words = original.split()
+    words[260] = "CHANGED"
+    edited = "\n\n".join([" ".join(words[:200]), " ".join(words[200:])])
+
+    chunks, reused = align_chunks(edited, previous, word_chunker)
+
+    assert reused == len(previous) - 1
+    assert [c for c in chunks if c not in previous] == [" ".join(words[250:300])]
+    assert " ".join(chunks).split() == words
@@ -0,0 +1,139 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from openai import AsyncOpenAI
+
+from app.utils.openai_client import AdaptiveConcurrencyLimiter, OpenAIClientLayer, SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_fake_openai(fail_first: int = 0, status_code: int = 429, delay: float = 0.0) -> FastAPI:
+    """Fake OpenAI embeddings endpoint that answers the first `fail_first` calls with an error."""
+    fake = FastAPI()
+    fake.state.calls = 0
+
+    @fake.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        fake.state.calls += 1
+        if fake.state.calls <= fail_first:
+            return JSONResponse(
+                {"error": {"message": "slow down", "type": "rate_limit", "code": None}},
+                status_code=status_code,
+                headers={"retry-after": "0"},
+            )
+        await asyncio.sleep(delay)
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [float(len(text)), 0.0]}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        }
+
+    return fake
+
+
+def make_layer(fake: FastAPI, **kwargs) -> OpenAIClientLayer:
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake)),
+        max_retries=0,
+    )
+    return OpenAIClientLayer(client, backoff_base_seconds=0.001, **kwargs)
+
+
+async def test_retries_through_rate_limits_and_backs_off_concurrency():
+    fake = make_fake_openai(fail_first=2)
+    limiter = AdaptiveConcurrencyLimiter(initial=8, maximum=8)
+    layer = make_layer(fake, limiter=limiter)
+
+    embeddings = await layer.create_embeddings("text-embedding-3-small", ["hello"])
+
+    assert embeddings == [[5.0, 0.0]]
+    assert fake.state.calls == 3
+    assert limiter.limit == 2
+
+
+async def test_gives_up_after_max_retries():
+    fake = make_fake_openai(fail_first=10)
+    layer = make_layer(fake, max_retries=2)
+
+    with pytest.raises(openai.RateLimitError):
+        await layer.create_embeddings("text-embedding-3-small", ["hello"])
+    assert fake.state.calls == 3
+
+
+async def test_client_errors_are_not_retried():
+    fake = make_fake_openai(fail_first=1, status_code=400)
+    layer = make_layer(fake)
+
+    with pytest.raises(openai.BadRequestError):
+        await layer.create_embeddings("text-embedding-3-small", ["hello"])
+    assert fake.state.calls == 1
+
+
+async def test_identical_concurrent_calls_are_coalesced():
+    fake = make_fake_openai(delay=0.05)
+    layer = make_layer(fake)
+
+    results = await asyncio.gather(*(
+        layer.create_embeddings("text-embedding-3-small", ["same question"]) for _ in range(10)
+    ))
+
+    assert fake.state.calls == 1
+    assert all(r == results[0] for r in results)
+
+
+async def test_cancelled_leader_does_not_fail_coalesced_followers():
+    singleflight = SingleFlight()
+    calls = 0
+
+    async def embed() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "vector"
+
+    leader = asyncio.create_task(singleflight.do("q", embed))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(singleflight.do("q", embed))
+    await asyncio.sleep(0.01)
+    # The leader's client disconnects
+    leader.cancel()
+
+    assert await follower == "vector"
+    assert leader.cancelled()
+    assert calls == 1
+
+
+async def test_call_is_cancelled_when_every_caller_leaves():
+    singleflight = SingleFlight()
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def embed() -> str:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "vector"
+
+    callers = [asyncio.create_task(singleflight.do("q", embed)) for _ in range(2)]
+    await started.wait()
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert not singleflight._inflight
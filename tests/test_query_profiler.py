@@ -0,0 +1,97 @@
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db.query_profiler import CapturedPlan, QueryProfiler
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_slow_statements_are_logged_with_scope_tags(engine, caplog):
+    profiler = QueryProfiler(slow_ms=0, sample_rate=0, buffer_size=10)
+    profiler.install(engine)
+
+    with caplog.at_level(logging.WARNING), profiler.profile("search", owner_id="alice", top_k=5):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert "slow query" in caplog.text
+    assert "'owner_id': 'alice'" in caplog.text
+    assert not profiler.plans
+
+
+def test_sampled_scope_captures_plans_into_bounded_buffer(engine, mocker):
+    profiler = QueryProfiler(slow_ms=10_000, sample_rate=1.0, buffer_size=2)
+    explain = mocker.patch.object(profiler, "_explain", return_value=["Seq Scan on chunks", "Rows Removed by Filter: 42"])
+    profiler.install(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))  # outside any scope: not captured
+        for owner in ("alice", "bob", "carol"):
+            with profiler.profile("search", owner_id=owner, top_k=3):
+                conn.execute(text("SELECT 2"))
+
+    assert explain.call_count == 3
+    plans = profiler.snapshot()
+    assert [p["tags"]["owner_id"] for p in plans] == ["carol", "bob"]
+    assert plans[0]["tags"]["top_k"] == 3
+    assert plans[0]["summary"] == {"index_scan": False, "seq_scan": True, "rows_removed_by_filter": 42}
+    assert [p["tags"]["owner_id"] for p in profiler.snapshot(owner_id="bob")] == ["bob"]
+
+
+def test_summary_detects_hnsw_index_use():
+    plan = CapturedPlan(
+        label="search", tags={}, duration_ms=1.0, statement="SELECT",
+        plan=["Limit", "  ->  Index Scan using ix_chunks_embedding_hnsw on chunks"],
+    )
+    assert plan.summary()["index_scan"] is True
+    assert plan.summary()["seq_scan"] is False
+
+
+@pytest.mark.asyncio
+async def test_query_plans_endpoint_is_admin_only(client, alice_token, bob_token, mocker):
+    mocker.patch("app.core.dependencies.settings.ADMIN_USERS", "alice")
+
+    forbidden = await client.get("/admin/query-plans", headers={"Authorization": f"Bearer {bob_token}"})
+    allowed = await client.get("/admin/query-plans", headers={"Authorization": f"Bearer {alice_token}"})
+
+    assert forbidden.status_code == 403
+    assert allowed.status_code == 200
+    assert "plans" in allowed.json()
+
+
+def test_failed_explain_of_a_read_is_rolled_back_to_its_savepoint():
+    profiler = QueryProfiler(slow_ms=10_000, sample_rate=1.0, buffer_size=2)
+    cursor = MagicMock()
+
+    def execute(sql, *args):
+        if sql.startswith("EXPLAIN"):
+            raise TimeoutError("canceling statement due to statement timeout")
+
+    cursor.execute.side_effect = execute
+    conn = MagicMock()
+    conn.connection.cursor.return_value = cursor
+
+    with pytest.raises(TimeoutError):
+        profiler._explain(conn, "SELECT 1", {})
+
+    executed = [call.args[0] for call in cursor.execute.call_args_list]
+    assert executed == ["SAVEPOINT query_profiler", "EXPLAIN (ANALYZE, BUFFERS) SELECT 1", "ROLLBACK TO SAVEPOINT query_profiler"]
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection(engine):
+    profiler = QueryProfiler(slow_ms=10_000, sample_rate=0, buffer_size=2)
+    profiler.install(engine)
+
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert not conn.info
@@ -0,0 +1,55 @@
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from starlette.requests import Request
+
+from app.core.limiter import get_rate_limit_key
+from app.core.security import create_access_token
+
+
+def make_request(headers: dict[str, str] | None = None) -> Request:
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/search/",
+        "headers": raw_headers,
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+def test_key_uses_jwt_subject():
+    token = create_access_token("alice")
+    request = make_request({"Authorization": f"Bearer {token}"})
+    assert get_rate_limit_key(request) == "user:alice"
+
+
+def test_key_falls_back_to_remote_address():
+    assert get_rate_limit_key(make_request()) == "ip:10.0.0.1"
+    assert get_rate_limit_key(make_request({"Authorization": "Bearer garbage"})) == "ip:10.0.0.1"
+
+
+def test_sqlite_storage_is_shared_between_instances(tmp_path):
+    uri = f"sqlite:///{tmp_path}/ratelimit.db"
+    # Two storages on one file stand in for two uvicorn workers
+    worker_a = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    worker_b = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    limit = parse("3/minute")
+
+    assert worker_a.hit(limit, "user:alice")
+    assert worker_b.hit(limit, "user:alice")
+    assert worker_a.hit(limit, "user:alice")
+    assert not worker_b.hit(limit, "user:alice")
+    assert worker_b.hit(limit, "user:bob")
+
+
+def test_sqlite_storage_hit_is_sub_millisecond(tmp_path):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(f"sqlite:///{tmp_path}/rl.db"))
+    limit = parse("100000/minute")
+    hits = 500
+    start = time.perf_counter()
+    for _ in range(hits):
+        limiter.hit(limit, "user:alice")
+    assert (time.perf_counter() - start) / hits < 0.001
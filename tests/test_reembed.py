@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+
+from app.cli.reembed import build_hnsw_index, embed_batch_into, embed_concurrently, hnsw_index_name, vector_literal
+from app.core.config import Settings
+from app.utils.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider
+
+pytestmark = pytest.mark.asyncio
+
+
+class SlowProvider(EmbeddingProvider):
+    name = "slow"
+    dimensions = 2
+    max_batch_size = 4
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.batch_sizes: list[int] = []
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.batch_sizes.append(len(texts))
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[float(t), 0.0] for t in texts]
+
+
+async def test_embed_concurrently_keeps_order_and_bounds_calls():
+    provider = SlowProvider()
+    texts = [str(i) for i in range(22)]
+
+    vectors = await embed_concurrently(provider, texts, embed_batch=10, concurrency=2)
+
+    assert [v[0] for v in vectors] == [float(i) for i in range(22)]
+    # embed_batch is capped by the provider's limit
+    assert max(provider.batch_sizes) == 4
+    assert provider.peak == 2
+
+
+async def test_vector_literal_is_pgvector_text():
+    assert vector_literal([1, 0.5, -2.25]) == "[1.0,0.5,-2.25]"
+
+
+async def test_openai_provider_requests_its_dimensions(mocker):
+    layer = mocker.Mock()
+    layer.create_embeddings = mocker.AsyncMock(return_value=[[0.0] * 1024])
+    mocker.patch("app.utils.embedding_providers.get_openai_layer", return_value=layer)
+
+    await OpenAIEmbeddingProvider("text-embedding-3-large", 1024).embed(["hi"])
+
+    assert layer.create_embeddings.call_args.kwargs["dimensions"] == 1024
+
+
+async def test_partitioned_chunks_get_per_partition_indexes_attached_to_the_parent():
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.scalar = AsyncMock(return_value=None)
+    long_partition = "chunks_p_" + "a" * 40
+
+    await build_hnsw_index(conn, "embedding_short_next", ["chunks_p0", long_partition])
+
+    executed = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert executed[0].startswith("CREATE INDEX IF NOT EXISTS ix_chunks_embedding_short_next_hnsw ON ONLY chunks")
+    assert not any("CONCURRENTLY" in sql and " ON chunks " in sql for sql in executed)
+    child = hnsw_index_name(long_partition, "embedding_short_next")
+    assert len(child) <= 63
+    assert f"ALTER INDEX ix_chunks_embedding_short_next_hnsw ATTACH PARTITION {child}" in executed
+    assert sum("ATTACH PARTITION" in sql for sql in executed) == 2
+
+
+async def test_batches_are_cut_to_the_short_column_width():
+    conn = AsyncMock()
+    rows = [MagicMock(id=1, content="1"), MagicMock(id=2, content="2")]
+    args = MagicMock(embed_batch=10, concurrency=1)
+
+    await embed_batch_into(conn, rows, "UPDATE", SlowProvider(), short_dimensions=1, args=args)
+
+    params = conn.execute.call_args.args[1]
+    assert params["embeddings"] == [vector_literal([1.0, 0.0]), vector_literal([2.0, 0.0])]
+    # Normalized one-dimensional prefixes
+    assert params["shorts"] == [vector_literal([1.0]), vector_literal([1.0])]
+
+
+@pytest.mark.parametrize("short", [0, 2048])
+async def test_short_dimensions_must_fit_the_full_vector(short):
+    with pytest.raises(ValidationError, match="EMBEDDING_DIMENSIONS"):
+        Settings(DATABASE_URL="postgresql+asyncpg://x/y", OPENAI_API_KEY="k", EMBEDDING_SHORT_DIMENSIONS=short)
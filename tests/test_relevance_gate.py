@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+from app.services import relevance_gate
+from app.services.rag_service import RAGService
+from app.services.relevance_gate import RelevanceGate
+from app.services.retrieval_service import RetrievalService
+from app.utils.llm import NOT_FOUND_ANSWER
+
+
+def hit(chunk_id: int, distance: float):
+    chunk = SimpleNamespace(id=chunk_id, document_id=1, chunk_index=chunk_id, content=f"fact {chunk_id}")
+    return (chunk, "handbook.pdf", distance, [])
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    gate = RelevanceGate(max_distance=0.6, max_gap=0.15)
+    monkeypatch.setattr(relevance_gate, "_gate", gate)
+    return gate
+
+
+def test_ranking_is_cut_at_threshold_and_at_the_first_large_gap(gate):
+    kept, decision = gate.apply([hit(1, 0.20), hit(2, 0.25), hit(3, 0.45), hit(4, 0.50), hit(5, 0.70)])
+
+    assert decision == "answered"
+    assert [chunk.id for chunk, *_ in kept] == [1, 2]
+    assert gate.snapshot()["chunks_dropped"] == {"distance": 1, "gap": 2}
+
+
+def test_disabled_checks_keep_every_result():
+    results = [hit(1, 0.2), hit(2, 0.9)]
+    assert RelevanceGate(max_distance=0, max_gap=0).apply(results) == (results, "answered")
+
+
+@pytest.mark.asyncio
+async def test_weak_retrieval_answers_without_calling_the_llm(gate, mocker):
+    mocker.patch.object(RetrievalService, "search", return_value=[hit(1, 0.8), hit(2, 0.9)])
+    generate = mocker.patch("app.services.rag_service.generate_answer")
+
+    result = await RAGService(db=None).ask("unrelated?", "alice")
+
+    assert result == {"answer": NOT_FOUND_ANSWER, "sources": []}
+    generate.assert_not_called()
+    assert gate.snapshot()["decisions"] == {"answered": 0, "no_results": 0, "below_threshold": 1}
+    assert gate.snapshot()["skipped_ratio"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_only_relevant_chunks_reach_the_llm(gate, mocker):
+    mocker.patch.object(RetrievalService, "search", return_value=[hit(1, 0.3), hit(2, 0.55)])
+    generate = mocker.patch("app.services.rag_service.generate_answer", return_value="yes [1]")
+
+    result = await RAGService(db=None).ask("policy?", "alice")
+
+    assert "fact 1" in generate.call_args.kwargs["context"]
+    assert "fact 2" not in generate.call_args.kwargs["context"]
+    assert [s["chunk_id"] for s in result["sources"]] == [1]
+
+
+@pytest.mark.asyncio
+async def test_answer_gate_endpoint_is_admin_only(client: AsyncClient, alice_token, bob_token, gate, mocker):
+    mocker.patch("app.core.dependencies.settings.ADMIN_USERS", "alice")
+    gate.apply([])
+
+    forbidden = await client.get("/admin/answer-gate", headers={"Authorization": f"Bearer {bob_token}"})
+    allowed = await client.get("/admin/answer-gate", headers={"Authorization": f"Bearer {alice_token}"})
+
+    assert forbidden.status_code == 403
+    assert allowed.json()["decisions"]["no_results"] == 1
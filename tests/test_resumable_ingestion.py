@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.chunk_service import ChunkService
+from app.services.processing_service import ProcessingService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def db(mocker):
+    return SimpleNamespace(
+        commit=mocker.AsyncMock(),
+        refresh=mocker.AsyncMock(),
+        rollback=mocker.AsyncMock(),
+        execute=mocker.AsyncMock(),
+    )
+
+
+@pytest.fixture
+def checkpointed_doc():
+    return SimpleNamespace(
+        id=3, owner_id="alice", storage_path="uploads/3_a.txt", file_type="txt",
+        status="uploaded", error_message=None, chunks_total=5, last_chunk_index=1,
+    )
+
+
+async def test_resume_embeds_only_chunks_after_checkpoint(mocker, db, checkpointed_doc):
+    mocker.patch.object(settings, "INGEST_CHECKPOINT_CHUNKS", 2)
+    mocker.patch(
+        "app.services.processing_service.load_chunk_cache",
+        return_value=["c0", "c1", "c2", "c3", "c4"],
+    )
+    mocker.patch("app.services.processing_service.drop_chunk_cache")
+    extract = mocker.patch("app.services.processing_service.extract_text")
+    build = mocker.patch.object(ChunkService, "build_rows", return_value=[])
+    mocker.patch.object(ChunkService, "insert_rows")
+
+    await ProcessingService(db).process_document(checkpointed_doc)
+
+    extract.assert_not_called()
+    calls = [(c.args[2], c.kwargs["start_index"]) for c in build.call_args_list]
+    assert calls == [(["c2", "c3"], 2), (["c4"], 4)]
+    assert checkpointed_doc.last_chunk_index == 4
+    assert checkpointed_doc.status == "ready"
+
+
+async def test_failure_keeps_last_committed_checkpoint(mocker, db, checkpointed_doc):
+    mocker.patch.object(settings, "INGEST_CHECKPOINT_CHUNKS", 2)
+    mocker.patch(
+        "app.services.processing_service.load_chunk_cache",
+        return_value=["c0", "c1", "c2", "c3", "c4"],
+    )
+    mocker.patch.object(ChunkService, "build_rows", side_effect=[[], RuntimeError("upstream 503")])
+    mocker.patch.object(ChunkService, "insert_rows")
+
+    with pytest.raises(RuntimeError):
+        await ProcessingService(db).process_document(checkpointed_doc)
+
+    assert checkpointed_doc.last_chunk_index == 3
+    assert checkpointed_doc.status == "failed"
+    db.rollback.assert_awaited_once()
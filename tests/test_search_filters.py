@@ -0,0 +1,82 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+
+from app.services import retrieval_service
+from app.services.retrieval_service import RetrievalService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_search_passes_filters(client: AsyncClient, alice_token: str, mocker):
+    mock_search = mocker.patch(
+        "app.api.routes.search.RetrievalService.search",
+        return_value=[],
+    )
+    response = await client.post(
+        "/search/",
+        json={
+            "query": "hello",
+            "document_ids": [3, 7],
+            "file_type": "pdf",
+            "uploaded_after": "2026-01-01T00:00:00",
+        },
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+    assert response.status_code == 200
+    _, kwargs = mock_search.call_args
+    filters = kwargs["filters"]
+    assert filters.document_ids == [3, 7]
+    assert filters.file_type == "pdf"
+    assert filters.has_filters()
+
+
+async def test_inverted_date_range_is_rejected(client: AsyncClient, alice_token: str):
+    response = await client.post(
+        "/ask/",
+        json={
+            "question": "hello",
+            "uploaded_after": "2026-02-01T00:00:00",
+            "uploaded_before": "2026-01-01T00:00:00",
+        },
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+    assert response.status_code == 422
+
+
+async def test_aware_dates_are_compared_as_naive_utc(client: AsyncClient, alice_token: str, mocker):
+    mock_search = mocker.patch("app.api.routes.search.RetrievalService.search", return_value=[])
+
+    response = await client.post(
+        "/search/",
+        json={"query": "hello", "uploaded_after": "2026-01-01T02:00:00+02:00", "uploaded_before": "2026-01-02T00:00:00Z"},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.status_code == 200
+    filters = mock_search.call_args.kwargs["filters"]
+    assert filters.uploaded_after == datetime(2026, 1, 1, 0, 0)
+    assert filters.uploaded_before == datetime(2026, 1, 2, 0, 0)
+
+
+@pytest.mark.parametrize("version, enabled", [("0.8.0", True), ("0.10.1", True), ("0.7.4", False)])
+async def test_iterative_scans_cover_both_index_types_when_supported(monkeypatch, version, enabled):
+    monkeypatch.setattr(retrieval_service, "_iterative_scan_support", {})
+    db = MagicMock()
+    db.scalar = AsyncMock(return_value=version)
+    db.execute = AsyncMock()
+    service = RetrievalService(db)
+
+    await service._enable_iterative_scan()
+    await service._enable_iterative_scan()
+
+    # The extension version is read once per database
+    db.scalar.assert_awaited_once()
+    if enabled:
+        sql = str(db.execute.call_args.args[0])
+        assert "'hnsw.iterative_scan'" in sql and "'ivfflat.iterative_scan'" in sql
+        assert "'ivfflat.max_probes'" in sql
+    else:
+        db.execute.assert_not_called()
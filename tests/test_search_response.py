@@ -0,0 +1,108 @@
+import re
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.dialects import postgresql
+
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, accepted_encodings
+from app.services.retrieval_service import RetrievalService
+
+
+def fake_hits(n: int = 3, content: str = "x" * 2000):
+    return [
+        (
+            SimpleNamespace(id=i, document_id=1, chunk_index=i, content=content, excerpt=content[:10]),
+            "doc.txt",
+            0.25,
+            [{"chunk_id": i, "document_id": 1, "chunk_index": i, "filename": "doc.txt"}],
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fields_select_the_returned_columns(client: AsyncClient, alice_token: str, mocker):
+    search = mocker.patch("app.api.routes.search.RetrievalService.search", return_value=fake_hits())
+
+    response = await client.post(
+        "/search/",
+        json={"query": "hello", "fields": ["chunk_id", "distance"]},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["results"][0] == {"chunk_id": 0, "distance": 0.25}
+    # No sources requested, so they are not looked up
+    assert search.call_args.kwargs["with_sources"] is False
+
+
+@pytest.mark.asyncio
+async def test_excerpt_mode_returns_the_sql_excerpt(client: AsyncClient, alice_token: str, mocker):
+    search = mocker.patch("app.api.routes.search.RetrievalService.search", return_value=fake_hits())
+
+    response = await client.post(
+        "/search/",
+        json={"query": "hello", "excerpt_chars": 10, "fields": ["content"]},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.json()["results"][0] == {"content": "x" * 10}
+    assert search.call_args.kwargs["excerpt_chars"] == 10
+
+
+@pytest.mark.asyncio
+async def test_unknown_field_is_rejected(client: AsyncClient, alice_token: str):
+    response = await client.post(
+        "/search/",
+        json={"query": "hello", "fields": ["embedding"]},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped_when_accepted(client: AsyncClient, alice_token: str, mocker):
+    mocker.patch("app.api.routes.search.RetrievalService.search", return_value=fake_hits())
+    headers = {"Authorization": f"Bearer {alice_token}"}
+
+    compressed = await client.post("/search/", json={"query": "q"}, headers={**headers, "Accept-Encoding": "gzip"})
+    plain = await client.post("/search/", json={"query": "q"}, headers={**headers, "Accept-Encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    assert int(compressed.headers["content-length"]) < len(plain.content) / 10
+
+
+def test_encoding_negotiation(monkeypatch):
+    assert accepted_encodings("gzip;q=0.5, br, identity;q=0") == {"gzip": 0.5, "br": 1.0}
+
+    middleware = CompressionMiddleware(app=None)
+    monkeypatch.setattr(compression, "brotli", None)
+    assert middleware.choose("br, gzip") == "gzip"
+    assert middleware.choose("br") is None
+
+    monkeypatch.setattr(compression, "brotli", object())
+    assert middleware.choose("gzip, br") == "br"
+    assert middleware.choose("gzip;q=1.0, br;q=0.4") == "gzip"
+    assert middleware.choose("*") == "br"
+
+
+@pytest.mark.asyncio
+async def test_excerpts_are_cut_in_sql_and_vectors_are_not_loaded():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=lambda: []))
+    db.scalar = AsyncMock(return_value="0.8.0")
+    service = RetrievalService(db)
+
+    await service._nearest([[0.1] * 1536], "alice", 5, None, excerpt_chars=200)
+
+    stmt = db.execute.call_args_list[-1].args[0]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    select_list = sql.split("\nFROM ", 1)[0]
+    assert "left(chunks.content" in select_list
+    assert not re.search(r"(?<!left\()chunks\.content\b(?!_hash)", select_list)
+    assert "chunks.embedding" not in select_list
@@ -0,0 +1,130 @@
+import random
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+
+from app.models.chunk import EMBEDDING_DIMENSIONS, EMBEDDING_SHORT_DIMENSIONS, Chunk
+from app.models.document import Document
+from app.schemas.search import SearchFilters
+from app.services.chunk_service import ChunkService, chunk_content_hash
+from app.services.near_duplicate_service import NearDuplicateService
+from app.services.retrieval_service import RetrievalService
+
+
+def unit_vector(axis: int, dimensions: int = EMBEDDING_DIMENSIONS) -> list[float]:
+    vector = [0.0] * dimensions
+    vector[axis] = 1.0
+    return vector
+
+
+async def add_document(db, doc_id: int, filename: str, status: str = "ready") -> None:
+    await db.execute(insert(Document).values(
+        id=doc_id, filename=filename, file_type=filename.rsplit(".", 1)[-1],
+        uploaded_at=datetime(2026, 1, doc_id), status=status, owner_id="alice",
+    ))
+
+
+async def add_chunk(db, chunk_id: int, doc_id: int, index: int, content: str, axis: int | None) -> None:
+    # axis=None: a later copy of content embedded elsewhere
+    await db.execute(insert(Chunk).values(
+        id=chunk_id, document_id=doc_id, owner_id="alice", chunk_index=index,
+        content=content, content_hash=chunk_content_hash(content),
+        embedding=unit_vector(axis) if axis is not None else None,
+        embedding_short=unit_vector(axis, EMBEDDING_SHORT_DIMENSIONS) if axis is not None else None,
+    ))
+
+
+@pytest.fixture
+def shared_corpus(pg_session, mocker):
+    mocker.patch("app.services.retrieval_service.embed_text", return_value=unit_vector(0))
+
+    async def build():
+        await add_document(pg_session, 1, "handbook.pdf")
+        await add_document(pg_session, 2, "handbook.txt")
+        await add_document(pg_session, 3, "draft.txt", status="processing")
+        # The policy paragraph is embedded on its oldest copy only
+        await add_chunk(pg_session, 10, 1, 0, "the policy paragraph", axis=0)
+        await add_chunk(pg_session, 20, 2, 0, "the policy paragraph", axis=None)
+        await add_chunk(pg_session, 21, 2, 1, "text only in the txt", axis=1)
+        await add_chunk(pg_session, 30, 3, 0, "the policy paragraph", axis=None)
+        await pg_session.flush()
+
+    return build
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [SearchFilters(document_ids=[2]), SearchFilters(file_type="txt", uploaded_after=datetime(2026, 1, 2))],
+)
+async def test_filtered_search_finds_content_embedded_in_an_excluded_document(pg_session, shared_corpus, filters):
+    await shared_corpus()
+
+    results = await RetrievalService(pg_session).search("policy?", "alice", top_k=2, filters=filters)
+
+    chunk, filename, distance, sources = results[0]
+    # Shown as the copy inside the filter, with sources limited to ready documents it admits
+    assert (chunk.id, chunk.document_id, filename) == (20, 2, "handbook.txt")
+    assert distance == pytest.approx(0.0)
+    assert sources == [{"chunk_id": 20, "document_id": 2, "chunk_index": 0, "filename": "handbook.txt"}]
+
+
+@pytest.mark.asyncio
+async def test_unfiltered_sources_skip_documents_that_are_not_ready(pg_session, shared_corpus):
+    await shared_corpus()
+
+    results = await RetrievalService(pg_session).search("policy?", "alice", top_k=1)
+
+    assert [s["document_id"] for s in results[0][3]] == [1, 2]
+
+
+def word_chunker(text: str, size: int = 50) -> list[str]:
+    words = text.split()
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+
+@pytest.mark.asyncio
+async def test_filtered_search_on_a_near_duplicate_finds_its_reused_chunks(pg_session, mocker):
+    rng = random.Random(7)
+    words = [f"word{rng.randrange(2000)}" for _ in range(500)]
+    edited = list(words)
+    edited[260] = "CHANGED"
+    axes: dict[str, int] = {}
+    mocker.patch(
+        "app.services.chunk_service.embed_texts",
+        side_effect=lambda texts: [unit_vector(axes.setdefault(t, len(axes))) for t in texts],
+    )
+    chunks, near_duplicates = ChunkService(pg_session), NearDuplicateService(pg_session)
+    for doc_id, text in ((1, " ".join(words)), (2, " ".join(edited))):
+        await add_document(pg_session, doc_id, f"v{doc_id}.txt", status="processing")
+        doc = await pg_session.get(Document, doc_id)
+        contents = await near_duplicates.chunk(doc, text, word_chunker)
+        await chunks.insert_rows(await chunks.build_rows(doc_id, "alice", contents))
+        doc.status = "ready"
+        await pg_session.flush()
+
+    opening = word_chunker(" ".join(words))[0]
+    # v2 reused the opening chunk of v1, so its copy holds no vector
+    assert await pg_session.scalar(select(Document.near_duplicate_of).where(Document.id == 2)) == 1
+    assert await pg_session.scalar(
+        select(Chunk.embedding.is_(None)).where(Chunk.document_id == 2, Chunk.chunk_index == 0)
+    )
+    mocker.patch("app.services.retrieval_service.embed_text", return_value=unit_vector(axes[opening]))
+
+    results = await RetrievalService(pg_session).search(
+        "opening?", "alice", top_k=1, filters=SearchFilters(document_ids=[2])
+    )
+
+    chunk, filename, distance, _ = results[0]
+    assert (chunk.document_id, chunk.content, filename) == (2, opening, "v2.txt")
+    assert distance == pytest.approx(0.0)
+
+
+def test_filters_match_embedded_copies_through_content_hash():
+    service = RetrievalService(db=None)
+    conditions = service._conditions("alice", service._allowed_documents("alice", SearchFilters(document_ids=[2])))
+
+    sql = " ".join(str(c.compile(dialect=postgresql.dialect())) for c in conditions)
+    assert "chunks.content_hash IN (SELECT chunks_1.content_hash" in sql
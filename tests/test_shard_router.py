@@ -0,0 +1,134 @@
+import time
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.dialects import postgresql
+
+from app.cli import move_tenant
+from app.core.config import settings
+from app.db.session import shard_urls
+from app.db.shards import HashRing, Placement, ShardRouter, TenantFrozenError, check_tenant_fence
+
+OWNERS = [f"tenant-{i}" for i in range(10_000)]
+
+
+def test_ring_spreads_owners_evenly():
+    ring = HashRing(["s0", "s1", "s2", "s3"], vnodes=64)
+    counts = Counter(ring.shard_for(owner) for owner in OWNERS)
+    assert set(counts) == {"s0", "s1", "s2", "s3"}
+    assert all(0.15 < n / len(OWNERS) < 0.35 for n in counts.values())
+
+
+def test_adding_a_shard_only_moves_owners_onto_it():
+    before = HashRing(["s0", "s1", "s2", "s3"], vnodes=64)
+    after = HashRing(["s0", "s1", "s2", "s3", "s4"], vnodes=64)
+    moved = [owner for owner in OWNERS if before.shard_for(owner) != after.shard_for(owner)]
+
+    assert all(after.shard_for(owner) == "s4" for owner in moved)
+    assert 0.1 < len(moved) / len(OWNERS) < 0.3
+
+
+@pytest.mark.asyncio
+async def test_override_wins_over_the_ring_and_frozen_tenants_are_refused():
+    router = ShardRouter(["s0", "s1"], vnodes=64, override_ttl=60)
+    ring_shard = router.ring.shard_for("acme")
+    other = "s1" if ring_shard == "s0" else "s0"
+    router._overrides = {
+        "acme": Placement(other),
+        "globex": Placement("s0", target_shard="s1", state="frozen"),
+    }
+    router._loaded_at = time.monotonic()
+
+    assert await router.shard_for("acme") == other
+    assert await router.shard_for("initech") == router.ring.shard_for("initech")
+    with pytest.raises(TenantFrozenError):
+        await router.shard_for("globex")
+
+
+@pytest.mark.asyncio
+async def test_single_shard_routes_without_a_lookup():
+    router = ShardRouter(["default"], vnodes=64, override_ttl=60)
+    # No override table is read: _refresh would fail without a database
+    assert await router.shard_for("anyone") == "default"
+
+
+def test_shard_urls_parses_the_setting(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_SHARDS", "a=postgresql+asyncpg://h1/db, b=postgresql+asyncpg://h2/db?x=1")
+    assert shard_urls() == {"a": "postgresql+asyncpg://h1/db", "b": "postgresql+asyncpg://h2/db?x=1"}
+
+    monkeypatch.setattr(settings, "DATABASE_SHARDS", "")
+    assert shard_urls() == {"default": settings.DATABASE_URL}
+
+
+@pytest.mark.asyncio
+async def test_frozen_tenant_gets_503_with_retry_after(client: AsyncClient, alice_token: str, mocker):
+    mocker.patch("app.db.shards.ShardRouter.shard_for", side_effect=TenantFrozenError("alice"))
+    search = mocker.patch("app.api.routes.search.RetrievalService.search", return_value=[])
+
+    response = await client.post(
+        "/search/",
+        json={"query": "hello", "top_k": 3},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    search.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "placement, refused",
+    [
+        (None, False),
+        (SimpleNamespace(shard="s0", state="copying"), False),
+        (SimpleNamespace(shard="s0", state="frozen"), True),
+        # Moved away: a request routed before the move must not write here
+        (SimpleNamespace(shard="s1", state="active"), True),
+    ],
+)
+def test_commits_check_the_placement_on_their_shard(placement, refused):
+    session = MagicMock(info={"fence_owner_id": "acme", "fence_shard": "s0"})
+    session.execute.return_value.one_or_none.return_value = placement
+
+    if refused:
+        with pytest.raises(TenantFrozenError):
+            check_tenant_fence(session)
+    else:
+        check_tenant_fence(session)
+    sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.endswith("FOR SHARE")
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_fenced_only_with_several_shards(mocker):
+    mocker.patch("app.db.shards.get_engine")
+    router = ShardRouter(["s0", "s1"], vnodes=64, override_ttl=60)
+    router._overrides, router._loaded_at = {"acme": Placement("s1")}, time.monotonic()
+
+    session_maker = await router.session_maker_for("acme")
+
+    assert session_maker.kw["info"] == {"fence_owner_id": "acme", "fence_shard": "s1"}
+
+
+@pytest.mark.asyncio
+async def test_chunk_sync_never_touches_another_tenants_ids(mocker):
+    mocker.patch.object(move_tenant, "chunk_states", side_effect=[{1: True, 2: True}, {3: True}])
+    statements = []
+    conn = MagicMock()
+    conn.execute = mocker.AsyncMock(side_effect=lambda stmt: statements.append(stmt) or MagicMock(
+        mappings=lambda: [{"id": 1, "owner_id": "acme"}, {"id": 2, "owner_id": "acme"}]
+    ))
+    conn.scalar = mocker.AsyncMock(return_value=1)
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = conn
+    engine.connect.return_value.__aenter__.return_value = conn
+    mocker.patch.object(move_tenant, "get_engine", return_value=engine)
+
+    with pytest.raises(SystemExit, match="1 chunk ids are taken"):
+        await move_tenant.sync_chunks("s0", "s1", "acme", batch_size=10)
+
+    deletes = [str(stmt.compile(dialect=postgresql.dialect())) for stmt in statements if stmt.is_delete]
+    assert deletes and all("chunks.owner_id = " in sql for sql in deletes)
@@ -0,0 +1,58 @@
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.middleware.size_limit import RequestSizeLimitMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {"size": len(body)}
+
+    @app.post("/big")
+    async def big(request: Request):
+        body = await request.body()
+        return {"size": len(body)}
+
+    app.add_middleware(RequestSizeLimitMiddleware, default_max_bytes=16, path_limits={"/big": 64})
+    return app
+
+
+@pytest_asyncio.fixture
+async def limited_client():
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as ac:
+        yield ac
+
+
+async def test_small_body_passes(limited_client: AsyncClient):
+    response = await limited_client.post("/echo", content=b"x" * 16)
+    assert response.status_code == 200
+    assert response.json() == {"size": 16}
+
+
+async def test_content_length_over_limit_returns_413(limited_client: AsyncClient):
+    response = await limited_client.post("/echo", content=b"x" * 17)
+    assert response.status_code == 413
+
+
+async def test_per_path_limit(limited_client: AsyncClient):
+    response = await limited_client.post("/big", content=b"x" * 64)
+    assert response.status_code == 200
+    response = await limited_client.post("/big", content=b"x" * 65)
+    assert response.status_code == 413
+
+
+async def test_streamed_body_without_content_length_returns_413(limited_client: AsyncClient):
+    async def chunks():
+        for _ in range(4):
+            yield b"x" * 8
+
+    response = await limited_client.post("/echo", content=chunks())
+    assert response.status_code == 413
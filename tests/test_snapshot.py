@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.cli.snapshot import chunk_records
+from app.models.chunk import EMBEDDING_SHORT_DIMENSIONS
+from app.storage.memory_store import MemoryStore
+from app.utils.snapshot import SnapshotWriter, open_snapshot
+
+DIMENSIONS = 300
+
+
+def unit(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).normal(size=DIMENSIONS).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def write_snapshot(path, dtype="float32"):
+    writer = SnapshotWriter(path, "acme", embedded_rows=3, dimensions=DIMENSIONS, dtype=dtype, model="m")
+    writer.add_document({
+        "id": 7, "filename": "a.txt", "file_type": "txt", "uploaded_at": datetime(2026, 1, 2),
+        "content_hash": "h7", "chunks_total": 2, "near_duplicate_of": None,
+        "signature": b"\x01\x02", "lsh_bands": [1, -2],
+    })
+    writer.add_document({
+        "id": 9, "filename": "b.txt", "file_type": "txt", "uploaded_at": datetime(2026, 1, 3),
+        "content_hash": "h9", "chunks_total": 2, "near_duplicate_of": 7,
+    })
+    writer.add_chunks(
+        [
+            {"document_id": 7, "chunk_index": 0, "content": "alpha", "content_hash": "ca"},
+            {"document_id": 7, "chunk_index": 1, "content": "beta", "content_hash": "cb"},
+        ],
+        [unit(0), unit(1)],
+    )
+    # The second copy of "alpha" is a duplicate stored without a vector
+    writer.add_chunks(
+        [
+            {"document_id": 9, "chunk_index": 0, "content": "alpha", "content_hash": "ca"},
+            {"document_id": 9, "chunk_index": 1, "content": "gamma", "content_hash": "cg"},
+        ],
+        [None, unit(2)],
+    )
+    return writer.close()
+
+
+def test_snapshot_round_trips_through_a_memory_map(tmp_path):
+    manifest = write_snapshot(tmp_path, dtype="float16")
+    snapshot = open_snapshot(tmp_path)
+
+    assert manifest["documents"] == 2 and manifest["chunks"] == 4 and manifest["embedded_chunks"] == 3
+    embeddings = snapshot.embeddings()
+    assert isinstance(embeddings, np.memmap)
+    assert embeddings.dtype == np.float16 and embeddings.shape == (3, DIMENSIONS)
+    assert [c["row"] for c in snapshot.chunks()] == [0, 1, None, 2]
+    documents = list(snapshot.documents())
+    assert documents[0]["signature"] == "0102"
+    assert documents[0]["uploaded_at"] == "2026-01-02T00:00:00"
+
+
+def test_writer_refuses_a_short_snapshot(tmp_path):
+    writer = SnapshotWriter(tmp_path, "acme", embedded_rows=2, dimensions=4)
+    writer.add_chunks([{"document_id": 1, "chunk_index": 0, "content": "x"}], [[1.0, 0, 0, 0]])
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_chunk_records_remap_documents_and_skip_existing(tmp_path):
+    write_snapshot(tmp_path)
+    # Document 9 already existed in the target, so only 7's chunks are copied
+    records = list(chunk_records(open_snapshot(tmp_path), {7: 101}, "loadtest"))
+
+    assert [(r[0], r[1], r[2], r[3]) for r in records] == [(101, "loadtest", 0, "alpha"), (101, "loadtest", 1, "beta")]
+    embedding, short = records[0][5], records[0][6]
+    np.testing.assert_allclose(embedding, unit(0), rtol=1e-6)
+    assert len(short) == EMBEDDING_SHORT_DIMENSIONS
+    assert np.linalg.norm(short) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_memory_store_searches_the_snapshot(tmp_path):
+    write_snapshot(tmp_path, dtype="float16")
+    store = MemoryStore.load(tmp_path)
+
+    results = store.search(unit(2), top_k=2)
+    assert results[0][0]["content"] == "gamma"
+    assert results[0][1] == pytest.approx(0.0, abs=1e-3)
+
+    results = store.search(unit(2), top_k=5, document_ids=[7])
+    assert {chunk["content"] for chunk, _ in results} == {"alpha", "beta"}
+    assert [c["content"] for c in store.document_chunks(9)] == ["alpha", "gamma"]
@@ -0,0 +1,113 @@
+import io
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.document_service import DocumentService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_claim_attaches_to_winner_after_losing_insert_race(mocker):
+    winner = SimpleNamespace(id=5, status="processing", owner_id="alice", updated_at=datetime.utcnow())
+    lookup = mocker.patch.object(DocumentService, "get_by_owner_and_hash", side_effect=[None, winner])
+    mocker.patch.object(DocumentService, "create_document_stub", return_value=None)
+
+    doc, owned = await DocumentService(db=None).claim("a.txt", "txt", "alice", "h")
+
+    assert doc is winner
+    assert owned is False
+    assert lookup.call_count == 2
+
+
+async def test_claim_retries_failed_document(mocker):
+    failed = SimpleNamespace(id=5, status="failed", owner_id="alice")
+    mocker.patch.object(DocumentService, "get_by_owner_and_hash", return_value=failed)
+    mocker.patch.object(DocumentService, "reclaim_failed", return_value=True)
+    stub = mocker.patch.object(DocumentService, "create_document_stub")
+
+    doc, owned = await DocumentService(db=None).claim("a.txt", "txt", "alice", "h")
+
+    assert doc is failed
+    assert owned is True
+    stub.assert_not_called()
+
+
+async def test_claim_takes_over_document_abandoned_in_flight(mocker):
+    abandoned = SimpleNamespace(
+        id=5, status="processing", owner_id="alice", updated_at=datetime.utcnow() - timedelta(hours=2)
+    )
+    mocker.patch.object(DocumentService, "get_by_owner_and_hash", return_value=abandoned)
+    db = mocker.AsyncMock()
+    db.execute.return_value = SimpleNamespace(rowcount=1)
+
+    doc, owned = await DocumentService(db).claim("a.txt", "txt", "alice", "h")
+
+    assert doc is abandoned
+    assert owned is True
+    # Compare-and-set on the updated_at that was read
+    sql = str(db.execute.call_args.args[0])
+    assert "documents.updated_at = :updated_at_1" in sql
+
+
+async def test_claim_attaches_to_live_document_in_flight(mocker):
+    live = SimpleNamespace(id=5, status="uploaded", owner_id="alice", updated_at=datetime.utcnow())
+    mocker.patch.object(DocumentService, "get_by_owner_and_hash", return_value=live)
+    db = mocker.AsyncMock()
+
+    doc, owned = await DocumentService(db).claim("a.txt", "txt", "alice", "h")
+
+    assert (doc, owned) == (live, False)
+    db.execute.assert_not_called()
+
+
+async def test_waiting_for_an_in_flight_document_holds_no_connection_while_sleeping(mocker):
+    doc = SimpleNamespace(id=5, status="processing")
+    events = []
+    db = mocker.AsyncMock()
+    db.commit.side_effect = lambda: events.append("commit")
+
+    async def refresh(target):
+        events.append("refresh")
+        if events.count("refresh") == 2:
+            target.status = "ready"
+
+    db.refresh.side_effect = refresh
+    mocker.patch(
+        "app.services.document_service.asyncio.sleep", side_effect=lambda _: events.append("sleep")
+    )
+
+    settled = await DocumentService(db).wait_until_settled(doc, timeout=30)
+
+    assert settled.status == "ready"
+    assert events == ["commit", "sleep", "refresh"] * 2
+
+
+async def test_duplicate_upload_attaches_without_processing(
+    client: AsyncClient, alice_token: str, mocker
+):
+    in_flight = SimpleNamespace(id=9, status="processing", owner_id="alice")
+    mocker.patch(
+        "app.api.routes.document.DocumentService.claim",
+        return_value=(in_flight, False),
+    )
+    settled = SimpleNamespace(id=9, status="ready", owner_id="alice")
+    wait = mocker.patch(
+        "app.api.routes.document.DocumentService.wait_until_settled",
+        return_value=settled,
+    )
+    process = mocker.patch("app.api.routes.document.ProcessingService.process_document")
+
+    response = await client.post(
+        "/documents/upload",
+        files={"file": ("test.txt", io.BytesIO(b"hello world"), "text/plain")},
+        headers={"Authorization": f"Bearer {alice_token}"},
+    )
+
+    assert response.json() == {
+        "document_id": 9, "status": "ready", "owner_id": "alice", "deduplicated": True,
+    }
+    wait.assert_called_once()
+    process.assert_not_called()
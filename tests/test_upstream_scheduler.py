@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.upstream_scheduler import Priority, UpstreamScheduler, upstream_priority
+
+
+async def _hold(scheduler, order, name, release, priority=Priority.INTERACTIVE, tenant=None, tokens=0):
+    with upstream_priority(priority, tenant):
+        async with scheduler.slot(tokens):
+            order.append(name)
+            await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_interactive_goes_ahead_of_queued_ingestion():
+    scheduler = UpstreamScheduler(SimpleNamespace(limit=1))
+    order, release = [], asyncio.Event()
+
+    blocker = asyncio.create_task(_hold(scheduler, order, "busy", release, Priority.INGESTION, "a"))
+    await asyncio.sleep(0)
+    ingest = asyncio.create_task(_hold(scheduler, order, "ingest", release, Priority.INGESTION, "a"))
+    await asyncio.sleep(0)
+    ask = asyncio.create_task(_hold(scheduler, order, "ask", release))
+    await asyncio.sleep(0)
+
+    assert scheduler.queued() == {"interactive": 1, "ingestion": 1}
+    release.set()
+    await asyncio.gather(blocker, ingest, ask)
+    assert order == ["busy", "ask", "ingest"]
+
+
+@pytest.mark.asyncio
+async def test_ingestion_is_shared_fairly_between_tenants():
+    scheduler = UpstreamScheduler(SimpleNamespace(limit=1))
+    order = []
+
+    async def one(tenant):
+        with upstream_priority(Priority.INGESTION, tenant):
+            async with scheduler.slot(100):
+                order.append(tenant)
+                await asyncio.sleep(0)
+
+    # The big tenant queues all of its work before the small one shows up
+    tasks = [asyncio.create_task(one("big")) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(one("small")) for _ in range(2)]
+    await asyncio.gather(*tasks)
+
+    # Without fair share, both small calls would wait behind all six big ones
+    assert order[-2:] == ["big", "big"]
+
+
+@pytest.mark.asyncio
+async def test_ingestion_leaves_the_reserve_to_interactive_calls():
+    # 6000 tokens/minute = 100/s, with 2400 held back for interactive calls
+    scheduler = UpstreamScheduler(SimpleNamespace(limit=10), tokens_per_minute=6000, interactive_reserve=0.4)
+    order, release = [], asyncio.Event()
+    release.set()
+
+    await _hold(scheduler, order, "bulk-1", release, Priority.INGESTION, "a", tokens=3000)
+    waiting = asyncio.create_task(_hold(scheduler, order, "bulk-2", release, Priority.INGESTION, "a", tokens=1000))
+    await asyncio.sleep(0.02)
+    assert order == ["bulk-1"]
+
+    # Interactive calls spend the reserve without waiting
+    await _hold(scheduler, order, "ask", release, tokens=2000)
+    assert order == ["bulk-1", "ask"]
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.queued() == {"interactive": 0, "ingestion": 0}
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_usage_corrects_the_budget():
+    scheduler = UpstreamScheduler(SimpleNamespace(limit=1), tokens_per_minute=6000)
+    async with scheduler.slot(100) as grant:
+        grant.actual_tokens = 1100
+    assert scheduler.bucket.level == pytest.approx(4900, abs=5)